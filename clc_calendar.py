@@ -1,15 +1,39 @@
 import streamlit as st
-from supabase import create_client, Client
-from datetime import date, datetime, timedelta
+import streamlit.components.v1 as components
+import numpy as np
+from supabase import create_client, Client, ClientOptions
+import httpx
+from postgrest.exceptions import APIError
+from datetime import date, datetime, time as dtime, timedelta
 import calendar
+import csv
+import io
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import partial, wraps
+from bisect import bisect_left, bisect_right
+from heapq import heappop, heappush
+from html import escape
+from pathlib import Path
+
+from models import TR_DAY_KEYS, Event, TransitionWeek, as_events, fmt_date, fmt_time, to_date
 
 # ─── PAGE CONFIG ────────────────────────────────────────────────────────────────
 st.set_page_config(page_title="CLC Calendar", page_icon="📅", layout="wide", initial_sidebar_state="collapsed")
 
 # ─── SUPABASE ───────────────────────────────────────────────────────────────────
+DB_TIMEOUT = 4   # seconds per PostgREST request (connect / read), not the 120 s default
+
 @st.cache_resource
 def init_supabase() -> Client:
-    return create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"])
+    return create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"],
+                         options=ClientOptions(postgrest_client_timeout=DB_TIMEOUT))
 supabase = init_supabase()
 
 # ─── EVENT TYPES ────────────────────────────────────────────────────────────────
@@ -41,6 +65,17 @@ PROGRAM_COLORS = {
     "SY": {"color": "#a16207", "bg": "#fef9c3", "label": "Senior Years"},
 }
 
+# (event_type, program) -> {"color", "bg", "emoji"}: student types with a program take
+# the program's colours, everything else its type's. ev_style() is a lookup, not a rule.
+EV_STYLES = {(t, ""): cfg for t, cfg in EVENT_TYPES.items()}
+EV_STYLES.update({(t, p): {"color": pc["color"], "bg": pc["bg"], "emoji": EVENT_TYPES[t]["emoji"]}
+                  for t in STUDENT_EVENT_TYPES for p, pc in PROGRAM_COLORS.items()})
+
+def ev_style(ev):
+    etype = ev.get("event_type") or "Other"
+    return (EV_STYLES.get((etype, ev.get("program") or "")) or EV_STYLES.get((etype, ""))
+            or EV_STYLES[("Other", "")])
+
 # ─── STYLES ─────────────────────────────────────────────────────────────────────
 st.markdown("""
 <style>
@@ -97,55 +132,1155 @@ for k, v in [("cal_year", today.year), ("cal_month", today.month),
     if k not in st.session_state:
         st.session_state[k] = v
 
-# ─── DB HELPERS ─────────────────────────────────────────────────────────────────
-def db_events(start_date=None, end_date=None):
-    q = supabase.table("clc_events").select("*").order("event_date").order("start_time")
-    if start_date: q = q.gte("event_date", str(start_date))
-    if end_date:   q = q.lte("event_date", str(end_date))
-    return q.execute().data
+# Only the chosen view (and Students sub-view) runs. The choice lives in session state
+# and in the URL (?view=…&sv=…) so a link opens the same view.
+VIEWS         = {"month": "🗓️ Month", "week": "📋 Week", "agenda": "📃 Agenda", "year": "📆 Year",
+                 "students": "👨‍🎓 Students", "search": "🔎 Search", "clashes": "⚠️ Clashes"}
+STUDENT_VIEWS = {"timeline": "📊 Placement Timeline", "meetings": "📋 Meetings List",
+                 "transitions": "🔀 Transition Schedule"}
+for k, opts in [("view", VIEWS), ("sv", STUDENT_VIEWS)]:
+    if k not in st.session_state:
+        q = st.query_params.get(k)
+        st.session_state[k] = q if q in opts else next(iter(opts))
+
+# ─── QUERY CACHE ────────────────────────────────────────────────────────────────
+# Read results are kept in memory, keyed on the shape of the query: table, date
+# windows and filters. Entries expire after QUERY_TTL seconds, the least recently used
+# are evicted past QUERY_MAX, and every write drops just the entries it could have
+# changed so staff see their own edits straight away.
+QUERY_TTL = 120
+QUERY_MAX = 200
+
+class QueryCache:
+    def __init__(self, ttl, max_entries):
+        self.ttl, self.max_entries = ttl, max_entries
+        self.entries = OrderedDict()   # key -> (expires, rows, ranges, filters)
+        self.lock    = threading.Lock()
+
+    def get(self, key, stale=False):
+        """Rows for `key` if still fresh; `stale=True` serves expired ones too."""
+        with self.lock:
+            hit = self.entries.get(key)
+            if not hit or (hit[0] < time.monotonic() and not stale): return None
+            self.entries.move_to_end(key)
+            return hit[1]
+
+    def put(self, key, rows, ranges, filters):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, rows, ranges, filters)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, table, span=None, ids=(), initials=None):
+        """Drop `table` entries matching `span`, `ids` (series too) or `initials`; none drops all."""
+        ids = {str(i) for i in ids}
+        whole = span is None and not ids and initials is None
+        with self.lock:
+            for key, (_, rows, ranges, filters) in list(self.entries.items()):
+                if key[0] != table: continue
+                hit = (whole
+                       or (span and (ranges is None or any(a <= span[1] and span[0] <= b for a, b in ranges)))
+                       or (ids and any(str(r.get("id")).partition("@")[0] in ids for r in rows))
+                       or (initials is not None and filters.get("student_initials") in (None, initials)))
+                if hit: del self.entries[key]
 
-def db_events_all():
-    return supabase.table("clc_events").select("*").order("event_date").execute().data
+@st.cache_resource
+def init_query_cache() -> QueryCache:
+    return QueryCache(QUERY_TTL, QUERY_MAX)
+qcache = init_query_cache()
+
+def _span(a, b=None):
+    a = str(a)[:10]; b = str(b or a)[:10]
+    return (min(a, b), max(a, b))
+
+# ─── PARALLEL READS ─────────────────────────────────────────────────────────────
+# Independent reads (clc_events, pac_meetings, student_transitions) go out together
+# on a small shared pool so a rerun waits on the slowest query, not their sum.
+# Workers must not touch st.* — failures come back to the script thread instead.
+DB_WORKERS = 4
 
-def db_pac():
-    try: return supabase.table("pac_meetings").select("*").order("meeting_date").execute().data
-    except: return []
+@st.cache_resource
+def init_db_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="clc-db")
+db_pool = init_db_pool()
+
+def run_parallel(calls):
+    """Run zero-arg callables concurrently; returns (results, errors) in call order."""
+    futures = [db_pool.submit(fn) for fn in calls]
+    results, errors = [], []
+    for f in futures:
+        try:
+            # A read started inside the budget gets one request timeout to finish
+            results.append(f.result(timeout=max(0.0, rerun_deadline - time.monotonic()) + DB_TIMEOUT))
+            errors.append(None)
+        except FutureTimeout:
+            results.append(None); errors.append(DbUnavailable("no reply in time"))
+        except Exception as e:
+            results.append(None); errors.append(e)
+    return results, errors
+
+# ─── RESILIENT READS ────────────────────────────────────────────────────────────
+# Reads go through db_read(): each request is capped at DB_TIMEOUT by the client,
+# transient failures (network, timeouts, 5xx/408/429 replies) are retried with jittered
+# backoff, and no attempt starts once the rerun's RERUN_BUDGET is spent. BREAKER_FAILS
+# failed reads in a row open a process-wide breaker for BREAKER_COOLDOWN seconds, during
+# which reads don't touch the network at all and cached_query serves the last rows it
+# had, even if expired. Writes are not retried; they only get the request timeout.
+RERUN_BUDGET     = 6
+DB_RETRIES       = 2
+DB_BACKOFF       = 0.25   # seconds, doubled per retry, full jitter
+BREAKER_FAILS    = 3
+BREAKER_COOLDOWN = 30
+
+class DbUnavailable(Exception):
+    """The database could not answer within the timeout, budget or breaker limits."""
+
+class Breaker:
+    def __init__(self, fails, cooldown):
+        self.fails, self.cooldown = fails, cooldown
+        self.failures, self.opened_at = 0, None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Closed, or open long enough that one trial request may go through."""
+        with self.lock:
+            if self.opened_at is None: return True
+            if time.monotonic() - self.opened_at < self.cooldown: return False
+            self.opened_at = time.monotonic()   # half-open: the others wait for this one
+            return True
+
+    def success(self):
+        with self.lock:
+            self.failures, self.opened_at = 0, None
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.fails: self.opened_at = time.monotonic()
 
-def pac_events(pac_list, d_from=None, d_to=None):
+@st.cache_resource
+def init_breaker() -> Breaker:
+    return Breaker(BREAKER_FAILS, BREAKER_COOLDOWN)
+breaker = init_breaker()
+
+def start_budget():
+    global rerun_deadline, stale_tables
+    rerun_deadline = time.monotonic() + RERUN_BUDGET
+    stale_tables   = set()   # tables served from expired cache this run
+start_budget()
+
+STALE_WARNING = ("🐢 The calendar database is slow or unreachable — showing the last events loaded. "
+                 "Recent changes by others may be missing.")
+
+# PostgREST codes for "database not reachable / too busy right now" (HTTP 503/504,
+# statement timeout, connection and resource errors); a numeric code is a bare HTTP status
+TRANSIENT_CODES = ("PGRST000", "PGRST001", "PGRST002", "PGRST003", "57014", "57P", "08", "53")
+
+def transient(e):
+    if isinstance(e, APIError):
+        code = str(e.code or "")
+        return int(code) >= 500 or int(code) in (408, 429) if code.isdigit() else code.startswith(TRANSIENT_CODES)
+    return isinstance(e, (httpx.TransportError, OSError))
+
+def db_read(fetch):
+    """Run an idempotent read within the breaker and budget, retrying transient failures."""
+    err, why = None, None
+    for attempt in range(DB_RETRIES + 1):
+        if not breaker.allow():
+            why = "database unreachable, retrying shortly"; break
+        if time.monotonic() >= rerun_deadline:
+            why = "page time budget used up"; break
+        try:
+            rows = fetch()
+        except Exception as e:
+            if not transient(e): raise
+            err = e
+            if attempt < DB_RETRIES:
+                time.sleep(min(random.uniform(0, DB_BACKOFF * 2 ** attempt),
+                               max(0.0, rerun_deadline - time.monotonic())))
+        else:
+            breaker.success()
+            return rows
+    if err is None: raise DbUnavailable(why)
+    breaker.failure()   # once per read, however many attempts it took
+    raise DbUnavailable(str(err) or type(err).__name__) from err
+
+def cached_query(table, ranges, filters, fetch):
+    """Serve `fetch()` from the query cache, or an expired entry while the database is down."""
+    ranges = tuple(_span(a, b) for a, b in ranges) if ranges is not None else None
+    key    = (table, ranges, tuple(sorted(filters.items())))
+    rows   = qcache.get(key)
+    if rows is None:
+        try:
+            rows = db_read(fetch) or []
+        except DbUnavailable:
+            rows = qcache.get(key, stale=True)
+            if rows is None: raise
+            stale_tables.add(table)
+        else:
+            qcache.put(key, rows, ranges, filters)
+    return list(rows)
+
+# ─── FIELD SETS ─────────────────────────────────────────────────────────────────
+# Columns each view reads. Chips only need enough to place and colour an event; the
+# heavy free-text columns are loaded when a card, detail panel or edit form needs them.
+EV_CHIP = ["id", "event_date", "end_date", "start_time", "event_type", "program", "student_initials", "title"]
+EV_ROW  = EV_CHIP + ["end_time", "location", "added_by"]
+EV_FULL = EV_ROW + ["notes"]
+PAC_FIELDS = ["id", "meeting_type", "meeting_date", "start_time", "location", "chair"]
+TR_GRID    = (["id", "student_initials", "program", "mainstream_school", "term", "week_label", "week_start_date"]
+              + [f"{dk}_{se}" for dk in TR_DAY_KEYS for se in ["start", "end"]])   # the schedule matrix
+TR_FIELDS  = TR_GRID + ["notes", "added_by"]                                        # editing one student
+
+VIEW_FIELDS = {
+    "today":    EV_CHIP,
+    "month":    EV_CHIP,
+    "week":     EV_CHIP,
+    "day":      EV_ROW,
+    "agenda":   EV_FULL,
+    "gantt":    EV_CHIP,
+    "meetings": EV_FULL,
+    "clashes":  EV_ROW,     # location, added_by and end_time decide a clash
+}
+
+def cols(fields):
+    return ",".join(fields)
+
+# ─── RECURRENCE ─────────────────────────────────────────────────────────────────
+# A repeating event (sql/006_recurring_events.sql) is stored once: its row is the first
+# occurrence and `rrule` says how it repeats. Reads fetch the series rows whose repeat
+# span overlaps the window and expand them into one Event per occurrence, with id
+# "<series id>@<date>". Skipped dates are listed in `exdates`; an occurrence edited on
+# its own becomes a normal row (an override) and its date is skipped in the series.
+RECUR_FIELDS    = ["rrule", "repeat_until", "exdates"]
+WEEKDAYS        = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+RRULE_PERIODS   = {"DAILY": 1, "WEEKLY": 7}      # fixed-length periods, in days
+SERIES_HORIZON  = 732                            # days expanded for an open-ended read of an endless series
+REPEATS = {"":                       "Doesn't repeat",
+           "FREQ=DAILY":             "Every day",
+           "FREQ=WEEKLY":            "Every week",
+           "FREQ=WEEKLY;INTERVAL=2": "Every fortnight",
+           "FREQ=MONTHLY":           "Every month",
+           "FREQ=YEARLY":            "Every year"}
+SERIES_SCOPES = {"this": "This event only", "future": "This and following events", "all": "All events in the series"}
+
+def parse_rrule(rule):
+    """The parts of an RRULE in the subset the calendar uses; anything else raises ValueError."""
+    parts = dict(p.split("=", 1) for p in rule.upper().removeprefix("RRULE:").split(";") if p)
+    if set(parts) - {"FREQ", "INTERVAL", "BYDAY", "COUNT", "UNTIL"} or parts.get("FREQ") not in (
+            "DAILY", "WEEKLY", "MONTHLY", "YEARLY") or ("BYDAY" in parts and parts["FREQ"] != "WEEKLY"):
+        raise ValueError(f"unsupported repeat rule {rule!r}")
+    r = {"FREQ": parts["FREQ"], "INTERVAL": int(parts.get("INTERVAL", 1)),
+         "BYDAY": sorted({WEEKDAYS.index(d) for d in parts["BYDAY"].split(",")}) if parts.get("BYDAY") else None,
+         "COUNT": int(parts["COUNT"]) if "COUNT" in parts else None,
+         "UNTIL": date(int(u[:4]), int(u[4:6]), int(u[6:8])) if (u := parts.get("UNTIL")) else None}
+    if r["INTERVAL"] < 1: raise ValueError(f"unsupported repeat rule {rule!r}")
+    return r
+
+def format_rrule(r):
+    out = [f"FREQ={r['FREQ']}"]
+    if r["INTERVAL"] != 1: out.append(f"INTERVAL={r['INTERVAL']}")
+    if r["BYDAY"]:         out.append("BYDAY=" + ",".join(WEEKDAYS[d] for d in r["BYDAY"]))
+    if r["COUNT"]:         out.append(f"COUNT={r['COUNT']}")
+    if r["UNTIL"]:         out.append(f"UNTIL={r['UNTIL']:%Y%m%d}")
+    return ";".join(out)
+
+def rrule_dates(start, rule, d_from, d_to):
+    """Dates from d_from to d_to on which the series starting `start` occurs, in order."""
+    r = parse_rrule(rule) if isinstance(rule, str) else rule
+    count, last = r["COUNT"], min(d_to, r["UNTIL"] or date.max)
+    if last == date.max and not count:
+        last = max(d_from, start) + timedelta(days=SERIES_HORIZON)
+    n = 0
+    if r["FREQ"] in RRULE_PERIODS:
+        step = RRULE_PERIODS[r["FREQ"]] * r["INTERVAL"]
+        base, offsets = ((start - timedelta(days=start.weekday()), r["BYDAY"]) if r["BYDAY"] else (start, [0]))
+        # Without a COUNT to keep, go straight to the period holding d_from
+        k = 0 if count else max(0, (d_from - base).days // step)
+        while True:
+            p = base + timedelta(days=k * step)
+            if p > last: return
+            for o in offsets:
+                d = p + timedelta(days=o)
+                if d < start: continue
+                if d > last: return
+                n += 1
+                if count and n > count: return
+                if d >= d_from: yield d
+            k += 1
+    else:
+        months = r["INTERVAL"] * (12 if r["FREQ"] == "YEARLY" else 1)
+        k = 0 if count else max(0, ((d_from.year - start.year) * 12 + d_from.month - start.month) // months)
+        while True:
+            y, m = divmod(start.month - 1 + k * months, 12)
+            y += start.year
+            if date(y, m + 1, 1) > last: return
+            k += 1
+            if start.day > calendar.monthrange(y, m + 1)[1]: continue
+            d = date(y, m + 1, start.day)
+            if d > last: return
+            n += 1
+            if count and n > count: return
+            if d >= d_from: yield d
+
+def series_until(start, rule):
+    """Last day an occurrence can start on (repeat_until), or None for an endless series."""
+    if not rule: return None
+    r = parse_rrule(rule)
+    if r["COUNT"]:
+        last = start
+        for last in rrule_dates(start, r, start, date.max): pass
+        return last
+    return r["UNTIL"]
+
+def rrule_from(rule, start, occ):
+    """`rule` for the series from its occurrence on `occ` on, a COUNT reduced to match."""
+    r = parse_rrule(rule)
+    if r["COUNT"]:
+        r["COUNT"] = max(1, r["COUNT"] - sum(1 for _ in rrule_dates(start, r, start, occ - timedelta(days=1))))
+    return format_rrule(r)
+
+def rrule_parts(rule):
+    """(rule without UNTIL, UNTIL date) — how the event form shows a rule."""
+    if not rule: return "", None
+    try: r = parse_rrule(rule)
+    except ValueError: return rule, None
+    until, r["UNTIL"] = r["UNTIL"], None
+    return format_rrule(r), until
+
+def repeat_label(rule):
+    """"Every 2 weeks on Mon, Wed until 18 December 2026" for a rule, "" if there is none."""
+    try: r = parse_rrule(rule) if rule else None
+    except ValueError: return rule
+    if not r: return ""
+    unit = {"DAILY": "day", "WEEKLY": "week", "MONTHLY": "month", "YEARLY": "year"}[r["FREQ"]]
+    out  = (f"Every {unit}" if r["INTERVAL"] == 1 else "Every fortnight" if (unit, r["INTERVAL"]) == ("week", 2)
+            else f"Every {r['INTERVAL']} {unit}s")
+    if r["BYDAY"]: out += " on " + ", ".join(calendar.day_abbr[d] for d in r["BYDAY"])
+    if r["COUNT"]: out += f", {r['COUNT']} times"
+    if r["UNTIL"]: out += f" until {fmt_date(r['UNTIL'])}"
+    return out
+
+def split_occurrence(eid):
+    """(series id, date) for an occurrence id "<series id>@<date>", else (eid, None)."""
+    sid, _, d = str(eid).partition("@")
+    return (sid, to_date(d)) if d else (eid, None)
+
+def occurrence(ev, d):
+    """The occurrence of series `ev` on `d`: the series row moved to that date."""
+    span = ev.last - ev.day
+    return Event({**ev.row, "id": f"{ev.id}@{d}", "event_date": str(d),
+                  "end_date": str(d + span) if span else None, "series_id": ev.id})
+
+@st.cache_resource
+def init_series_memo() -> QueryCache:
+    """Occurrence dates per (series, window)."""
+    return QueryCache(QUERY_TTL, 2000)
+series_memo = init_series_memo()
+
+def series_dates(ev, d_from, d_to):
+    """Occurrence dates of series `ev` starting d_from..d_to, skipped dates left out."""
+    key   = (ev.id, ev.get("rrule"), ev.day, tuple(ev.get("exdates") or ()), d_from, d_to)
+    dates = series_memo.get(key)
+    if dates is None:
+        skip  = {to_date(x) for x in ev.get("exdates") or ()}
+        dates = tuple(d for d in rrule_dates(ev.day, ev["rrule"], d_from, d_to) if d not in skip)
+        series_memo.put(key, dates, None, {})
+    return dates
+
+def next_occurrence(ev, d):
+    """The occurrence of series `ev` on or after `d`, or its last one if it has ended."""
+    skip = {to_date(x) for x in ev.get("exdates") or ()}
+    try:
+        found = next((x for x in rrule_dates(ev.day, ev["rrule"], d, date.max) if x not in skip), None)
+        if found is None:
+            found = next(reversed(series_dates(ev, ev.day, d - timedelta(days=1))), None)
+    except ValueError:
+        return None
+    return occurrence(ev, found) if found else None
+
+def expand_series(events, windows):
+    """`events` with each series row replaced by its occurrences active in `windows`."""
+    out = []
+    for ev in as_events(events):
+        if not ev.get("rrule"):
+            out.append(ev); continue
+        span = ev.last - ev.day
+        try:
+            dates = {d for a, b in windows for d in series_dates(ev, max(a, date.min + span) - span, b)}
+        except ValueError:
+            out.append(ev); continue
+        out += [occurrence(ev, d) for d in sorted(dates)]
+    return out
+
+# ─── DB HELPERS ─────────────────────────────────────────────────────────────────
+def recurring(run):
+    """run(True) reads with the series columns; once they turn out missing, run(False)."""
+    if not feed_state["recur_missing"]:
+        try:
+            return run(True)
+        except Exception as e:
+            if "rrule" not in str(e): raise
+            feed_state["recur_missing"] = True
+    return run(False)
+
+def ev_cols(fields, recur):
+    return cols(fields + RECUR_FIELDS if recur else fields)
+
+def or_series(windows):
+    return (f"and(rrule.not.is.null,event_date.lte.{max(b for _, b in windows)},"
+            f"or(repeat_until.is.null,repeat_until.gte.{min(a for a, _ in windows)}))")
+
+def db_events(start_date=None, end_date=None, fields=EV_FULL):
+    """clc_events starting between the two dates, series occurrences included."""
+    win = [(start_date or date.min, end_date or date.max)]
+    if replica:
+        return expand_series(replica.rows("clc_events", win), win)
+    def fetch(recur):
+        q = supabase.table("clc_events").select(ev_cols(fields, recur)).order("event_date").order("start_time")
+        if start_date: q = q.gte("event_date", str(start_date))
+        if end_date:   q = q.lte("event_date", str(end_date))
+        if recur:      q = q.is_("rrule", "null")
+        return as_events(q.execute().data)
+    ranges = None if not (start_date and end_date) else [(start_date, end_date)]
+    rows   = cached_query("clc_events", ranges, {"cols": cols(fields)}, partial(recurring, fetch))
+    return rows + [e for e in db_series(win, fields) if e.day >= win[0][0]]
+
+def db_events_in(windows, fields=EV_FULL):
+    """clc_events rows active on any day of `windows`, with series expanded."""
+    if replica:
+        return expand_series(replica.rows("clc_events", windows), windows)
+    def fetch(recur):
+        return as_events(supabase.table("clc_events").select(ev_cols(fields, recur))
+                         .or_(or_overlaps(windows) + ("," + or_series(windows) if recur else ""))
+                         .order("event_date").order("start_time").execute().data)
+    return cached_query("clc_events", windows, {"cols": cols(fields)},
+                        lambda: expand_series(recurring(fetch), windows))
+
+def db_series(windows, fields=EV_FULL):
+    """Occurrences, active on any day of `windows`, of the series that overlap them."""
+    def fetch(recur):
+        if not recur: return []
+        return (supabase.table("clc_events").select(ev_cols(fields, recur)).or_(or_series(windows))
+                .order("event_date").execute().data)
+    return cached_query("clc_events", windows, {"series": True, "cols": cols(fields)},
+                        lambda: expand_series(recurring(fetch), windows))
+
+# Unified feed (sql/003_calendar_feed.sql): clc_events and pac_meetings already merged,
+# normalised like pac_events() and sorted. If the view hasn't been created yet the
+# store notices once and goes back to querying the two tables.
+@st.cache_resource
+def init_feed_state():
+    # feed view / calendar_day_counts / calendar_search / series columns not created yet
+    return {"missing": False, "counts_missing": False, "search_missing": False, "recur_missing": False}
+feed_state = init_feed_state()
+
+def feed_missing(e):
+    return "clc_calendar_feed" in str(e)
+
+def db_feed(windows, fields=EV_FULL):
+    """Calendar feed rows active on any day of `windows`, with series expanded."""
+    def fetch(recur):
+        return as_events(supabase.table("clc_calendar_feed").select(ev_cols(fields, recur))
+                         .or_(or_overlaps(windows) + ("," + or_series(windows) if recur else ""))
+                         .order("event_date").order("start_time").execute().data)
+    return cached_query("clc_calendar_feed", windows, {"cols": cols(fields)},
+                        lambda: expand_series(recurring(fetch), windows))
+
+def db_feed_page(d_from, d_to, types, after=None, limit=50, fields=EV_FULL):
+    """One keyset page (limit + 1 rows) of the feed after the `after` cursor, series left out."""
+    def fetch(recur):
+        q = (supabase.table("clc_calendar_feed").select(cols(fields))
+             .gte("event_date", str(d_from)).lte("event_date", str(d_to)))
+        if recur:
+            q = q.is_("rrule", "null")
+        if types is not None:
+            q = q.in_("event_type", list(types))
+        if after:
+            d, t, i = after
+            if t:   # untimed rows sort last within a day
+                q = q.or_(f'event_date.gt.{d},and(event_date.eq.{d},or(start_time.gt.{t},start_time.is.null,'
+                          f'and(start_time.eq.{t},id.gt."{i}")))')
+            else:
+                q = q.or_(f'event_date.gt.{d},and(event_date.eq.{d},start_time.is.null,id.gt."{i}")')
+        return as_events(q.order("event_date").order("start_time").order("id").limit(limit + 1).execute().data)
+    return cached_query("clc_calendar_feed", [(d_from, d_to)],
+                        {"cols": cols(fields), "types": tuple(types or ()), "after": after, "limit": limit},
+                        partial(recurring, fetch))
+
+def db_day_counts(d_from, d_to):
+    """Events per day, type and program for d_from..d_to from calendar_day_counts."""
+    def fetch():
+        return supabase.rpc("calendar_day_counts", {"d_from": str(d_from), "d_to": str(d_to)}).execute().data
+    return cached_query("calendar_day_counts", [(d_from, d_to)], {}, fetch)
+
+SEARCH_PAGE = 20
+
+def db_search(q, page):
+    """One page of calendar_search for `q`, plus one row to tell whether there is another."""
+    def fetch():
+        return supabase.rpc("calendar_search", {"q": q, "lim": SEARCH_PAGE + 1,
+                                                "off": page * SEARCH_PAGE}).execute().data
+    return cached_query("calendar_search", None, {"q": q, "page": page}, fetch)
+
+def db_events_all(fields=EV_FULL):
+    if replica:
+        return as_events(replica.rows("clc_events"))
+    return cached_query("clc_events", None, {"all": True, "cols": cols(fields)},
+                        lambda: as_events(supabase.table("clc_events").select(cols(fields)).order("event_date").execute().data))
+
+def query_transitions(initials=None, fields=TR_FIELDS):
+    if replica:
+        return [TransitionWeek(r) for r in replica.rows("student_transitions", initials=initials)]
+    def fetch():
+        q = supabase.table("student_transitions").select(cols(fields)).order("week_start_date").order("student_initials")
+        if initials:
+            q = q.eq("student_initials", initials)
+        return [TransitionWeek(r) for r in q.execute().data]
+    return cached_query("student_transitions", None,
+                        {"student_initials": initials or None, "cols": cols(fields)}, fetch)
+
+def db_event_one(ev_id, fields=EV_FULL):
+    """Single clc_events row by id with the heavy columns; an occurrence id gives the occurrence."""
+    sid, occ = split_occurrence(ev_id)
+    if occ:
+        ev = db_event_one(sid, fields)
+        return occurrence(ev, occ) if ev and ev.get("rrule") else None
+    if replica:
+        return next(iter(as_events(replica.rows("clc_events", ids=[ev_id]))), None)
+    if SYNC_MODE and mirrors["clc_events"].get(ev_id):
+        return mirrors["clc_events"].get(ev_id)
+    def fetch(recur):
+        return as_events(supabase.table("clc_events").select(ev_cols(fields, recur)).eq("id", ev_id).limit(1)
+                         .execute().data)
+    rows = cached_query("clc_events", None, {"id": str(ev_id), "cols": cols(fields)}, partial(recurring, fetch))
+    return rows[0] if rows else None
+
+def with_details(eid, ev):
+    """`ev` with its heavy columns from db_event_one — or `ev` as is if it can't be read now."""
+    try: return db_event_one(eid) or ev
+    except DbUnavailable: return ev
+
+def event_for_edit(eid):
+    """Full row to prefill an edit form, or None (with a warning) if it can't be read."""
+    try: full = db_event_one(eid)
+    except DbUnavailable as e:
+        st.warning(f"Can't edit this event right now — the calendar database isn't answering ({e}).")
+        return None
+    if not full:
+        st.warning("This event no longer exists — it may have been deleted by someone else.")
+    return full
+
+def or_windows(col, windows):
+    return ",".join(f"and({col}.gte.{a},{col}.lte.{b})" for a, b in windows)
+
+def or_overlaps(windows):
+    """PostgREST or-filter for events whose event_date..end_date span overlaps any window."""
+    return ",".join(f"and(event_date.lte.{b},or(end_date.gte.{a},and(end_date.is.null,event_date.gte.{a})))"
+                    for a, b in windows)
+
+def db_pac(windows):
+    if replica:
+        return replica.rows("pac_meetings", windows)
+    def fetch():
+        return (supabase.table("pac_meetings").select(cols(PAC_FIELDS)).or_(or_windows("meeting_date", windows))
+                .order("meeting_date").execute().data)
+    return cached_query("pac_meetings", windows, {}, fetch)
+
+def db_pac_one(pac_id):
+    if replica:
+        return next(iter(replica.rows("pac_meetings", ids=[pac_id])), None)
+    if SYNC_MODE and mirrors["pac_meetings"].get(pac_id):
+        return mirrors["pac_meetings"].get(pac_id)
+    def fetch():
+        return supabase.table("pac_meetings").select(cols(PAC_FIELDS)).eq("id", pac_id).limit(1).execute().data
+    rows = cached_query("pac_meetings", None, {"id": str(pac_id)}, fetch)
+    return rows[0] if rows else None
+
+def pac_events(pac_list):
     out = []
     for p in pac_list:
         if not p.get("meeting_date"): continue
-        d = str(p["meeting_date"])[:10]
-        if d_from and d < str(d_from): continue
-        if d_to   and d > str(d_to):   continue
-        out.append({"title": f"{p.get('meeting_type','Ordinary')} PAC Meeting",
-                    "event_type": "PAC Meeting", "event_date": p["meeting_date"],
-                    "start_time": p.get("start_time"), "location": p.get("location",""),
-                    "added_by": "PAC System", "notes": f"Chair: {p.get('chair','—')}",
-                    "id": f"pac_{p['id']}"})
+        # Blank columns read the way the feed view (sql/003_calendar_feed.sql) coalesces them
+        out.append(Event({"title": f"{p.get('meeting_type') or 'Ordinary'} PAC Meeting",
+                          "event_type": "PAC Meeting", "event_date": p["meeting_date"],
+                          "start_time": p.get("start_time"), "location": p.get("location") or "",
+                          "added_by": "PAC System", "notes": f"Chair: {p.get('chair') or '—'}",
+                          "id": f"pac_{p['id']}"}))
     return out
 
-def ev_index(events):
-    idx = {}
-    for ev in events:
-        idx.setdefault(str(ev.get("event_date",""))[:10], []).append(ev)
-    return idx
+# ─── LOCAL REPLICA ──────────────────────────────────────────────────────────────
+# Optional (secret CLC_REPLICA_PATH): an SQLite copy of clc_events, pac_meetings and
+# student_transitions. Reads are answered locally; each table is re-copied from
+# Supabase in the background every REPLICA_REFRESH seconds, and writes go to Supabase
+# first and then straight into the copy. If Supabase can't be reached the page keeps
+# serving the last copy with a warning instead of stalling. Takes precedence over
+# CLC_SYNC_MODE when both are set.
+try:
+    REPLICA_PATH = st.secrets["CLC_REPLICA_PATH"]
+except Exception:
+    REPLICA_PATH = None
+REPLICA_REFRESH = 60
+
+# table -> (date column, secondary sort column, fields)
+REPLICA_TABLES = {
+    "clc_events":          ("event_date", "start_time", EV_FULL),
+    "pac_meetings":        ("meeting_date", "start_time", PAC_FIELDS),
+    "student_transitions": ("week_start_date", "student_initials", TR_FIELDS),
+}
+
+SEARCH_KINDS = {"clc_events": "event", "pac_meetings": "pac", "student_transitions": "transition"}
+
+def search_doc(table, r):
+    """(day, initials, title, who, body) the replica's search index keeps for a row."""
+    g = lambda k: str(r.get(k) or "")
+    if table == "clc_events":
+        return (g("event_date")[:10], g("student_initials"), g("title") or g("event_type"),
+                " ".join([g("event_type"), g("student_initials"), g("added_by")]),
+                " · ".join(filter(None, [g("location"), g("notes")])))
+    if table == "pac_meetings":
+        return (g("meeting_date")[:10], "", f"{g('meeting_type') or 'Ordinary'} PAC Meeting", "",
+                " · ".join(filter(None, [f"Chair: {g('chair') or '—'}", g("location")])))
+    school = f" → {g('mainstream_school')}" if g("mainstream_school") else ""
+    return (g("week_start_date")[:10], g("student_initials"), f"Transition — {g('student_initials') or '?'}{school}",
+            " ".join([g("student_initials"), g("added_by")]),
+            " · ".join(filter(None, [g("term"), g("week_label"), g("notes")])))
+
+class Replica:
+    def __init__(self, path):
+        self.db   = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.refreshed_at, self.tried_at, self.in_flight = {}, {}, set()
+        self.errors = {}   # table -> error of its last failed refresh
+        self.written = {t: {} for t in REPLICA_TABLES}   # table -> {id: (applied at, row or None if deleted)}
+        with self.lock, self.db:
+            for t in REPLICA_TABLES:
+                self.db.execute(f"create table if not exists {t} (id text primary key, d text, d_end text, "
+                                f"k text, initials text, row text not null)")
+                self.db.execute(f"create index if not exists {t}_d on {t} (d, k)")
+                self.db.execute(f"create index if not exists {t}_d_end on {t} (d_end)")
+                self.db.execute(f"create index if not exists {t}_initials on {t} (initials)")
+            self.db.execute("create table if not exists replica_meta (table_name text primary key, refreshed_at real)")
+            self.refreshed_at = dict(self.db.execute("select table_name, refreshed_at from replica_meta"))
+            # Search: an FTS5 index over search_doc() text, kept in step with the rows by triggers
+            self.db.execute("create table if not exists search_docs (tbl text, row_id text, day text, initials text, "
+                            "title text, who text, body text, primary key (tbl, row_id))")
+            self.db.execute("create virtual table if not exists search_fts using fts5(title, who, body, "
+                            "content='search_docs', tokenize='unicode61 remove_diacritics 2')")
+            self.db.execute("create trigger if not exists search_docs_ai after insert on search_docs begin "
+                            "insert into search_fts (rowid, title, who, body) values (new.rowid, new.title, new.who, new.body); end")
+            self.db.execute("create trigger if not exists search_docs_ad after delete on search_docs begin "
+                            "insert into search_fts (search_fts, rowid, title, who, body) "
+                            "values ('delete', old.rowid, old.title, old.who, old.body); end")
+            if not self.db.execute("select 1 from search_docs limit 1").fetchone():
+                for t in REPLICA_TABLES:   # replica files from before search existed
+                    self._index(t, [json.loads(r) for (r,) in self.db.execute(f"select row from {t}")])
+
+    def _record(self, table, r):
+        d_col, k_col, _ = REPLICA_TABLES[table]
+        d = str(r.get(d_col) or "")[:10]
+        # A series is read for every window up to its last occurrence, then expanded
+        d_end = str(r.get("repeat_until") or "9999-12-31") if r.get("rrule") else str(r.get("end_date") or d)
+        return (str(r["id"]), d, d_end[:10], str(r.get(k_col) or ""),
+                r.get("student_initials") or "", json.dumps(r, default=str))
+
+    def _index(self, table, rows):
+        self.db.executemany("insert into search_docs values (?,?,?,?,?,?,?)",
+                            [(table, str(r["id"])) + search_doc(table, r) for r in rows])
+
+    def refresh(self, table):
+        """Copy `table` from Supabase in full, replacing the local rows in one transaction."""
+        started = self.tried_at[table] = time.time()
+        try:
+            rows, page = [], 0
+            fields = REPLICA_TABLES[table][2]
+            while True:
+                chunk = recurring(lambda recur: supabase.table(table)
+                                  .select(ev_cols(fields, recur and table == "clc_events")).order("id")
+                                  .range(page * SYNC_PAGE, (page + 1) * SYNC_PAGE - 1).execute().data)
+                rows += chunk; page += 1
+                if len(chunk) < SYNC_PAGE: break
+            with self.lock, self.db:
+                # Writes applied since the fetch started are newer than the snapshot: keep them
+                later = {i: w for i, w in self.written[table].items() if w[0] >= started}
+                self.written[table] = later
+                rows = ([r for r in rows if str(r["id"]) not in later]
+                        + [r for _, r in later.values() if r is not None])
+                self.db.execute(f"delete from {table}")
+                self.db.executemany(f"insert into {table} values (?,?,?,?,?,?)", [self._record(table, r) for r in rows])
+                self.db.execute("delete from search_docs where tbl = ?", (table,))
+                self._index(table, rows)
+                self.db.execute("insert or replace into replica_meta values (?,?)", (table, time.time()))
+            self.refreshed_at[table] = time.time()
+            self.errors.pop(table, None)
+        except Exception as e:
+            self.errors[table] = e
+        finally:
+            self.in_flight.discard(table)
+
+    def ensure_fresh(self):
+        """Refresh stale tables in the background; a table never copied is loaded now, once."""
+        for t in REPLICA_TABLES:
+            if t in self.in_flight:
+                continue
+            if t not in self.refreshed_at and t not in self.tried_at:
+                self.refresh(t)
+            elif time.time() - max(self.refreshed_at.get(t, 0), self.tried_at.get(t, 0)) > REPLICA_REFRESH:
+                self.in_flight.add(t)
+                db_pool.submit(self.refresh, t)
+
+    def oldest(self):
+        return min(self.refreshed_at.values()) if self.refreshed_at else None
+
+    def rows(self, table, windows=None, initials=None, ids=None):
+        sql, args = f"select row from {table} where 1=1", []
+        if windows is not None:
+            sql += " and (" + " or ".join("(d <= ? and d_end >= ?)" for _ in windows) + ")"
+            for a, b in windows: args += [str(b), str(a)]
+        if initials:
+            sql += " and initials = ?"; args.append(initials)
+        if ids is not None:
+            sql += f" and id in ({','.join('?' * len(ids))})"; args += [str(i) for i in ids]
+        with self.lock:
+            return [json.loads(r) for (r,) in self.db.execute(sql + " order by d, k", args)]
+
+    def apply(self, table, rows=(), deleted=()):
+        with self.lock, self.db:
+            now = time.time()
+            self.written[table].update({str(r["id"]): (now, r) for r in rows})
+            self.written[table].update({str(i): (now, None) for i in deleted})
+            self.db.executemany(f"insert or replace into {table} values (?,?,?,?,?,?)",
+                                [self._record(table, r) for r in rows])
+            self.db.executemany(f"delete from {table} where id = ?", [(str(i),) for i in deleted])
+            self.db.executemany("delete from search_docs where tbl = ? and row_id = ?",
+                                [(table, str(i)) for i in [r["id"] for r in rows] + list(deleted)])
+            self._index(table, rows)
+
+    def search(self, q, limit, offset):
+        """Ranked matches for the words of `q` (all must appear), in calendar_search()'s row shape."""
+        words = re.findall(r"\w+", q)
+        if not words: return []
+        with self.lock:
+            hits = self.db.execute(
+                "select d.tbl, d.row_id, d.title, d.day, d.initials, snippet(search_fts, 2, '⟦', '⟧', '…', 16), "
+                "bm25(search_fts, 4.0, 2.0, 1.0) as score from search_fts join search_docs d on d.rowid = search_fts.rowid "
+                "where search_fts match ? order by score, d.day desc limit ? offset ?",
+                (" ".join(f'"{w}"' for w in words), limit, offset)).fetchall()
+        return [{"kind": SEARCH_KINDS[t], "id": f"pac_{i}" if t == "pac_meetings" else i, "title": title,
+                 "day": day or None, "student_initials": ini, "snippet": snip, "rank": -score}
+                for t, i, title, day, ini, snip, score in hits]
 
-def fmt_date(d):
-    try: return datetime.strptime(str(d)[:10], "%Y-%m-%d").strftime("%-d %B %Y")
-    except: return str(d)[:10]
+@st.cache_resource
+def init_replica(path) -> Replica:
+    return Replica(path)
+replica = init_replica(REPLICA_PATH) if REPLICA_PATH else None
+
+# ─── DELTA SYNC ─────────────────────────────────────────────────────────────────
+# Optional (secret CLC_SYNC_MODE = "delta", needs sql/002_delta_sync.sql): keep a
+# process-wide copy of clc_events and pac_meetings and on each rerun ask only for
+# rows whose updated_at moved past our watermark, plus the tombstones of deleted
+# rows. Views then read the local copy instead of running range queries.
+try:
+    SYNC_MODE = st.secrets["CLC_SYNC_MODE"] == "delta"
+except Exception:
+    SYNC_MODE = False
+SYNC_MIN_INTERVAL = 3                       # seconds between polls
+SYNC_OVERLAP      = timedelta(seconds=5)    # re-read behind the watermark for late commits
+SYNC_FULL_EVERY   = 3600                    # full reload now and then (pruned tombstones)
+SYNC_PAGE         = 1000
+
+class TableMirror:
+    def __init__(self, table, date_col, fields, model=dict):
+        self.table, self.date_col, self.fields, self.model = table, date_col, fields, model
+        self.lock    = threading.Lock()   # guards the rows and marks below
+        self.polling = threading.Lock()   # one poll at a time
+        self.reset()
+
+    def reset(self):
+        self.rows       = {}       # str(id) -> row
+        self.watermark  = None     # newest updated_at seen
+        self.tomb_mark  = None     # newest calendar_tombstones.id seen
+        self.loaded_at  = 0.0
+        self.synced_at  = 0.0
+        self.stale      = True
+        self._sorted    = None     # [(date, id)] rebuilt after changes
+        self._max_span  = 0        # longest event_date..end_date span, in days
+        self._series    = []       # ids of series rows (rrule), matched by repeat span instead
+
+    def mark_stale(self):
+        self.stale = True
+
+    def sync(self):
+        # The pull runs outside self.lock, so in_windows keeps serving the rows held, and
+        # its result is only swapped in once all of it has arrived: a failed poll or full
+        # reload leaves the mirror as it was. While another session polls, serve as is.
+        if not self.polling.acquire(blocking=not self.loaded_at): return
+        try:
+            now = time.monotonic()
+            if not self.loaded_at or now - self.loaded_at > SYNC_FULL_EVERY:
+                self.stale = False
+                self._reload(now)
+            elif self.stale or now - self.synced_at >= SYNC_MIN_INTERVAL:
+                self.stale = False
+                self._poll()
+        except Exception:
+            self.stale = True
+            raise
+        finally:
+            self.polling.release()
+
+    def _reload(self, now):
+        # The tombstone mark is read first, so deletes that race the full read are still seen
+        last = (supabase.table("calendar_tombstones").select("id")
+                .order("id", desc=True).limit(1).execute().data)
+        page = self._pull_changes(None)
+        rows = {str(r["id"]): self.model(r) for r in page}
+        with self.lock:
+            self.rows, self.tomb_mark = rows, last[0]["id"] if last else 0
+            self.watermark = max((r["updated_at"] for r in page), default=None)
+            self.loaded_at = self.synced_at = now
+            self._sorted = None
+
+    def _poll(self):
+        gone = self._pull_tombstones(self.tomb_mark)
+        page = self._pull_changes(self.watermark)
+        with self.lock:
+            for t in gone:
+                self.rows.pop(str(t["row_id"]), None)
+            for r in page:
+                self.rows[str(r["id"])] = self.model(r)
+                if not self.watermark or r["updated_at"] > self.watermark:
+                    self.watermark = r["updated_at"]
+            if gone: self.tomb_mark = gone[-1]["id"]
+            if gone or page: self._sorted = None
+            self.synced_at = time.monotonic()
+
+    def _pull_changes(self, watermark):
+        if self.table == "clc_events":
+            return recurring(lambda recur: self._pull(self.fields + RECUR_FIELDS if recur else self.fields, watermark))
+        return self._pull(self.fields, watermark)
+
+    def _pull(self, fields, watermark):
+        since = (datetime.fromisoformat(watermark) - SYNC_OVERLAP).isoformat() if watermark else None
+        out, last = [], None
+        while True:
+            q = (supabase.table(self.table).select(cols(fields + ["updated_at"]))
+                 .order("updated_at").order("id").limit(SYNC_PAGE))
+            if last:
+                q = q.or_(f'updated_at.gt."{last[0]}",and(updated_at.eq."{last[0]}",id.gt.{last[1]})')
+            elif since:
+                q = q.gte("updated_at", since)
+            page = q.execute().data
+            out += page
+            if len(page) < SYNC_PAGE: return out
+            last = (page[-1]["updated_at"], page[-1]["id"])
+
+    def _pull_tombstones(self, mark):
+        out = []
+        while True:
+            page = (supabase.table("calendar_tombstones").select("id,row_id")
+                    .eq("table_name", self.table).gt("id", mark)
+                    .order("id").limit(SYNC_PAGE).execute().data)
+            out += page
+            if len(page) < SYNC_PAGE: return out
+            mark = page[-1]["id"]
+
+    def get(self, row_id):
+        return self.rows.get(str(row_id))
+
+    def in_windows(self, windows):
+        """Rows active on any day of `windows`, then the series rows overlapping them."""
+        with self.lock:
+            if self._sorted is None:
+                self._sorted = sorted((str(r.get(self.date_col) or "")[:10], k) for k, r in self.rows.items())
+                self._max_span = max([span_days(r.get(self.date_col), r.get("end_date"))
+                                      for r in self.rows.values()] or [0])
+                self._series = [k for k, r in self.rows.items() if r.get("rrule")]
+            srt, rows, reach, series = self._sorted, self.rows, timedelta(days=self._max_span), self._series
+        out, seen = [], set()
+        for a, b in windows:
+            lo = bisect_left(srt, (str(a - reach),))
+            hi = bisect_left(srt, (str(b + timedelta(days=1)),))
+            for _, k in srt[lo:hi]:
+                r = rows.get(k)
+                if r and k not in seen and str(r.get("end_date") or r.get(self.date_col))[:10] >= str(a):
+                    seen.add(k); out.append(r)
+        if series and windows:
+            lo, hi = str(min(a for a, _ in windows)), str(max(b for _, b in windows))
+            for k in series:
+                r = rows.get(k)
+                if (r and k not in seen and str(r.get(self.date_col))[:10] <= hi
+                        and str(r.get("repeat_until") or "9999-12-31")[:10] >= lo):
+                    seen.add(k); out.append(r)
+        return out
 
-def fmt_time(t):
-    if not t: return ""
-    try: return datetime.strptime(str(t)[:5], "%H:%M").strftime("%-I:%M %p")
-    except: return str(t)[:5]
+@st.cache_resource
+def init_mirrors():
+    return {"clc_events":   TableMirror("clc_events", "event_date", EV_FULL, Event),
+            "pac_meetings": TableMirror("pac_meetings", "meeting_date", PAC_FIELDS)}
+mirrors = init_mirrors() if SYNC_MODE and not replica else {}
+
+def record_write(table, rows=(), deleted=(), **kw):
+    """After a write: drop affected cached reads, poll the mirror and update the replica."""
+    qcache.invalidate(table, **kw)
+    if table in ("clc_events", "pac_meetings"):
+        qcache.invalidate("clc_calendar_feed", **kw)
+        # Count rows carry no ids: a write to a known row may have moved it off days
+        # outside `span`, so that drops every count
+        qcache.invalidate("calendar_day_counts", span=None if kw.get("ids") else kw.get("span"))
+    qcache.invalidate("calendar_search")
+    if table in mirrors: mirrors[table].mark_stale()
+    if replica: replica.apply(table, rows or (), deleted)
+
+# ─── EVENT STORE ────────────────────────────────────────────────────────────────
+# Every view needs clc_events + pac_meetings for some date window. Rather than each
+# view querying on its own, the windows for this rerun are merged up front, loaded in
+# one pass, and each view takes an in-memory slice of the result. Each window carries
+# the fields its view declared in VIEW_FIELDS, so free-text columns only travel for
+# the views that actually show them.
+def merge_windows(windows):
+    out = []
+    for a, b in sorted((min(a, b), max(a, b)) for a, b in windows):
+        if out and a <= out[-1][1] + timedelta(days=1):
+            out[-1] = (out[-1][0], max(out[-1][1], b))
+        else:
+            out.append((a, b))
+    return out
+
+def subtract_windows(windows, covered):
+    """Parts of `windows` not inside any of the (merged) `covered` windows."""
+    out = []
+    for a, b in windows:
+        for c, d in covered:
+            if d < a or c > b: continue
+            if c > a: out.append((a, c - timedelta(days=1)))
+            a = d + timedelta(days=1)
+            if a > b: break
+        if a <= b: out.append((a, b))
+    return out
+
+def remote_reads():
+    """True when reads go straight to Supabase (no local replica or delta-sync mirror)."""
+    return not replica and not SYNC_MODE
+
+def agenda_paged():
+    """The Agenda pages through the feed itself rather than taking a store window."""
+    return remote_reads() and not feed_state["missing"]
+
+def view_windows():
+    """(from, to, fields) for the today strip and the view on screen this rerun."""
+    ss  = st.session_state
+    out = [(today, today, VIEW_FIELDS["today"])]
+    if ss.view == "month":
+        yr, mo = ss.cal_year, ss.cal_month
+        fd  = date(yr, mo, 1)
+        ld  = date(yr, mo, calendar.monthrange(yr, mo)[1])
+        out += [(fd - timedelta(days=7), ld + timedelta(days=7), VIEW_FIELDS["month"]),
+                (ss.selected_date, ss.selected_date, VIEW_FIELDS["day"])]
+    elif ss.view == "week":
+        ws  = ss.cal_week_start
+        out += [(ws, ws + timedelta(days=6), VIEW_FIELDS["week"]),
+                (ss.selected_date, ss.selected_date, VIEW_FIELDS["day"])]
+    elif ss.view == "agenda" and not agenda_paged():
+        out += [(ss.get("ls", today), ss.get("le", today + timedelta(weeks=8)), VIEW_FIELDS["agenda"])]
+    elif ss.view == "clashes":
+        out += [(*term_range(ss.get("cl_term", today))[:2], VIEW_FIELDS["clashes"])]
+    elif ss.view == "students" and ss.sv == "timeline":
+        out += [(ss.get("g_from", today - timedelta(days=today.weekday())),
+                 ss.get("g_to", today + timedelta(weeks=8)), VIEW_FIELDS["gantt"])]
+    elif ss.view == "students" and ss.sv == "meetings":
+        out += [(ss.get("m_from", today), ss.get("m_to", today + timedelta(weeks=12)), VIEW_FIELDS["meetings"])]
+    return out
+
+def _ev_key(ev):
+    return (ev.day, ev.start is not None, ev.start or dtime.min)   # untimed first
+
+def load_store(windows, also=()):
+    """Load the rerun's windows, one read per field set, in parallel with the reads in `also`."""
+    if SYNC_MODE and not replica:
+        return load_store_synced(windows, also)
+    use_feed = not replica and not feed_state["missing"]
+    groups = {}
+    for a, b, fields in windows:
+        groups.setdefault(frozenset(fields), []).append((a, b))
+    jobs, done, loaded = [], [], []
+    for fields in sorted(groups, key=len, reverse=True):
+        wins = merge_windows(groups[fields])
+        loaded += [(a, b, fields) for a, b in wins]
+        covered = merge_windows([(a, b) for a, b, f in done if fields <= f])
+        todo = subtract_windows(wins, covered)
+        done += [(a, b, fields) for a, b in wins]
+        if todo:
+            jobs.append(partial(db_feed if use_feed else db_events_in, todo, [f for f in EV_FULL if f in fields]))
+    n_ev = len(jobs)
+    if not use_feed:
+        jobs.append(partial(db_pac, merge_windows([(a, b) for a, b, f in windows])))
+    results, errors = run_parallel(jobs + list(also))
+    if use_feed and any(feed_missing(e) for e in errors[:n_ev]):
+        feed_state["missing"] = True
+        return load_store(windows, also)
+    rows = {}
+    for res in results[:n_ev]:
+        for ev in res or []:
+            rows[ev.id] = rows[ev.id].merged(ev) if ev.id in rows else ev
+    evs = list(rows.values())
+    if not use_feed:
+        evs += pac_events(results[n_ev] or [])
+    return make_store(evs, loaded, [e for e in errors[:len(jobs)] if e is not None])
+
+def load_store_synced(windows, also=()):
+    """load_store for delta-sync mode: poll both mirrors for changes, then read locally."""
+    wins = merge_windows([(a, b) for a, b, f in windows])
+    results, errors = run_parallel([partial(db_read, m.sync) for m in mirrors.values()] + list(also))
+    for (t, m), e in zip(mirrors.items(), errors):
+        if isinstance(e, DbUnavailable) and m.rows: stale_tables.add(t)   # keep serving the copy
+    evs  = expand_series(mirrors["clc_events"].in_windows(wins), wins) + pac_events(mirrors["pac_meetings"].in_windows(wins))
+    return make_store(evs, [(a, b, frozenset(EV_FULL)) for a, b in wins],
+                      [e for (t, _), e in zip(mirrors.items(), errors) if e is not None and t not in stale_tables])
+
+def make_store(events, windows, errors):
+    events = sorted(as_events(events), key=_ev_key)
+    return {"windows": windows, "events": events, "keys": [e.day for e in events],
+            "max_span": max([(e.last - e.day).days for e in events] or [0]),
+            "errors": errors}
+
+def store_slice(store, d_from, d_to, fields, pac=True):
+    """Events active between d_from and d_to with at least `fields`, served from the store."""
+    d_from, d_to = min(d_from, d_to), max(d_from, d_to)
+    if not any(a <= d_from and d_to <= b and set(fields) <= f for a, b, f in store["windows"]):
+        # Window nobody declared up front — fetch it once and fold it into the store
+        extra = load_store([(d_from, d_to, fields)])
+        store["errors"] += extra["errors"]
+        merged = {e.id: e for e in store["events"]}
+        for e in extra["events"]:
+            merged[e.id] = merged[e.id].merged(e) if e.id in merged else e
+        store.update(make_store(merged.values(), store["windows"] + extra["windows"], store["errors"]))
+    # Only events starting within max_span days before d_from can still be running
+    lo  = bisect_left(store["keys"], d_from - timedelta(days=store["max_span"]))
+    hi  = bisect_right(store["keys"], d_to)
+    out = [e for e in store["events"][lo:hi] if e.last >= d_from]
+    return out if pac else [e for e in out if not str(e.id).startswith("pac_")]
+
+AGENDA_PAGE = 50
+
+def agenda_events(store, d_from, d_to, types, pages):
+    """(events, has_more) for the first `pages` agenda pages between d_from and d_to."""
+    d_from, d_to = min(d_from, d_to), max(d_from, d_to)
+    types = None if set(types) >= set(EVENT_TYPES) else sorted(types)
+    if not agenda_paged():
+        evs = [e for e in store_slice(store, d_from, d_to, VIEW_FIELDS["agenda"])
+               if (types is None or e.get("event_type") in types) and e.day >= d_from]   # listed by start date
+        evs.sort(key=lambda e: (e.day, e.start is None, e.start or dtime.min))
+        return evs[:pages * AGENDA_PAGE], len(evs) > pages * AGENDA_PAGE
+    out, after, more = [], None, True
+    for _ in range(pages):
+        page = db_feed_page(d_from, d_to, types, after, AGENDA_PAGE, VIEW_FIELDS["agenda"])
+        out += page[:AGENDA_PAGE]
+        if len(page) <= AGENDA_PAGE:
+            more = False; break
+        last  = page[AGENDA_PAGE - 1]
+        after = (str(last.day), last.get("start_time"), str(last.id))
+    # Series occurrences up to where the feed pages reached, sorted in among them
+    occ = [e for e in db_series([(d_from, d_to)], VIEW_FIELDS["agenda"])
+           if (types is None or e.get("event_type") in types) and e.day >= d_from]
+    if more:
+        occ = [e for e in occ if _agenda_key(e) <= _agenda_key(out[-1])]
+    return sorted(out + occ, key=_agenda_key), more
+
+def _agenda_key(e):
+    return (e.day, e.start is None, e.start or dtime.min, str(e.id))
+
+def day_counts(d_from, d_to):
+    """({day: {(event_type, program): n}}, errors) for d_from..d_to."""
+    if remote_reads() and not feed_state["missing"] and not feed_state["counts_missing"]:
+        try:
+            rows = db_day_counts(d_from, d_to)
+        except DbUnavailable:
+            raise
+        except Exception as e:
+            if "calendar_day_counts" not in str(e): raise
+            feed_state["counts_missing"] = True
+        else:
+            out = {}
+            for r in rows:
+                out.setdefault(date.fromisoformat(str(r["day"])[:10]), {})[(r["event_type"], r["program"] or "")] = r["n"]
+            # Series rows aren't counted by the function; add their occurrences
+            return add_counts(out, db_series([(d_from, d_to)], EV_CHIP), d_from, d_to), []
+    loaded = load_store([(d_from, d_to, EV_CHIP)])
+    return add_counts({}, loaded["events"], d_from, d_to), loaded["errors"]
+
+def add_counts(out, events, d_from, d_to):
+    for d, evs in DayIndex(events, d_from, d_to).days.items():
+        c = out.setdefault(d, {})
+        for ev in evs:
+            k = (ev.get("event_type") or "Other", ev.get("program") or "")
+            c[k] = c.get(k, 0) + 1
+    return out
+
+def search_calendar(q, page):
+    """(rows, more) for page `page` of matches for `q`; rows is None until search is set up."""
+    q = " ".join(q.split())
+    if replica:
+        rows = replica.search(q, SEARCH_PAGE + 1, page * SEARCH_PAGE)
+    elif feed_state["search_missing"]:
+        return None, False
+    else:
+        try:
+            rows = db_search(q, page)
+        except DbUnavailable:
+            raise
+        except Exception as e:
+            if "calendar_search" not in str(e): raise
+            feed_state["search_missing"] = True
+            return None, False
+    return rows[:SEARCH_PAGE], len(rows) > SEARCH_PAGE
+
+def search_target(r):
+    """(day, event id) a search hit opens in the Month view; a series at its next occurrence."""
+    d = date.fromisoformat(str(r["day"])[:10])
+    if r["kind"] != "event":
+        return d, r["id"]
+    try: ev = db_event_one(r["id"])
+    except DbUnavailable: ev = None
+    occ = next_occurrence(ev, today) if ev and ev.get("rrule") else None
+    return (occ.day, occ.id) if occ else (d, r["id"])
+
+def span_days(d_from, d_to):
+    try: return (date.fromisoformat(str(d_to)[:10]) - date.fromisoformat(str(d_from)[:10])).days if d_to else 0
+    except ValueError: return 0
+
+class DayIndex:
+    """Events keyed by every day of one window they are active on."""
+    def __init__(self, events, d_from, d_to):
+        self.d_from, self.d_to = d_from, d_to
+        self.days = {}
+        for ev in events:
+            d, last = max(ev.day, d_from), min(ev.last, d_to)
+            while d <= last:
+                self.days.setdefault(d, []).append(ev)
+                d += timedelta(days=1)
+
+    def on(self, d):
+        return self.days.get(d, [])
+
+    def overlapping(self, d_from, d_to):
+        out, seen = [], set()
+        d, last = max(d_from, self.d_from), min(d_to, self.d_to)
+        while d <= last:
+            for ev in self.days.get(d, ()):
+                if id(ev) not in seen:
+                    seen.add(id(ev)); out.append(ev)
+            d += timedelta(days=1)
+        return out
 
 def select_day(d):
     st.session_state.selected_date = d
     st.session_state.edit_event_id = None
 
-def save_event(d):
-    supabase.table("clc_events").insert({
+def event_row(d):
+    """clc_events row for the dict event_form returns (also the bulk-import row shape)."""
+    row = {
         "title": d["title"].strip(), "event_type": d["etype"],
         "event_date": str(d["ev_date"]),
         "end_date": str(d["end_date"]) if d["end_date"] and d["end_date"] != d["ev_date"] else None,
@@ -153,27 +1288,542 @@ def save_event(d):
         "end_time": str(d["end_t"]) if d["end_t"] else None,
         "location": d["location"].strip(), "added_by": d["who"].strip(), "notes": d["notes"].strip(),
         "program": d.get("program",""), "student_initials": d.get("student_initials",""),
-    }).execute()
+    }
+    if "rrule" in d:   # the form only asks once the series columns exist
+        row = _repeating(row, d["ev_date"], d["rrule"])
+    return row
+
+def _repeating(row, start, rule):
+    """`row` moved to begin on `start`, keeping its length, and repeating by `rule` ("" = not)."""
+    d0, d1 = to_date(row["event_date"]), to_date(row.get("end_date"))
+    start  = to_date(start)
+    until  = series_until(start, rule) if rule else None
+    return {**row, "event_date": str(start), "end_date": str(start + (d1 - d0)) if d1 else None,
+            "rrule": rule or None, "repeat_until": str(until) if until else None}
+
+def save_event(d):
+    row = event_row(d)
+    clashes = clashes_for(row)
+    res = supabase.table("clc_events").insert(row).execute()
+    # A new series can show up in any window, so it drops every cached read
+    record_write("clc_events", rows=res.data, **({} if row.get("rrule") else {"span": _span(d["ev_date"], d["end_date"])}))
+    note_clashes(clashes)
 
 def upd_event(ev_id, d):
-    supabase.table("clc_events").update({
-        "title": d["title"].strip(), "event_type": d["etype"],
-        "event_date": str(d["ev_date"]),
-        "end_date": str(d["end_date"]) if d["end_date"] and d["end_date"] != d["ev_date"] else None,
-        "start_time": str(d["start_t"]) if d["start_t"] else None,
-        "end_time": str(d["end_t"]) if d["end_t"] else None,
-        "location": d["location"].strip(), "added_by": d["who"].strip(), "notes": d["notes"].strip(),
-        "program": d.get("program",""), "student_initials": d.get("student_initials",""),
-    }).eq("id", ev_id).execute()
+    sid, occ = split_occurrence(ev_id)
+    row = event_row(d)
+    if occ and d.get("scope", "this") == "this":
+        row["rrule"] = None   # saved as a one-off in the series' place
+    clashes = clashes_for(row, skip=(ev_id, sid))
+    if occ:
+        upd_occurrence(sid, occ, d)
+    else:
+        res = supabase.table("clc_events").update(row).eq("id", ev_id).execute()
+        record_write("clc_events", rows=res.data,
+                     **({} if row.get("rrule") else {"span": _span(d["ev_date"], d["end_date"]), "ids": [ev_id]}))
+    note_clashes(clashes)
 
-def del_event(ev_id):
+def del_event(ev_id, scope="this"):
+    """Delete an event; for an occurrence of a series, `scope` is one of SERIES_SCOPES."""
     try:
-        result = supabase.table("clc_events").delete().eq("id", str(ev_id)).execute()
+        sid, occ = split_occurrence(ev_id)
+        if occ:
+            del_occurrence(sid, occ, scope)
+        else:
+            supabase.table("clc_events").delete().eq("id", str(ev_id)).execute()
+            record_write("clc_events", ids=[ev_id], deleted=[ev_id])
         return True
     except Exception as e:
         st.error(f"Could not delete event: {e}")
         return False
 
+# Changes to one occurrence of a series. "this" leaves an override row and skips the
+# date in the series; "future" ends the series the day before and starts a new one;
+# "all" changes the series row itself. Every series write drops all cached reads.
+def _series_row(sid):
+    ev = db_event_one(sid)
+    if not ev or not ev.get("rrule"):
+        raise ValueError("this repeating event no longer exists")
+    return ev
+
+def _skip_date(series, occ):
+    skip = sorted({str(to_date(x)) for x in series.get("exdates") or ()} | {str(occ)})
+    return supabase.table("clc_events").update({"exdates": skip}).eq("id", series.id).execute().data
+
+def _end_series(series, occ):
+    r = parse_rrule(series["rrule"])
+    r["COUNT"], r["UNTIL"] = None, occ - timedelta(days=1)
+    return (supabase.table("clc_events")
+            .update({"rrule": format_rrule(r), "repeat_until": str(r["UNTIL"]),
+                     "exdates": [str(x) for x in series.get("exdates") or () if to_date(x) < occ]})
+            .eq("id", series.id).execute().data)
+
+def upd_occurrence(sid, occ, d):
+    """Save the edit form for the occurrence of series `sid` on `occ`, as d["scope"] says."""
+    series, scope, row = _series_row(sid), d.get("scope", "this"), event_row(d)
+    if scope == "this":
+        row.update(rrule=None, repeat_until=None, recurrence_id=str(series.id), recurrence_date=str(occ))
+        written = supabase.table("clc_events").insert(row).execute().data + _skip_date(series, occ)
+    elif scope == "all" or occ <= series.day:
+        # The series keeps its own start, moved as far as this occurrence was
+        row = _repeating(row, series.day + (to_date(d["ev_date"]) - occ), row["rrule"])
+        written = supabase.table("clc_events").update(row).eq("id", series.id).execute().data
+    else:
+        if row["rrule"] == series["rrule"]:
+            row = _repeating(row, d["ev_date"], rrule_from(series["rrule"], series.day, occ))
+        row["exdates"] = [str(x) for x in series.get("exdates") or () if to_date(x) >= occ]
+        new = supabase.table("clc_events").insert(row).execute().data
+        written = new + _end_series(series, occ)
+        if new:   # overrides from then on belong to the new series
+            written += (supabase.table("clc_events").update({"recurrence_id": str(new[0]["id"])})
+                        .eq("recurrence_id", str(series.id)).gte("recurrence_date", str(occ)).execute().data)
+    record_write("clc_events", rows=written)
+
+def del_occurrence(sid, occ, scope):
+    series, written, gone = _series_row(sid), [], []
+    if scope == "this":
+        written = _skip_date(series, occ)
+    elif scope == "all" or occ <= series.day:
+        gone  = [r["id"] for r in supabase.table("clc_events").delete()
+                 .eq("recurrence_id", str(series.id)).execute().data]
+        gone += [r["id"] for r in supabase.table("clc_events").delete().eq("id", series.id).execute().data]
+    else:
+        gone    = [r["id"] for r in supabase.table("clc_events").delete()
+                   .eq("recurrence_id", str(series.id)).gte("recurrence_date", str(occ)).execute().data]
+        written = _end_series(series, occ)
+    record_write("clc_events", rows=written, deleted=gone)
+
+# ─── CLASHES ────────────────────────────────────────────────────────────────────
+# Two events clash when they book the same location at overlapping times, or when a
+# Planned Staff Absence overlaps a meeting the absent person is in. Events carry no
+# attendee list: the absent person is the absence's "Added by", and they are in a
+# meeting if it is a whole-staff one or names them in its title or "Added by".
+# find_clashes sweeps the events once in start order; each location and absent person
+# keeps a heap of its events still running, so the cost is O(n log n) plus the clashes.
+ABSENCE_TYPE      = "Planned Staff Absence"
+ALL_STAFF_TYPES   = {"Staff Meeting", "PD / Professional Dev"}
+MEETING_TYPES     = ALL_STAFF_TYPES | {"Team Meeting", "Excursion / Event", "PAC Meeting"} | set(STUDENT_MEETING_TYPES)
+UNBOOKED_TYPES    = {ABSENCE_TYPE, "Staff Birthday", "Student Placement"}   # a location here isn't a booking
+CLASH_LENGTH      = timedelta(hours=1)  # assumed length of an event with a start time but no end time
+CLASH_SERIES_DAYS = 92                  # a new or edited series is checked this far ahead
+CLASH_NOTICE_MAX  = 5                   # clashes listed after a save
+
+def clash_span(ev):
+    """(start, end) datetimes `ev` occupies: its times, or whole days if it has none."""
+    if ev.start is None:
+        return datetime.combine(ev.day, dtime.min), datetime.combine(ev.last + timedelta(days=1), dtime.min)
+    a = datetime.combine(ev.day, ev.start)
+    b = datetime.combine(ev.last, ev.end) if ev.end else None
+    return a, (b if b and b > a else a + CLASH_LENGTH)
+
+def _norm(v):
+    return " ".join(str(v or "").split()).casefold()
+
+def clash_keys(ev, absent):
+    """(key, role) pairs `ev` is swept under."""
+    etype, out = ev.get("event_type") or "Other", []
+    room = _norm(ev.get("location"))
+    if room and etype not in UNBOOKED_TYPES:
+        out.append((("room", room), "booking"))
+    if etype == ABSENCE_TYPE and (who := _norm(ev.get("added_by"))):
+        out.append((("away", who), "absence"))
+    elif etype in MEETING_TYPES:
+        text = f"{ev.get('title') or ''} {ev.get('added_by') or ''}"
+        out += [(("away", who), "meeting") for who, pat in absent.items()
+                if etype in ALL_STAFF_TYPES or pat.search(text)]
+    return out
+
+def find_clashes(events):
+    """Every clashing pair in `events` as (key, a, b, start, end)."""
+    absent = {}
+    for ev in events:
+        if ev.get("event_type") == ABSENCE_TYPE and (who := _norm(ev.get("added_by"))):
+            absent[who] = re.compile(rf"(?<!\w){re.escape(who)}(?!\w)", re.I)
+    items = sorted((*clash_span(ev), n, ev) for n, ev in enumerate(events) if ev.day != date.min)
+    running, out = {}, []
+    for a, b, n, ev in items:
+        for key, role in clash_keys(ev, absent):
+            heap = running.setdefault(key, [])
+            while heap and heap[0][0] <= a:   # ended before this one starts
+                heappop(heap)
+            out += [(key, other, ev, a, min(b, end)) for end, _, other, r in heap if role == "booking" or r != role]
+            heappush(heap, (b, n, ev, role))
+    return out
+
+def clash_when(a, b):
+    """"9:00 AM – 10:00 AM" for an overlap within a day, "" for whole days."""
+    if a.time() == dtime.min and b.time() == dtime.min:
+        return ""
+    return f"{fmt_time(a.time())} – {fmt_time(b.time())}" if a.date() == b.date() else f"from {fmt_time(a.time())}"
+
+def clash_text(c, dated=False):
+    (kind, _), x, y, a, b = c
+    when = ", ".join(filter(None, [a.strftime("%a %-d %b") if dated else "", clash_when(a, b)]))
+    when = f" ({when})" if when else ""
+    if kind == "room":
+        return f"📍 {' '.join(x.get('location').split())} is booked twice{when}: '{x.get('title')}' and '{y.get('title')}'"
+    away, mtg = (x, y) if x.get("event_type") == ABSENCE_TYPE else (y, x)
+    return f"🏠 {away.get('added_by')} is away ('{away.get('title')}') during '{mtg.get('title')}'{when}"
+
+def day_clashes(events, d):
+    d0 = datetime.combine(d, dtime.min)
+    return [c for c in find_clashes(events) if c[3] < d0 + timedelta(days=1) and c[4] > d0]
+
+def clash_warning(events, d):
+    found = day_clashes(events, d)
+    if found:
+        st.warning("⚠️ **Clashes on this day**\n\n" + "\n".join(f"- {clash_text(c)}" for c in found))
+
+def clashes_for(row, skip=()):
+    """Clashes the clc_events `row` would have once saved; `skip` are ids it replaces."""
+    new = Event({**row, "id": row.get("id") or "new"})
+    if row.get("rrule"):
+        end = min(to_date(row.get("repeat_until")) or date.max, new.day + timedelta(days=CLASH_SERIES_DAYS))
+        mine = expand_series([new], [(new.day, end)])
+    else:
+        mine = [new]
+    wins = merge_windows([(e.day, e.last) for e in mine if e.day != date.min])
+    if not wins:
+        return []
+    skip  = {str(x) for x in skip}
+    other = [e for e in load_store([(a, b, VIEW_FIELDS["clashes"]) for a, b in wins])["events"]
+             if str(e.id) not in skip and str(e.get("series_id")) not in skip]
+    ids = {id(e) for e in mine}
+    return [c for c in find_clashes(mine + other) if (id(c[1]) in ids) != (id(c[2]) in ids)]
+
+def note_clashes(clashes):
+    """Keep the clashes a save found to show on the page after it reruns."""
+    notes = [clash_text(c, dated=True) for c in sorted(clashes, key=lambda c: c[3])[:CLASH_NOTICE_MAX]]
+    if len(clashes) > CLASH_NOTICE_MAX:
+        notes.append(f"… and {len(clashes) - CLASH_NOTICE_MAX} more — see ⚠️ Clashes")
+    if notes:
+        st.session_state.clash_notice = notes
+
+def term_range(d):
+    """(first day, last day, "Term 3 2026") of the school term `d` is in."""
+    starts = [date(y, m, dd) for y in (d.year - 1, d.year, d.year + 1) for m, dd in TERM_STARTS]
+    i = bisect_right(starts, d) - 1
+    return starts[i], starts[i + 1] - timedelta(days=1), f"Term {i % 4 + 1} {starts[i].year}"
+
+# ─── EVENT HTML ─────────────────────────────────────────────────────────────────
+# Chip and card markup is memoized in a bounded LRU. The key is the renderer plus the
+# values of the columns it reads (id first), so an event that hasn't changed is redrawn
+# from the cache and an edit gets a fresh entry.
+HTML_MEMO_MAX = 5000
+
+class HtmlMemo:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()   # (renderer, values) -> html
+        self.lock    = threading.Lock()
+
+    def get(self, key, render):
+        with self.lock:
+            html = self.entries.get(key)
+            if html is not None:
+                self.entries.move_to_end(key)
+                return html
+        html = render()
+        with self.lock:
+            self.entries[key] = html
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return html
+
+@st.cache_resource
+def init_html_memo() -> HtmlMemo:
+    return HtmlMemo(HTML_MEMO_MAX)
+html_memo = init_html_memo()
+
+def memo_html(*fields):
+    """Memoize an `ev -> html` renderer on the `fields` it reads."""
+    def deco(fn):
+        @wraps(fn)
+        def render(ev):
+            key = (fn.__name__,) + tuple(ev.get(f) for f in fields)
+            return html_memo.get(key, partial(fn, ev))
+        return render
+    return deco
+
+@memo_html("id", "event_type", "program", "title", "student_initials", "start_time")
+def today_chip_html(ev):
+    s = ev_style(ev)
+    t = ev.time_label
+    init  = ev.get("student_initials","")
+    label = ev.get("title","") + (f" ({init})" if init else "")
+    return (f'<span style="background:{s["bg"]};color:{s["color"]};border-radius:6px;padding:0.2rem 0.6rem;'
+            f'font-size:0.78rem;font-weight:500;">{s["emoji"]} {label}{("  "+t) if t else ""}</span>')
+
+@memo_html("id", "event_type", "program", "title", "student_initials")
+def month_chip_html(ev):
+    s = ev_style(ev)
+    lbl = ev.get("student_initials","") or ev.get("title","")
+    lbl = lbl[:10]+"…" if len(lbl)>10 else lbl
+    return (f"<div style='background:{s['bg']};color:{s['color']};border-radius:4px;"
+            f"padding:0.1rem 0.3rem;font-size:0.62rem;font-weight:600;"
+            f"margin-bottom:2px;overflow:hidden;text-overflow:ellipsis;"
+            f"white-space:nowrap;'>{s['emoji']} {escape(lbl)}</div>")
+
+@memo_html("id", "event_type", "program", "title", "student_initials", "start_time")
+def week_chip_html(ev):
+    s = ev_style(ev)
+    t     = ev.time_label
+    title = ev.get("student_initials","") or ev.get("title","")
+    short = title[:9]+"…" if len(title)>9 else title
+    return (f"<div style='background:{s['bg']};border-left:3px solid {s['color']};border-radius:4px;"
+            f"padding:0.15rem 0.3rem;margin-bottom:3px;font-size:0.68rem;'>"
+            f"<span style='font-weight:600;color:{s['color']};'>{s['emoji']} {escape(short)}</span>"
+            f"{f'<br><span style=chr(34)color:#777;font-size:0.62rem;{chr(34)}>{t}</span>' if t else ''}"
+            f"</div>")
+
+@memo_html("id", "event_type", "program", "title", "student_initials", "start_time", "end_time",
+           "location", "added_by")
+def day_card_html(ev):
+    s, tr = ev_style(ev), ev.time_range
+    return (f'<div class="ev-card" style="background:{s["bg"]};border-left-color:{s["color"]};">'
+            f'<h4 style="color:{s["color"]};margin:0 0 0.2rem;">{s["emoji"]} {ev.get("title","")}'
+            f'{(" · "+ev.get("student_initials","")) if ev.get("student_initials") else ""}</h4>'
+            f'<div class="meta">'
+            f'{(" ⏰ "+tr) if tr else ""}'
+            f'{(" 📍 "+ev.get("location","")) if ev.get("location") else ""}'
+            f'{(" 👤 "+ev.get("added_by","")) if ev.get("added_by") else ""}'
+            f'</div></div>')
+
+@memo_html("id", "event_type", "program", "title", "event_date", "end_date", "start_time", "end_time",
+           "location", "added_by", "notes", "rrule")
+def day_detail_html(ev):
+    s, tr = ev_style(ev), ev.time_range
+    prog  = ev.get("program","")
+    edate = ev.date_label
+    prog_badge = ""
+    if prog:
+        pc = PROGRAM_COLORS.get(prog,{})
+        prog_badge = (f'<span style="background:{pc.get("bg","#f3f4f6")};color:{pc.get("color","#374151")};'
+                      f'font-size:0.7rem;font-weight:700;padding:0.15rem 0.5rem;border-radius:20px;margin-left:6px;">{prog}</span>')
+    return (f'<div style="background:{s["bg"]};border:2px solid {s["color"]};border-radius:12px;'
+            f'padding:1rem 1.25rem;margin:0.25rem 0 0.75rem;box-shadow:0 3px 12px rgba(0,0,0,0.1);">'
+            f'<div style="font-weight:800;color:{s["color"]};font-size:1rem;margin-bottom:0.6rem;">'
+            f'{s["emoji"]} {ev.get("title","")}'
+            f'<span style="background:{s["color"]};color:white;font-size:0.68rem;font-weight:700;'
+            f'padding:0.15rem 0.5rem;border-radius:20px;margin-left:8px;">{ev.get("event_type","")}</span>'
+            f'{prog_badge}</div>'
+            f'<div style="display:grid;grid-template-columns:1fr 1fr;gap:0.4rem;font-size:0.84rem;color:#374151;">'
+            f'<div>📅 <b>Date:</b> {edate}</div>'
+            f'{f"<div>⏰ <b>Time:</b> {tr}</div>" if tr else "<div></div>"}'
+            f'{f"<div>🔁 <b>Repeats:</b> {escape(repeat_label(ev.get('rrule')))}</div><div></div>" if ev.get("rrule") else ""}'
+            f'{f"<div>📍 <b>Location:</b> {ev.get('location','')}</div>" if ev.get("location") else "<div></div>"}'
+            f'{f"<div>👤 <b>Added by:</b> {ev.get('added_by','')}</div>" if ev.get("added_by") else "<div></div>"}'
+            f'</div>'
+            f'{f'<div style="margin-top:0.5rem;font-size:0.84rem;color:#555;border-top:1px solid rgba(0,0,0,0.08);padding-top:0.4rem;">{ev.get("notes")}</div>' if ev.get("notes") else ""}'
+            f'</div>')
+
+@memo_html("id", "event_type", "program", "title", "student_initials", "start_time", "end_time",
+           "location", "added_by", "notes")
+def list_card_html(ev):
+    s, tr = ev_style(ev), ev.time_range
+    prog  = ev.get("program","")
+    init  = ev.get("student_initials","")
+    prog_html = ""
+    if prog:
+        pc = PROGRAM_COLORS.get(prog,{})
+        prog_html = f'<span style="background:{pc.get("bg","#f3f4f6")};color:{pc.get("color","#374151")};font-size:0.68rem;font-weight:700;padding:0.1rem 0.5rem;border-radius:10px;margin-right:4px;">{prog}</span>'
+    init_html = f'<span style="font-weight:700;"> {init}</span>' if init else ""
+    return (f'<div class="ev-card" style="background:{s["bg"]};border-left-color:{s["color"]};">'
+            f'<h4 style="color:{s["color"]};">{s["emoji"]} {ev.get("title","")}{init_html}</h4>'
+            f'<div class="meta">'
+            f'{prog_html}'
+            f'<span style="background:{s["color"]};color:white;font-size:0.68rem;padding:0.1rem 0.4rem;border-radius:10px;">{ev.get("event_type","")}</span>'
+            f'{(" ⏰ "+tr) if tr else ""}'
+            f'{(" 📍 "+ev.get("location","")) if ev.get("location") else ""}'
+            f'{(" 👤 "+ev.get("added_by","")) if ev.get("added_by") else ""}'
+            f'</div>'
+            f'{("<div style=\"font-size:0.78rem;color:#555;margin-top:0.25rem;\">"+ev.get("notes","")+"</div>") if ev.get("notes") else ""}'
+            f'</div>')
+
+AGENDA_LIST_HEIGHT = 640   # px; the compact list scrolls inside its frame past this
+
+@memo_html("id", "event_type", "program", "title", "student_initials", "start_time", "end_time", "location")
+def agenda_row_html(ev):
+    s    = ev_style(ev)
+    prog = ev.get("program","")
+    init = ev.get("student_initials","")
+    pc   = PROGRAM_COLORS.get(prog,{})
+    prog_html = (f"<span style='background:{pc.get('bg','#f3f4f6')};color:{pc.get('color','#374151')};font-weight:700;"
+                 f"padding:0.05rem 0.4rem;border-radius:8px;margin-right:4px;'>{escape(prog)}</span>" if prog else "")
+    return (f"<div data-id='{escape(str(ev.id))}' style='display:grid;grid-template-columns:8.5rem 1fr auto;gap:0.6rem;"
+            f"align-items:center;background:{s['bg']};border-left:4px solid {s['color']};border-radius:6px;"
+            f"padding:0.3rem 0.6rem;margin-bottom:3px;font-size:0.8rem;'>"
+            f"<span style='color:#555;white-space:nowrap;'>{ev.time_range or 'All day'}</span>"
+            f"<span style='color:{s['color']};font-weight:600;overflow:hidden;text-overflow:ellipsis;white-space:nowrap;'>"
+            f"{s['emoji']} {escape(ev.get('title',''))}{escape(' · '+init) if init else ''}</span>"
+            f"<span style='color:#666;font-size:0.72rem;white-space:nowrap;'>{prog_html}"
+            f"{escape('📍 '+ev.get('location','')) if ev.get('location') else ''}</span></div>")
+
+def agenda_list_html(events, selected=None):
+    """The compact agenda: `events` grouped under day headings, one row each."""
+    out, cur_d = [], None
+    for ev in events:
+        if ev.day != cur_d:
+            if cur_d is not None: out.append("</section>")
+            cur_d = ev.day
+            out.append(f"<section style='content-visibility:auto;contain-intrinsic-size:auto 120px;'>"
+                       f"<div style='font-weight:700;font-size:0.85rem;color:#1a2e4a;margin:0.6rem 0 0.3rem;'>"
+                       f"{'📍 TODAY — ' if cur_d == today else ''}{cur_d.strftime('%A %-d %B %Y')}</div>")
+        out.append(agenda_row_html(ev))
+    if cur_d is not None: out.append("</section>")
+    mark = (f"<style>[data-id='{escape(str(selected))}']{{outline:2px solid #1a2e4a;}}</style>"
+            if selected is not None else "")
+    return f"{mark}<div style='max-height:{AGENDA_LIST_HEIGHT}px;overflow-y:auto;'>{''.join(out)}</div>"
+
+# ─── BULK IMPORT ────────────────────────────────────────────────────────────────
+# Admin CSV import for the start of term. Columns use the same names as the dicts
+# save_event (event_form) and save_transition take. Rows are validated, shown as a
+# dry-run against what is already stored, then inserted IMPORT_BATCH at a time; a
+# batch the database rejects is retried row by row so each failure can be reported.
+IMPORT_BATCH = 500
+IMPORT_COLUMNS = {
+    "Events": ["title", "etype", "ev_date", "end_date", "start_t", "end_t", "location", "who",
+               "notes", "program", "student_initials"],
+    "Transition weeks": ["student_initials", "program", "mainstream_school", "term", "week_label",
+                         "week_start_date", "notes", "added_by"]
+                        + [f"{dk}_{se}" for dk in TR_DAY_KEYS for se in ["start", "end"]],
+}
+TERMS = ["Term 1", "Term 2", "Term 3", "Term 4"]
+
+def _csv_date(v, field, errs, required=True):
+    v = (v or "").strip()
+    if not v:
+        if required: errs.append(f"{field} is required")
+        return None
+    try: return datetime.strptime(v, "%Y-%m-%d").date()
+    except ValueError: errs.append(f"{field} '{v}' is not YYYY-MM-DD"); return None
+
+def _csv_time(v, field, errs):
+    v = (v or "").strip()
+    if not v: return None
+    try: return datetime.strptime(v[:5], "%H:%M").time()
+    except ValueError: errs.append(f"{field} '{v}' is not HH:MM"); return None
+
+def parse_import(kind, text):
+    """CSV text -> (rows, problems), both lists of (line, db row or message)."""
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [c for c in IMPORT_COLUMNS[kind] if c not in (reader.fieldnames or [])]
+    if missing:
+        return [], [(1, f"Missing column(s): {', '.join(missing)}")]
+    rows, problems = [], []
+    for line, r in enumerate(reader, start=2):
+        errs = []
+        r = {k: (v or "").strip() for k, v in r.items() if k}
+        if r.get("program", "") not in ["", "JP", "PY", "SY"]:
+            errs.append(f"program '{r['program']}' must be JP, PY or SY")
+        if kind == "Events":
+            d = dict(r)
+            d["ev_date"]  = _csv_date(r["ev_date"], "ev_date", errs)
+            d["end_date"] = _csv_date(r["end_date"], "end_date", errs, required=False) or d["ev_date"]
+            d["start_t"]  = _csv_time(r["start_t"], "start_t", errs)
+            d["end_t"]    = _csv_time(r["end_t"], "end_t", errs)
+            if not r["title"]: errs.append("title is required")
+            if not r["who"]:   errs.append("who (added by) is required")
+            if r["etype"] not in EVENT_TYPES: errs.append(f"etype '{r['etype']}' is not a known event type")
+            if r["etype"] in STUDENT_EVENT_TYPES and not (r["student_initials"] and r["program"]):
+                errs.append("student events need student_initials and program")
+            if d["ev_date"] and d["end_date"] and d["end_date"] < d["ev_date"]:
+                errs.append("end_date is before ev_date")
+            row = event_row(d) if not errs else None
+        else:
+            wk = _csv_date(r["week_start_date"], "week_start_date", errs)
+            for f in ["student_initials", "program", "added_by", "week_label"]:
+                if not r[f]: errs.append(f"{f} is required")
+            if r["term"] not in TERMS: errs.append(f"term '{r['term']}' must be one of {', '.join(TERMS)}")
+            row = {k: r[k] for k in IMPORT_COLUMNS[kind]}
+            row["week_start_date"] = str(wk)
+            for dk in TR_DAY_KEYS:
+                for se in ["start", "end"]:
+                    t = _csv_time(r[f"{dk}_{se}"], f"{dk}_{se}", errs)
+                    row[f"{dk}_{se}"] = str(t) if t else None
+        if errs: problems.append((line, "; ".join(errs)))
+        else:    rows.append((line, row))
+    return rows, problems
+
+def _import_key(kind, row):
+    if kind == "Events":
+        return (str(row["event_date"])[:10], row["event_type"], row["title"], row.get("student_initials") or "")
+    return (row["student_initials"], str(row["week_start_date"])[:10])
+
+def import_dry_run(kind, rows):
+    """Label each parsed row 'new', 'already exists' or 'repeats line N'."""
+    if not rows: return []
+    if kind == "Events":
+        days = [datetime.strptime(r["event_date"], "%Y-%m-%d").date() for _, r in rows]
+        existing = db_events(min(days), max(days))
+    else:
+        existing = query_transitions()
+    have, seen, out = {_import_key(kind, e) for e in existing}, {}, []
+    for line, row in rows:
+        key = _import_key(kind, row)
+        out.append((line, row, "already exists" if key in have else
+                    f"repeats line {seen[key]}" if key in seen else "new"))
+        seen.setdefault(key, line)
+    return out
+
+def run_import(kind, rows):
+    """Insert (line, row) pairs in batches. Returns (inserted count, [(line, error)])."""
+    table = "clc_events" if kind == "Events" else "student_transitions"
+    done, failed = 0, []
+    for i in range(0, len(rows), IMPORT_BATCH):
+        batch = rows[i:i + IMPORT_BATCH]
+        try:
+            res = supabase.table(table).insert([r for _, r in batch]).execute()
+            written = res.data
+            done += len(batch)
+        except Exception:
+            written = []
+            for line, r in batch:
+                try:
+                    written += supabase.table(table).insert(r).execute().data
+                    done += 1
+                except Exception as e:
+                    failed.append((line, str(e)))
+        if kind == "Events":
+            dates = [str(r["event_date"]) for r in written] + [str(r.get("end_date") or "") for r in written]
+            dates = [d for d in dates if d]
+            record_write(table, span=(min(dates)[:10], max(dates)[:10]) if dates else None, rows=written)
+        else:
+            record_write(table, rows=written)
+    return done, failed
+
+def import_panel():
+    """Admin expander: upload → validate → dry-run diff → batched insert."""
+    with st.expander("📥 Bulk import (CSV)"):
+        kind = st.selectbox("What are you importing?", list(IMPORT_COLUMNS), key="imp_kind")
+        st.caption("Columns: " + ", ".join(IMPORT_COLUMNS[kind])
+                   + ". Dates as YYYY-MM-DD, times as HH:MM; blank cells are allowed for optional fields.")
+        up = st.file_uploader("CSV file", type=["csv"], key="imp_file")
+        if not up: return
+        rows, problems = parse_import(kind, up.getvalue().decode("utf-8-sig"))
+        try:
+            plan = import_dry_run(kind, rows)
+        except DbUnavailable as e:
+            st.warning(f"Can't check for existing rows right now — the calendar database isn't answering ({e}). "
+                       "Try the import again in a moment.")
+            return
+        new  = [(line, row) for line, row, status in plan if status == "new"]
+        repeats = sum(status.startswith("repeats") for _, _, status in plan)
+        st.markdown(f"**Dry run:** {len(new)} new · {len(plan) - len(new) - repeats} already exist · "
+                    f"{repeats} repeated in the file · {len(problems)} invalid")
+        if plan:
+            st.dataframe([{"line": line, "status": status, **row} for line, row, status in plan],
+                         use_container_width=True, hide_index=True)
+        for line, msg in problems:
+            st.markdown(f"- ⚠️ line {line}: {msg}")
+        skip_dupes = st.checkbox("Skip rows that already exist or repeat an earlier line", value=True, key="imp_skip")
+        todo = new if skip_dupes else [(line, row) for line, row, _ in plan]
+        if todo and st.button(f"✅ Import {len(todo)} row{'s' if len(todo)!=1 else ''}", type="primary", key="imp_go"):
+            done, failed = run_import(kind, todo)
+            st.success(f"Imported {done} row{'s' if done!=1 else ''}.")
+            for line, msg in failed:
+                st.error(f"Line {line}: {msg}")
+
 # ─── EVENT FORM ──────────────────────────────────────────────────────────────────
 def event_form(key, default_date=None, existing=None, label="📅 Save Event"):
     ev = existing or {}
@@ -190,9 +1840,7 @@ def event_form(key, default_date=None, existing=None, label="📅 Save Event"):
                                  if ev.get("event_type") in EVENT_TYPES else len(EVENT_TYPES)-1)
             who = st.text_input("Added by *", value=ev.get("added_by",""), placeholder="Your name")
         with c2:
-            ev_date  = st.date_input("Date *",
-                                     value=datetime.strptime(str(ev.get("event_date",d0))[:10],"%Y-%m-%d").date()
-                                     if ev.get("event_date") else d0)
+            ev_date  = st.date_input("Date *", value=to_date(ev.get("event_date")) or d0)
             end_date = st.date_input("End date (leave same for single day)", value=ev_date)
             location = st.text_input("Location", value=ev.get("location",""))
 
@@ -212,15 +1860,33 @@ def event_form(key, default_date=None, existing=None, label="📅 Save Event"):
         c3, c4 = st.columns(2)
         with c3: start_t = st.time_input("Start time (optional)", value=None)
         with c4: end_t   = st.time_input("End time (optional)",   value=None)
+
+        recur = not feed_state["recur_missing"]
+        if recur:
+            rule0, until0 = rrule_parts(ev.get("rrule"))
+            opts = list(REPEATS) + ([rule0] if rule0 not in REPEATS else [])
+            r1, r2 = st.columns(2)
+            with r1: rule  = st.selectbox("Repeats", opts, index=opts.index(rule0),
+                                          format_func=lambda r: REPEATS.get(r) or repeat_label(r))
+            with r2: until = st.date_input("Repeat until (optional)", value=until0)
+            scope = (st.radio("Apply changes to", list(SERIES_SCOPES), format_func=SERIES_SCOPES.get, horizontal=True)
+                     if ev.get("series_id") else None)
         notes = st.text_area("Notes", value=ev.get("notes",""), height=64)
         ok = st.form_submit_button(label, type="primary", use_container_width=True)
         if ok:
             if not title.strip() or not who.strip():
                 st.warning("Event title and 'Added by' are required.")
                 return False, {}
-            return True, dict(title=title, etype=etype, ev_date=ev_date, end_date=end_date,
-                              start_t=start_t, end_t=end_t, location=location, who=who,
-                              notes=notes, program=program, student_initials=student_initials)
+            out = dict(title=title, etype=etype, ev_date=ev_date, end_date=end_date,
+                       start_t=start_t, end_t=end_t, location=location, who=who,
+                       notes=notes, program=program, student_initials=student_initials)
+            if recur:
+                if rule and until and until < ev_date:
+                    st.warning("'Repeat until' can't be before the event's date.")
+                    return False, {}
+                out["rrule"] = f"{rule};UNTIL={until:%Y%m%d}" if rule and until else rule
+                if scope: out["scope"] = scope
+            return True, out
     return False, {}
 
 # ─── EVENT DETAIL PANEL ─────────────────────────────────────────────────────────
@@ -231,32 +1897,27 @@ def event_detail_panel():
         return
     # Load event
     pac = str(eid).startswith("pac_")
-    if pac:
-        all_pac = db_pac()
-        ev = next((e for e in pac_events(all_pac, date(2000,1,1), date(2099,12,31)) if e.get("id")==eid), None)
-    else:
-        try:
-            res = supabase.table("clc_events").select("*").eq("id", eid).execute()
-            ev  = res.data[0] if res.data else None
-        except:
-            ev = None
+    try:
+        if pac:
+            row = db_pac_one(str(eid)[len("pac_"):])
+            ev  = pac_events([row])[0] if row else None
+        else:
+            ev = db_event_one(eid)
+    except DbUnavailable as e:
+        st.warning(f"Couldn't load this event right now ({e}). Try again in a moment.")
+        return
+    except Exception as e:
+        st.error(f"Could not load event: {e}")
+        return
     if not ev:
         st.session_state.selected_event_id = None
         return
 
-    cfg   = EVENT_TYPES.get(ev.get("event_type","Other"), EVENT_TYPES["Other"])
+    cfg   = ev_style(ev)
     prog  = ev.get("program","")
-    if prog and ev.get("event_type") in STUDENT_EVENT_TYPES:
-        pc  = PROGRAM_COLORS.get(prog, {})
-        color = pc.get("color", cfg["color"]); bg = pc.get("bg", cfg["bg"])
-    else:
-        color = cfg["color"]; bg = cfg["bg"]
+    color, bg = cfg["color"], cfg["bg"]
 
-    tr = fmt_time(ev.get("start_time",""))
-    if ev.get("end_time"): tr += f" – {fmt_time(ev['end_time'])}"
-    edate = fmt_date(ev.get("event_date",""))
-    if ev.get("end_date") and ev["end_date"] != ev.get("event_date"):
-        edate += f" → {fmt_date(ev['end_date'])}"
+    tr, edate = ev.time_range, ev.date_label
 
     st.markdown(f"""
     <div style="background:{bg};border:2px solid {color};border-radius:14px;
@@ -279,6 +1940,7 @@ def event_detail_panel():
       <div style="display:grid;grid-template-columns:1fr 1fr;gap:0.4rem;font-size:0.85rem;color:#374151;">
         <div>📅 <strong>Date:</strong> {edate}</div>
         {f'<div>⏰ <strong>Time:</strong> {tr}</div>' if tr else '<div></div>'}
+        {f'<div>🔁 <strong>Repeats:</strong> {escape(repeat_label(ev.get("rrule")))}</div><div></div>' if ev.get("rrule") else ""}
         {f'<div>📍 <strong>Location:</strong> {ev.get("location","")}</div>' if ev.get("location") else '<div></div>'}
         {f'<div>👤 <strong>Added by:</strong> {ev.get("added_by","")}</div>' if ev.get("added_by") else '<div></div>'}
       </div>
@@ -297,44 +1959,16 @@ def event_detail_panel():
             if st.button("✏️ Edit", key="ev_detail_edit", use_container_width=True, type="primary"):
                 st.session_state.edit_event_id  = eid
                 st.session_state.selected_event_id = None
-                edate_obj = datetime.strptime(str(ev.get("event_date",""))[:10], "%Y-%m-%d").date()
-                st.session_state.selected_date  = edate_obj
+                st.session_state.selected_date  = ev.day
                 st.rerun()
 
 # ─── RENDER EVENT CARD ──────────────────────────────────────────────────────────
 def render_event_card(ev, key_prefix, allow_edit=True):
-    cfg  = EVENT_TYPES.get(ev.get("event_type","Other"), EVENT_TYPES["Other"])
-    tr   = fmt_time(ev.get("start_time",""))
-    if ev.get("end_time"): tr += f" – {fmt_time(ev['end_time'])}"
     eid  = ev.get("id",""); pac = str(eid).startswith("pac_")
-    prog = ev.get("program","")
-    init = ev.get("student_initials","")
-
-    # For student events, use program colour
-    if prog and ev.get("event_type") in STUDENT_EVENT_TYPES:
-        pc = PROGRAM_COLORS.get(prog, {})
-        cfg = {"color": pc.get("color", cfg["color"]), "bg": pc.get("bg", cfg["bg"]), "emoji": cfg["emoji"]}
-
-    prog_html = ""
-    if prog:
-        pc = PROGRAM_COLORS.get(prog,{})
-        prog_html = f'<span style="background:{pc.get("bg","#f3f4f6")};color:{pc.get("color","#374151")};font-size:0.68rem;font-weight:700;padding:0.1rem 0.5rem;border-radius:10px;margin-right:4px;">{prog}</span>'
-    init_html = f'<span style="font-weight:700;"> {init}</span>' if init else ""
 
     cc1, cc2, cc3 = st.columns([6,1,1])
     with cc1:
-        st.markdown(
-            f'<div class="ev-card" style="background:{cfg["bg"]};border-left-color:{cfg["color"]};">'
-            f'<h4 style="color:{cfg["color"]};">{cfg["emoji"]} {ev.get("title","")}{init_html}</h4>'
-            f'<div class="meta">'
-            f'{prog_html}'
-            f'<span style="background:{cfg["color"]};color:white;font-size:0.68rem;padding:0.1rem 0.4rem;border-radius:10px;">{ev.get("event_type","")}</span>'
-            f'{(" ⏰ "+tr) if tr else ""}'
-            f'{(" 📍 "+ev.get("location","")) if ev.get("location") else ""}'
-            f'{(" 👤 "+ev.get("added_by","")) if ev.get("added_by") else ""}'
-            f'</div>'
-            f'{("<div style=\"font-size:0.78rem;color:#555;margin-top:0.25rem;\">"+ev.get("notes","")+"</div>") if ev.get("notes") else ""}'
-            f'</div>', unsafe_allow_html=True)
+        st.markdown(list_card_html(ev), unsafe_allow_html=True)
     with cc2:
         # All staff can edit student meeting dates; admin can edit everything
         can_edit = (st.session_state.is_admin or ev.get("event_type") in STUDENT_EVENT_TYPES) and not pac
@@ -342,20 +1976,437 @@ def render_event_card(ev, key_prefix, allow_edit=True):
             st.write("")
             if st.button("✏️", key=f"{key_prefix}_e_{eid}", help="Edit"):
                 st.session_state.edit_event_id = eid if st.session_state.edit_event_id!=eid else None
-                st.rerun()
+                rerun_view()
     with cc3:
         if st.session_state.is_admin and not pac and allow_edit:
             st.write("")
             if st.button("🗑️", key=f"{key_prefix}_d_{eid}", help="Delete"):
                 del_event(eid); st.session_state.edit_event_id=None; st.rerun()
 
-    if st.session_state.edit_event_id == eid and not pac and allow_edit:
+    if st.session_state.edit_event_id == eid and not pac and allow_edit and (full := event_for_edit(eid)):
         st.markdown("**✏️ Edit event:**")
-        ok, data = event_form(f"{key_prefix}_ef_{eid}", existing=ev, label="💾 Save Changes")
+        ok, data = event_form(f"{key_prefix}_ef_{eid}", existing=full, label="💾 Save Changes")
         if ok:
             upd_event(eid, data); st.session_state.edit_event_id=None
             st.success("Updated!"); st.rerun()
 
+# ─── GRID COMPONENT ─────────────────────────────────────────────────────────────
+# The month grid, week strip and compact agenda are each sent as one block of markup
+# to a small static component (components/cal_grid) instead of columns, markdown
+# cells and buttons per day or event. A click comes back as {date, id, nonce}; the
+# nonce tells a new click apart from the value the component keeps returning on later
+# reruns.
+_cal_grid = components.declare_component("cal_grid", path=str(Path(__file__).parent / "components" / "cal_grid"))
+
+def _clicked(markup, key):
+    v = _cal_grid(html=markup, key=key, default=None)
+    if not v or v.get("nonce") == st.session_state.get(f"{key}_nonce"):
+        return None
+    st.session_state[f"{key}_nonce"] = v["nonce"]
+    return v
+
+def cal_days(markup, key):
+    """Render `markup` as is; returns the data-date clicked since the last rerun, or None."""
+    v = _clicked(markup, key)
+    return date.fromisoformat(v["date"]) if v and v.get("date") else None
+
+def cal_grid(markup, key):
+    """Render the 7-column grid `markup`; returns the date clicked since the last rerun, or None."""
+    return cal_days(f"<div class='grid'>{markup}</div>", key)
+
+def cal_list(markup, key):
+    """Render the row list `markup`; returns the data-id clicked since the last rerun, or None."""
+    v = _clicked(markup, key)
+    return v.get("id") if v else None
+
+# ─── PLACEMENT GANTT ────────────────────────────────────────────────────────────
+# The timeline is computed in bulk: placement dates are parsed once into
+# datetime64 arrays, occupancy is one (placement × school day) boolean matrix, and
+# the cells come from np.where over a few prebuilt strings. Only the meeting dots,
+# which are sparse, are placed one at a time. Rows are joined once at the end, so
+# a full school year for every student stays fast and there is no day cap. Wider
+# zoom levels sum the matrix into week / term / year columns with np.add.reduceat.
+GANTT_PROGRAMS = ["JP", "PY", "SY"]
+MEETING_DOTS = {
+    "Entry Meeting":      {"dot": "#0e7490", "label": "E",   "one": "entry",      "many": "entries"},
+    "Review Meeting":     {"dot": "#c2410c", "label": "R",   "one": "review",     "many": "reviews"},
+    "Transition Meeting": {"dot": "#7c3aed", "label": "T",   "one": "transition", "many": "transitions"},
+    "TAC Meeting":        {"dot": "#b45309", "label": "TAC", "one": "TAC",        "many": "TACs"},
+}
+# Zoom levels: columns are school days, or weeks / terms / years of them, each cell
+# summarising its bucket. "Auto" picks the finest level within GANTT_MAX_COLS.
+GANTT_ZOOMS    = ["day", "week", "term", "year"]
+GANTT_MAX_COLS = 60
+# Approximate SA public school term starts (month, day); the exact dates move by a
+# few days each year, which only shifts where a term column begins.
+TERM_STARTS    = [(1, 27), (4, 28), (7, 21), (10, 13)]
+GANTT_CSS = """
+<style>
+.gantt-wrap {overflow-x:auto;}
+.gantt-table {border-collapse:collapse;font-family:'Inter',sans-serif;font-size:0.72rem;}
+.gantt-table th {background:#1a2e4a;color:white;padding:3px 4px;text-align:center;min-width:{cell_w}px;white-space:nowrap;border:1px solid #2d4a6e;}
+.gantt-table td {border:1px solid #e5e7eb;padding:2px;text-align:center;height:30px;min-width:{cell_w}px;background:white;}
+.gantt-table .row-label {text-align:left;padding:4px 10px;font-weight:700;white-space:nowrap;min-width:90px;background:#f8fafc;border:1px solid #e5e7eb;position:sticky;left:0;z-index:2;}
+.gantt-table .prog-head {text-align:left;padding:5px 10px;font-size:0.75rem;font-weight:800;letter-spacing:0.05em;text-transform:uppercase;border:1px solid #e5e7eb;}
+.gantt-bar {border-radius:4px;height:22px;display:flex;align-items:center;justify-content:center;font-size:0.65rem;font-weight:700;color:white;position:relative;}
+.gantt-dot {display:inline-flex;align-items:center;justify-content:center;width:18px;height:18px;border-radius:50%;color:white;font-size:0.6rem;font-weight:800;margin:1px;}
+.gantt-today {background:#fffbeb!important;border-left:2px solid #d4af37!important;border-right:2px solid #d4af37!important;}
+.gantt-weekend {background:#f9fafb!important;}
+</style>
+<div class="gantt-wrap">
+<table class="gantt-table">
+<tr>
+  <th class="row-label" style="position:sticky;left:0;z-index:3;">Student</th>
+"""
+GANTT_LEGEND = """
+<div style="margin-top:0.75rem;display:flex;flex-wrap:wrap;gap:0.5rem;font-size:0.75rem;align-items:center;">
+<strong>Meeting markers:</strong>
+<span style="background:#0e7490;color:white;border-radius:50%;width:20px;height:20px;display:inline-flex;align-items:center;justify-content:center;font-weight:800;font-size:0.65rem;">E</span> Entry &nbsp;
+<span style="background:#c2410c;color:white;border-radius:50%;width:20px;height:20px;display:inline-flex;align-items:center;justify-content:center;font-weight:800;font-size:0.65rem;">R</span> Review &nbsp;
+<span style="background:#7c3aed;color:white;border-radius:50%;width:20px;height:20px;display:inline-flex;align-items:center;justify-content:center;font-weight:800;font-size:0.65rem;">T</span> Transition &nbsp;
+<span style="background:#b45309;color:white;border-radius:50%;width:20px;height:20px;display:inline-flex;align-items:center;justify-content:center;font-weight:800;font-size:0.65rem;font-size:0.55rem;">TAC</span> TAC
+</div>"""
+
+def school_days(d_from, d_to):
+    """Mon–Fri from d_from to d_to inclusive, as datetime64[D]."""
+    days = np.arange(np.datetime64(d_from, "D"), np.datetime64(d_to, "D") + 1)
+    return days[np.is_busday(days)]
+
+def as_days(values):
+    return np.array(list(values), dtype="datetime64[D]")
+
+def bucket_starts(days, zoom):
+    """Index into `days` of the first school day of each column at `zoom`."""
+    if zoom == "day" or not len(days):
+        return np.arange(len(days))
+    n = days.astype(int)
+    if zoom == "week":
+        key = n - (n + 3) % 7                                       # Monday of the week
+    elif zoom == "term":
+        key = term_keys(days)
+    else:
+        key = days.astype("datetime64[Y]").astype(int)
+    return np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+
+def term_keys(days):
+    """year * 4 + term index per day, from TERM_STARTS; holidays count with the term before."""
+    months = days.astype("datetime64[M]")
+    yrs    = days.astype("datetime64[Y]").astype(int) + 1970
+    md     = (months.astype(int) % 12 + 1) * 100 + (days - months).astype(int) + 1
+    t      = np.searchsorted([m * 100 + d for m, d in TERM_STARTS], md, side="right") - 1
+    return np.where(t < 0, (yrs - 1) * 4 + 3, yrs * 4 + t)
+
+def auto_zoom(d_from, d_to):
+    """Finest zoom that fits the range in GANTT_MAX_COLS columns."""
+    days = school_days(d_from, d_to)
+    return next((z for z in GANTT_ZOOMS if len(bucket_starts(days, z)) <= GANTT_MAX_COLS), GANTT_ZOOMS[-1])
+
+def meeting_summary(counts):
+    """'2 reviews, 1 TAC' for per-type counts in MEETING_DOTS order."""
+    return ", ".join(f'{n} {cfg["one"] if n == 1 else cfg["many"]}'
+                     for n, cfg in zip(counts, MEETING_DOTS.values()) if n)
+
+def gantt_html(placements, meetings, d_from, d_to, zoom="day"):
+    """Placement timeline for `placements`, with `meetings` on their student's rows."""
+    days   = school_days(d_from, d_to)
+    starts = as_days(p.day for p in placements)
+    ends   = as_days(p.last for p in placements)
+    occ    = (starts[:, None] <= days) & (days <= ends[:, None])          # P × D
+    idx    = bucket_starts(days, zoom)                                    # first day of each column
+    t      = np.searchsorted(days, np.datetime64(today, "D"))
+    t_col  = (np.searchsorted(idx, [t], "right") - 1 if t < len(days) and days[t] == np.datetime64(today, "D")
+              else np.array([], int))                                 # column holding today
+
+    # Meetings on a shown school day: (row, day col, type) for every row of that student
+    rows_by_init = {}
+    for i, p in enumerate(placements):
+        rows_by_init.setdefault(p.get("student_initials","") or p.get("title","?"), []).append(i)
+    hits = []
+    ms = [m for m in meetings if m.get("student_initials","") in rows_by_init]
+    if ms and len(days):
+        m_days = as_days(m.day for m in ms)
+        cols_  = np.searchsorted(days, m_days).clip(max=len(days) - 1)
+        for m, c, ok in zip(ms, cols_.tolist(), (days[cols_] == m_days).tolist()):
+            if not ok: continue   # weekend / outside the range
+            hits += [(r, c, m.get("event_type","")) for r in rows_by_init[m["student_initials"]]]
+
+    # Header
+    months = days.astype("datetime64[M]")
+    mnames = [calendar.month_abbr[m % 12 + 1] for m in months.astype(int).tolist()]
+    dnums  = ((days - months).astype(int) + 1).tolist()
+    firsts = idx.tolist()
+    new_mo = [k == 0 or months[c] != months[firsts[k - 1]] for k, c in enumerate(firsts)]
+    if zoom == "day":
+        wdays = ((days.astype(int) + 3) % 7).tolist()                 # 1970-01-01 was a Thursday
+        labels = [f'{mnames[c] if new_mo[c] else ""}<br>{dnums[c]}<br>'
+                  f'<span style="font-weight:400;opacity:0.7;">{"MTWTFSS"[wdays[c]]}</span>' for c in firsts]
+    elif zoom == "week":
+        labels = [f'{mnames[c] if new_mo[k] else ""}<br>{dnums[c]}<br>'
+                  f'<span style="font-weight:400;opacity:0.7;">wk</span>' for k, c in enumerate(firsts)]
+    elif zoom == "term":
+        terms  = term_keys(days[idx]).tolist()
+        labels = [f'T{t % 4 + 1}<br><span style="font-weight:400;opacity:0.7;">{t // 4}</span>' for t in terms]
+    else:
+        labels = [str(y + 1970) for y in days[idx].astype("datetime64[Y]").astype(int).tolist()]
+    head = [f'<th style="background:{"#d4af37" if k in t_col else "#1a2e4a"};">{lbl}</th>'
+            for k, lbl in enumerate(labels)]
+
+    if zoom == "day":
+        cell_w = max(22, min(36, 1100 // max(len(idx),1)))
+        dots = {}
+        for r, c, mt in hits:
+            cfg = MEETING_DOTS.get(mt, {"dot":"#374151","label":"?"})
+            row = dots.setdefault(r, {})
+            row[c] = row.get(c, "") + f'<span class="gantt-dot" style="background:{cfg["dot"]};" title="{mt}">{cfg["label"]}</span>'
+    else:
+        cell_w = max(44, min(96, 1100 // max(len(idx),1)))
+        blen   = np.diff(np.r_[idx, len(days)])
+        placed = np.add.reduceat(occ.astype(np.int32), idx, axis=1) if len(idx) else occ.astype(np.int32)   # P × B
+        counts = np.zeros((len(placements), len(idx), len(MEETING_DOTS)), np.int32)                          # P × B × type
+        types  = list(MEETING_DOTS)
+        hits   = [(r, c, types.index(mt)) for r, c, mt in hits if mt in MEETING_DOTS]
+        if hits:
+            r_, c_, t_ = np.array(hits).T
+            np.add.at(counts, (r_, np.searchsorted(idx, c_, "right") - 1, t_), 1)
+
+    out = [GANTT_CSS.replace("{cell_w}", str(cell_w)), *head, "</tr>"]
+    s_lbl = [d.strftime("%-d %b") for d in starts.astype(object)]
+    e_lbl = [d.strftime("%-d %b") for d in ends.astype(object)]
+    cur_prog = None
+    for i, pl in enumerate(placements):
+        prog = pl.get("program","")
+        pc   = PROGRAM_COLORS.get(prog, {"color":"#374151","bg":"#f3f4f6"})
+        init = pl.get("student_initials","") or pl.get("title","?")
+        if prog != cur_prog:
+            cur_prog = prog
+            out.append(f'<tr><td class="prog-head" colspan="{len(idx)+1}" style="background:{pc["bg"]};color:{pc["color"]};">'
+                       f'{prog} — {PROGRAM_COLORS.get(prog,{}).get("label","")}</td></tr>')
+        if zoom == "day":
+            bar   = f'style="background:{pc["bg"]};"><div class="gantt-bar" style="background:{pc["color"]};opacity:0.85;">·</div></td>'
+            cells = np.where(occ[i], '<td class="" ' + bar, '<td class=""></td>').astype(object)
+            for c in t_col:
+                cells[c] = '<td class="gantt-today" ' + bar if occ[i, c] else '<td class="gantt-today"></td>'
+            for c, dot in dots.get(i, {}).items():
+                cls = "gantt-today" if c in t_col else ""
+                cells[c] = (f'<td class="{cls}" style="background:{pc["bg"]}"><div class="gantt-bar" style="background:{pc["color"]};">{dot}</div></td>'
+                            if occ[i, c] else f'<td class="{cls}">{dot}</td>')
+        else:
+            cells, met = [], counts[i].any(axis=1).tolist()
+            for k, (n, total) in enumerate(zip(placed[i].tolist(), blen.tolist())):
+                cls  = "gantt-today" if k in t_col else ""
+                text = meeting_summary(counts[i, k].tolist()) if met[k] else ""
+                if n:
+                    cells.append(f'<td class="{cls}" style="background:{pc["bg"]};" title="{n} of {total} school days placed">'
+                                 f'<div class="gantt-bar" style="background:{pc["color"]};opacity:{0.35 + 0.5 * n / total:.2f};'
+                                 f'padding:0 3px;white-space:nowrap;">{text or "·"}</div></td>')
+                elif text:
+                    cells.append(f'<td class="{cls}" style="font-size:0.62rem;white-space:nowrap;">{text}</td>')
+                else:
+                    cells.append(f'<td class="{cls}"></td>')
+            cells = np.array(cells, dtype=object)
+        out.append(f'<tr><td class="row-label"><span style="color:{pc["color"]};font-weight:700;">{init}</span><br>'
+                   f'<span style="font-size:0.65rem;color:#888;">{s_lbl[i]} – {e_lbl[i]}</span></td>')
+        out.extend(cells.tolist())
+        out.append("</tr>")
+    out.append("</table></div>" + GANTT_LEGEND)
+    return "".join(out)
+
+# ─── TRANSITION MATRIX ──────────────────────────────────────────────────────────
+# Every transitioning student in one table, built in a single pass: grouped by term
+# and then week, one row per student with their Mon–Fri mainstream times. Student
+# rows carry data-id so a click (through cal_list) opens that student's editor.
+TR_CSS = """<style>
+.tr-grid{border-collapse:collapse;width:100%;font-family:'Inter',sans-serif;margin-bottom:1rem;}
+.tr-grid th{background:#4a7c59;color:white;padding:6px 10px;font-size:0.78rem;font-weight:600;text-align:center;border:1px solid #3a6347;}
+.tr-grid th.row-h{background:#2d5a3d;text-align:left;min-width:90px;}
+.tr-grid td{border:1px solid #d1d5db;padding:6px 8px;font-size:0.78rem;text-align:center;background:white;vertical-align:middle;}
+.tr-grid td.term-cell{background:#2d5a3d;color:white;font-size:0.8rem;font-weight:600;letter-spacing:0.05em;text-transform:uppercase;text-align:left;}
+.tr-grid td.label-cell{background:#f0f7f2;font-weight:600;color:#2d5a3d;text-align:left;white-space:nowrap;}
+.tr-grid td.date-cell{font-size:0.7rem;color:#888;background:#fafafa;}
+.tr-grid td.has-time{background:#d1fae5;color:#065f46;font-weight:600;}
+.tr-grid td.no-time{background:#f9fafb;color:#9ca3af;font-size:0.72rem;}
+.tr-grid tr.week-divider td{border-top:2px solid #6b9e7a;}
+</style>"""
+
+def _tr_order(w):
+    prog = w.get("program")
+    return (w.get("term") or "", w.week or date.max, w.get("week_label") or "",
+            GANTT_PROGRAMS.index(prog) if prog in GANTT_PROGRAMS else 3, w.get("student_initials") or "")
+
+def transition_matrix_html(weeks, selected=None):
+    out = [TR_CSS, "<table class='tr-grid'><tr><th class='row-h'>Term / Week / Student</th>"
+                   "<th>Monday</th><th>Tuesday</th><th>Wednesday</th><th>Thursday</th><th>Friday</th></tr>"]
+    cur_term = cur_week = None
+    for w in sorted(weeks, key=_tr_order):
+        term = w.get("term") or ""
+        if term != cur_term:
+            cur_term, cur_week = term, None
+            out.append(f"<tr><td class='term-cell' colspan='6'>{escape(term)}</td></tr>")
+        wk = (w.week, w.get("week_label") or "")
+        if wk != cur_week:
+            cur_week = wk
+            dates = ("".join(f"<td class='date-cell'>{(w.week + timedelta(days=i)).strftime('%-d %b')}</td>" for i in range(5))
+                     if w.week else "<td colspan='5'></td>")
+            out.append(f"<tr class='week-divider'><td class='label-cell'>{escape(wk[1])}</td>{dates}</tr>")
+        init, prog = w.get("student_initials") or "?", w.get("program") or ""
+        pc     = PROGRAM_COLORS.get(prog, {"color":"#374151","bg":"#f3f4f6"})
+        school = w.get("mainstream_school") or ""
+        school = f" <span style='color:#888;font-size:0.7rem;'>→ {escape(school)}</span>" if school else ""
+        cells  = "".join(f"<td class='has-time'>{c}</td>" if c else "<td class='no-time'>CLC</td>"
+                         for c in (w.cells[dk] for dk in TR_DAY_KEYS))
+        out.append(f"<tr data-id='{escape(init)}'><td style='text-align:left;white-space:nowrap;'>"
+                   f"<span style='background:{pc['color']};color:white;font-size:0.68rem;font-weight:700;"
+                   f"padding:0.1rem 0.4rem;border-radius:6px;'>{escape(prog)}</span> "
+                   f"<strong style='color:{pc['color']};'>{escape(init)}</strong>{school}</td>{cells}</tr>")
+    out.append("</table>")
+    if selected is not None:
+        out.append(f"<style>.tr-grid tr[data-id='{escape(selected)}'] td{{box-shadow:inset 0 0 0 999px rgba(212,175,55,0.18);}}</style>")
+    return "".join(out)
+
+# ─── YEAR HEATMAP ───────────────────────────────────────────────────────────────
+# Twelve small month grids coloured by how many events fall on each day, from the
+# per-day counts (day_counts). "Show" narrows the count to one event type or program
+# and tints the scale in its colour; each cell's tooltip has the full breakdown.
+HEAT_STEPS = [(7, 1.0), (4, 0.75), (2, 0.5), (1, 0.28)]   # (at least n events, opacity)
+
+def heat_options():
+    return ([("all", "")] + [("type", t) for t in EVENT_TYPES]
+            + [("program", p) for p in PROGRAM_COLORS])
+
+def heat_label(opt):
+    kind, v = opt
+    if kind == "type":    return f"{EVENT_TYPES[v]['emoji']} {v}"
+    if kind == "program": return f"{v} — {PROGRAM_COLORS[v]['label']}"
+    return "All events"
+
+def _rgba(hex_color, a):
+    h = hex_color.lstrip("#")
+    return f"rgba({int(h[0:2],16)},{int(h[2:4],16)},{int(h[4:6],16)},{a})"
+
+def year_heatmap_html(year, counts, opt=("all", "")):
+    kind, v = opt
+    tint = {"type": EVENT_TYPES.get(v, {}).get("color"), "program": PROGRAM_COLORS.get(v, {}).get("color")}.get(kind) or "#1a2e4a"
+    def shown(k):
+        return kind == "all" or (kind == "type" and k[0] == v) or (kind == "program" and k[1] == v)
+    months = []
+    for mo in range(1, 13):
+        first = date(year, mo, 1)
+        cells = ["<div></div>"] * first.weekday()
+        for day in range(1, calendar.monthrange(year, mo)[1] + 1):
+            d = date(year, mo, day)
+            c = counts.get(d, {})
+            n = sum(x for k, x in c.items() if shown(k))
+            a = next((op for lo, op in HEAT_STEPS if n >= lo), 0)
+            by_type, by_prog = {}, {}
+            for (t, p), x in c.items():
+                by_type[t] = by_type.get(t, 0) + x
+                if p: by_prog[p] = by_prog.get(p, 0) + x
+            tip = [f"{d.strftime('%a %-d %b')} — {n} event{'s' if n != 1 else ''}"]
+            tip += [f"{t}: {x}" for t, x in sorted(by_type.items(), key=lambda kv: (-kv[1], kv[0]))]
+            tip += [f"{p}: {x}" for p, x in sorted(by_prog.items())]
+            ring = "box-shadow:inset 0 0 0 2px #d4af37;" if d == today else ""
+            cells.append(f"<div data-date='{d}' title='{'&#10;'.join(escape(t) for t in tip)}' "
+                         f"style='aspect-ratio:1;border-radius:3px;font-size:0.58rem;display:flex;align-items:center;"
+                         f"justify-content:center;background:{_rgba(tint, a) if a else '#f3f4f6'};"
+                         f"color:{'white' if a >= 0.5 else '#6b7280'};{ring}'>{day}</div>")
+        months.append(f"<div><div style='font-weight:700;font-size:0.8rem;color:#1a2e4a;margin-bottom:4px;'>"
+                      f"{first.strftime('%B')}</div><div style='display:grid;grid-template-columns:repeat(7,1fr);gap:2px;'>"
+                      f"{''.join(cells)}</div></div>")
+    legend = "".join(f"<span style='display:inline-block;width:12px;height:12px;border-radius:3px;vertical-align:middle;"
+                     f"background:{_rgba(tint, op)};margin:0 2px 0 8px;'></span>{lo}+"
+                     for lo, op in reversed(HEAT_STEPS))
+    return (f"<div style='display:grid;grid-template-columns:repeat(4,minmax(0,1fr));gap:1rem 1.5rem;'>{''.join(months)}</div>"
+            f"<div style='font-size:0.72rem;color:#6b7280;margin-top:0.6rem;'>Events per day:{legend}</div>")
+
+# ─── SEARCH RESULTS ─────────────────────────────────────────────────────────────
+# One row per match, best first, with the matched words highlighted in the snippet.
+# Rows carry their position on the page as data-id; clicking one opens the event's
+# day or the student's transition schedule.
+SEARCH_BADGES = {"event":      ("Event", "#1a2e4a", "#e8eef7"),
+                 "pac":        ("PAC", EVENT_TYPES["PAC Meeting"]["color"], EVENT_TYPES["PAC Meeting"]["bg"]),
+                 "transition": ("Transition", "#2d5a3d", "#f0f7f2")}
+
+def search_snippet_html(snip):
+    return escape(snip or "").replace("⟦", "<mark style='background:#fde68a;padding:0;'>").replace("⟧", "</mark>")
+
+def search_results_html(rows):
+    out = []
+    for i, r in enumerate(rows):
+        label, color, bg = SEARCH_BADGES.get(r["kind"], SEARCH_BADGES["event"])
+        day  = fmt_date(r["day"]) if r.get("day") else "No date"
+        snip = search_snippet_html(r.get("snippet"))
+        out.append(f"<div data-id='{i}' style='background:white;border:1px solid #e5e7eb;border-left:4px solid {color};"
+                   f"border-radius:6px;padding:0.4rem 0.7rem;margin-bottom:4px;font-size:0.82rem;'>"
+                   f"<span style='background:{bg};color:{color};font-size:0.68rem;font-weight:700;padding:0.05rem 0.45rem;"
+                   f"border-radius:8px;margin-right:6px;'>{label}</span>"
+                   f"<strong style='color:#1a2e4a;'>{escape(r.get('title') or '')}</strong>"
+                   f"<span style='color:#888;font-size:0.75rem;'> · {day}</span>"
+                   + (f"<div style='color:#555;font-size:0.76rem;margin-top:0.2rem;'>{snip}</div>" if snip else "")
+                   + "</div>")
+    return "".join(out)
+
+# ─── CLASH REPORT ───────────────────────────────────────────────────────────────
+# One row per clash, in date order, carrying its day as data-date: clicking a row opens
+# that day in the Month view, where the day panel lists the clash too.
+CLASH_BADGES = {"room": ("Room", EVENT_TYPES["Excursion / Event"]["color"], EVENT_TYPES["Excursion / Event"]["bg"]),
+                "away": ("Absence", EVENT_TYPES[ABSENCE_TYPE]["color"], EVENT_TYPES[ABSENCE_TYPE]["bg"])}
+
+def clash_list_html(clashes):
+    out = []
+    for c in clashes:
+        label, color, bg = CLASH_BADGES[c[0][0]]
+        out.append(f"<div data-date='{c[3].date()}' style='background:white;border:1px solid #e5e7eb;"
+                   f"border-left:4px solid {color};border-radius:6px;padding:0.4rem 0.7rem;margin-bottom:4px;"
+                   f"font-size:0.82rem;'>"
+                   f"<span style='background:{bg};color:{color};font-size:0.68rem;font-weight:700;padding:0.05rem 0.45rem;"
+                   f"border-radius:8px;margin-right:6px;'>{label}</span>"
+                   f"<strong style='color:#1a2e4a;'>{c[3].strftime('%a %-d %b')}</strong>"
+                   f"<span style='color:#374151;'> · {escape(clash_text(c))}</span></div>")
+    return "".join(out)
+
+# ─── VIEW PICKER ────────────────────────────────────────────────────────────────
+def _pick_view(key):
+    # Clicking the selected segment clears the control; stay on that view then
+    if st.session_state[f"{key}_pick"] is not None:
+        st.session_state[key] = st.session_state[f"{key}_pick"]
+
+def view_picker(key, options):
+    """Tab-like segmented control for st.session_state[key], mirrored to ?key= in the URL."""
+    st.session_state[f"{key}_pick"] = st.session_state[key]
+    st.segmented_control(key, list(options), format_func=options.get, key=f"{key}_pick",
+                         on_change=_pick_view, args=(key,), label_visibility="collapsed")
+    st.query_params[key] = st.session_state[key]
+    return st.session_state[key]
+
+# ─── VIEW FRAGMENTS ─────────────────────────────────────────────────────────────
+# Each view (month, week, agenda, year, search, Gantt, meetings, transitions) is an st.fragment, so
+# navigating inside it — Prev / Next, picking a day, opening an edit form — reruns
+# only that view via rerun_view(). Saves and deletes still rerun the whole page.
+# A view rerunning on its own gets a fresh latency budget and reloads the store for
+# its windows, so edits by others and expired cache entries show up without a full
+# run; windows the query cache still holds cost nothing.
+page_done = False   # True once the full script run has finished
+
+def view_fragment(fn):
+    @st.fragment
+    @wraps(fn)
+    def run():
+        global store
+        if page_done:
+            start_budget()
+            store = load_page_store()
+        n_err = 0 if page_done else len(store["errors"])
+        fn()
+        for err in dict.fromkeys(str(e) for e in store["errors"][n_err:]):
+            st.error(f"Could not load calendar events: {err}")
+        if page_done and stale_tables:
+            st.warning(STALE_WARNING)
+    return run
+
+def rerun_view():
+    """Rerun just the current view — or the whole page while a full run is rendering it."""
+    st.rerun(scope="fragment" if page_done else "app")
+
 # ─── HEADER ─────────────────────────────────────────────────────────────────────
 hc1, hc2 = st.columns([4, 1])
 with hc1:
@@ -381,34 +2432,48 @@ with hc2:
         if st.button("Sign Out", use_container_width=True):
             st.session_state.is_admin = False; st.rerun()
 
+# ─── EVENT STORE (this rerun) ───────────────────────────────────────────────────
+if replica:
+    replica.ensure_fresh()
+    if replica.errors:
+        since = datetime.fromtimestamp(replica.oldest()).strftime("%-d %b %-I:%M %p") if replica.oldest() else "—"
+        st.warning(f"📴 Can't reach the calendar database — showing the offline copy from {since}. "
+                   f"New events can't be saved until the connection is back. "
+                   f"({'; '.join(f'{t}: {e}' for t, e in replica.errors.items())})")
+def load_page_store():
+    """The store for view_windows(); the transitions view's reads ride along in the batch."""
+    ss = st.session_state
+    return load_store(view_windows(), also=[partial(query_transitions, fields=["student_initials"]),
+                                            partial(query_transitions, fields=TR_GRID)]
+                      if ss.view == "students" and ss.sv == "transitions" else ())
+
+store = load_page_store()
+for err in dict.fromkeys(str(e) for e in store["errors"]):
+    st.error(f"Could not load calendar events: {err}")
+if stale_tables:
+    st.warning(STALE_WARNING)
+if notes := st.session_state.pop("clash_notice", None):   # found by the save that reran the page
+    st.warning("⚠️ **Saved, but it clashes**\n\n" + "\n".join(f"- {m}" for m in notes))
+
 # ─── TODAY STRIP ────────────────────────────────────────────────────────────────
-t_evs = db_events(today, today) + pac_events(db_pac(), today, today)
+t_evs = store_slice(store, today, today, VIEW_FIELDS["today"])
 t_evs.sort(key=lambda x: str(x.get("start_time","")))
-chips = []
-for ev in t_evs:
-    cfg = EVENT_TYPES.get(ev.get("event_type","Other"), EVENT_TYPES["Other"])
-    prog = ev.get("program","")
-    if prog and ev.get("event_type") in STUDENT_EVENT_TYPES:
-        pc = PROGRAM_COLORS.get(prog,{})
-        cfg = {"color": pc.get("color",cfg["color"]), "bg": pc.get("bg",cfg["bg"]), "emoji": cfg["emoji"]}
-    t   = fmt_time(ev.get("start_time",""))
-    init = ev.get("student_initials","")
-    label = ev.get("title","") + (f" ({init})" if init else "")
-    chips.append(f'<span style="background:{cfg["bg"]};color:{cfg["color"]};border-radius:6px;padding:0.2rem 0.6rem;font-size:0.78rem;font-weight:500;">{cfg["emoji"]} {label}{("  "+t) if t else ""}</span>')
+chips = [today_chip_html(ev) for ev in t_evs]
 ev_strip = " &nbsp;".join(chips) if chips else '<span style="color:#999;font-size:0.82rem;">No events scheduled today</span>'
 st.markdown(f'<div class="today-strip"><div class="ts-date">📍 Today — {today.strftime("%A %-d %B %Y")}</div><div style="display:flex;flex-wrap:wrap;gap:0.4rem;">{ev_strip}</div></div>', unsafe_allow_html=True)
 
-# ─── TABS ───────────────────────────────────────────────────────────────────────
-tab_month, tab_week, tab_list, tab_students = st.tabs(["🗓️ Month", "📋 Week", "📃 Agenda", "👨‍🎓 Students"])
+# ─── VIEWS ──────────────────────────────────────────────────────────────────────
+view = view_picker("view", VIEWS)
 
 # ═══════════════ MONTH VIEW ════════════════════════════════════════════════════
-with tab_month:
+@view_fragment
+def month_view():
     cp, ct, cn, ctod = st.columns([1,3,1,1])
     with cp:
         if st.button("◀ Prev", use_container_width=True, key="m_prev"):
             if st.session_state.cal_month == 1: st.session_state.cal_month=12; st.session_state.cal_year-=1
             else: st.session_state.cal_month-=1
-            st.rerun()
+            rerun_view()
     with ct:
         mn = datetime(st.session_state.cal_year, st.session_state.cal_month, 1)
         st.markdown(f"<h3 style='text-align:center;margin:0;color:#1a2e4a;'>{mn.strftime('%B %Y')}</h3>", unsafe_allow_html=True)
@@ -416,105 +2481,74 @@ with tab_month:
         if st.button("Next ▶", use_container_width=True, key="m_next"):
             if st.session_state.cal_month == 12: st.session_state.cal_month=1; st.session_state.cal_year+=1
             else: st.session_state.cal_month+=1
-            st.rerun()
+            rerun_view()
     with ctod:
         if st.button("Today", use_container_width=True, key="m_today"):
             st.session_state.cal_year=today.year; st.session_state.cal_month=today.month
-            select_day(today); st.rerun()
+            select_day(today); rerun_view()
 
     yr, mo = st.session_state.cal_year, st.session_state.cal_month
     fd = date(yr, mo, 1)
     ld = date(yr, mo, calendar.monthrange(yr, mo)[1])
-    evs  = db_events(fd-timedelta(days=7), ld+timedelta(days=7))
-    evs += pac_events(db_pac(), fd-timedelta(days=7), ld+timedelta(days=7))
-    idx  = ev_index(evs)
+    evs  = store_slice(store, fd-timedelta(days=7), ld+timedelta(days=7), VIEW_FIELDS["month"])
+    idx  = DayIndex(evs, fd-timedelta(days=7), ld+timedelta(days=7))
     ts   = str(today)
     ss   = str(st.session_state.selected_date)
 
     # ── Month grid ──
-    # CSS to hide the day-cell click buttons in month grid only
-    st.markdown("""
-    <style>
-    div.month-day-btn > div[data-testid="stButton"] button {
-        opacity:0 !important; height:10px !important; min-height:0 !important;
-        padding:0 !important; margin:-6px 0 0 !important;
-        border:none !important; background:transparent !important;
-    }
-    </style>""", unsafe_allow_html=True)
-
+    # One component for the whole grid; a click on a day comes back as its date
     day_headers = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
-    hcols = st.columns(7)
-    for i, dn in enumerate(day_headers):
-        with hcols[i]:
-            st.markdown(f"<div style='text-align:center;font-weight:700;font-size:0.78rem;"
-                        f"color:#1a2e4a;padding:0.3rem 0;border-bottom:2px solid #e5e7eb;"
-                        f"margin-bottom:0.4rem;'>{dn}</div>", unsafe_allow_html=True)
-
+    grid = "".join(f"<div style='text-align:center;font-weight:700;font-size:0.78rem;"
+                   f"color:#1a2e4a;padding:0.3rem 0;border-bottom:2px solid #e5e7eb;'>{dn}</div>"
+                   for dn in day_headers)
     for week in calendar.monthcalendar(yr, mo):
-        wcols = st.columns(7)
-        for i, day in enumerate(week):
-            with wcols[i]:
-                if day == 0:
-                    st.markdown("<div style='min-height:80px;'></div>", unsafe_allow_html=True)
-                    continue
-                d = date(yr, mo, day); ds = str(d)
-                is_today = ds == ts; is_sel = ds == ss
-                day_evs  = idx.get(ds, [])
-
-                border = "3px solid #d4af37" if is_today else ("3px solid #1a2e4a" if is_sel else "1px solid #e5e7eb")
-                bg     = "#fffef5" if is_today else ("#e8edf3" if is_sel else "white")
-                num_col= "#d4af37" if is_today else ("#1a2e4a" if is_sel else "#374151")
-                badge  = (f"<span style='background:#d4af37;color:white;border-radius:50%;"
-                          f"width:22px;height:22px;display:inline-flex;align-items:center;"
-                          f"justify-content:center;font-size:0.72rem;font-weight:800;'>{day}</span>"
-                          if is_today else
-                          f"<span style='color:{num_col};font-weight:700;font-size:0.82rem;'>{day}</span>")
-
-                chips_html = ""
-                for ev in day_evs[:2]:
-                    etype = ev.get("event_type","Other"); prog = ev.get("program","")
-                    if prog and etype in STUDENT_EVENT_TYPES:
-                        pc=PROGRAM_COLORS.get(prog,{}); cbg=pc.get("bg","#f3f4f6"); ccol=pc.get("color","#374151")
-                        emoji=EVENT_TYPES.get(etype,EVENT_TYPES["Other"])["emoji"]
-                    else:
-                        cfg=EVENT_TYPES.get(etype,EVENT_TYPES["Other"]); cbg=cfg["bg"]; ccol=cfg["color"]; emoji=cfg["emoji"]
-                    lbl = ev.get("student_initials","") or ev.get("title","")
-                    lbl = lbl[:10]+"…" if len(lbl)>10 else lbl
-                    chips_html += (f"<div style='background:{cbg};color:{ccol};border-radius:4px;"
-                                   f"padding:0.1rem 0.3rem;font-size:0.62rem;font-weight:600;"
-                                   f"margin-bottom:2px;overflow:hidden;text-overflow:ellipsis;"
-                                   f"white-space:nowrap;'>{emoji} {lbl}</div>")
-                if len(day_evs) > 2:
-                    chips_html += f"<div style='font-size:0.6rem;color:#888;'>+{len(day_evs)-2} more</div>"
-
-                st.markdown(
-                    f"<div style='border:{border};border-radius:8px;background:{bg};"
-                    f"padding:0.4rem;min-height:80px;'>"
-                    f"<div style='margin-bottom:4px;'>{badge}</div>{chips_html}</div>",
-                    unsafe_allow_html=True)
-                # Hidden click button
-                if st.button(" ", key=f"mday_{yr}_{mo}_{day}", use_container_width=True):
-                    select_day(d)
-                    st.session_state.cal_year  = yr
-                    st.session_state.cal_month = mo
-                    st.session_state.quick_add_open = len(day_evs) == 0
-                    st.session_state.selected_event_id = None
-                    st.rerun()
+        for day in week:
+            if day == 0:
+                grid += "<div style='min-height:80px;'></div>"
+                continue
+            d = date(yr, mo, day); ds = str(d)
+            is_today = ds == ts; is_sel = ds == ss
+            day_evs  = idx.on(d)
+
+            border = "3px solid #d4af37" if is_today else ("3px solid #1a2e4a" if is_sel else "1px solid #e5e7eb")
+            bg     = "#fffef5" if is_today else ("#e8edf3" if is_sel else "white")
+            num_col= "#d4af37" if is_today else ("#1a2e4a" if is_sel else "#374151")
+            badge  = (f"<span style='background:#d4af37;color:white;border-radius:50%;"
+                      f"width:22px;height:22px;display:inline-flex;align-items:center;"
+                      f"justify-content:center;font-size:0.72rem;font-weight:800;'>{day}</span>"
+                      if is_today else
+                      f"<span style='color:{num_col};font-weight:700;font-size:0.82rem;'>{day}</span>")
+
+            chips_html = "".join(month_chip_html(ev) for ev in day_evs[:2])
+            if len(day_evs) > 2:
+                chips_html += f"<div style='font-size:0.6rem;color:#888;'>+{len(day_evs)-2} more</div>"
+
+            grid += (f"<div data-date='{ds}' style='border:{border};border-radius:8px;background:{bg};"
+                     f"padding:0.4rem;min-height:80px;'>"
+                     f"<div style='margin-bottom:4px;'>{badge}</div>{chips_html}</div>")
+
+    picked = cal_grid(grid, key="m_grid")
+    if picked:
+        select_day(picked)
+        st.session_state.quick_add_open = not idx.on(picked)
+        st.session_state.selected_event_id = None
+        rerun_view()
 
     st.markdown("<br>", unsafe_allow_html=True)
 
     # Jump to date
     jumped = st.date_input("Jump to date:", value=st.session_state.selected_date, key="m_jump", label_visibility="collapsed")
     if jumped != st.session_state.selected_date:
-        select_day(jumped); st.session_state.cal_year=jumped.year; st.session_state.cal_month=jumped.month; st.rerun()
+        select_day(jumped); st.session_state.cal_year=jumped.year; st.session_state.cal_month=jumped.month; rerun_view()
 
     st.markdown("---")
 
     # ── Day panel ──
     sel = st.session_state.selected_date
-    d_evs = db_events(sel, sel) + pac_events(db_pac(), sel, sel)
+    d_evs = store_slice(store, sel, sel, VIEW_FIELDS["day"])
     d_evs.sort(key=lambda x: str(x.get("start_time","")))
     st.markdown(f"### {'📍 ' if sel==today else ''}📅 {sel.strftime('%A %-d %B %Y')}")
+    clash_warning(d_evs, sel)
 
     if not d_evs:
         st.markdown('<div class="add-prompt">📭 No events on this day — click ➕ below to add one</div>', unsafe_allow_html=True)
@@ -522,87 +2556,51 @@ with tab_month:
     for ev in d_evs:
         eid    = ev.get("id","")
         pac    = str(eid).startswith("pac_")
-        cfg_ev = EVENT_TYPES.get(ev.get("event_type","Other"), EVENT_TYPES["Other"])
-        prog   = ev.get("program","")
-        ecol   = (PROGRAM_COLORS.get(prog,{}).get("color", cfg_ev["color"])
-                  if prog and ev.get("event_type") in STUDENT_EVENT_TYPES else cfg_ev["color"])
-        ebg    = (PROGRAM_COLORS.get(prog,{}).get("bg", cfg_ev["bg"])
-                  if prog and ev.get("event_type") in STUDENT_EVENT_TYPES else cfg_ev["bg"])
-        tr_ev  = fmt_time(ev.get("start_time",""))
-        if ev.get("end_time"): tr_ev += f" – {fmt_time(ev['end_time'])}"
         can_edit = (st.session_state.is_admin or ev.get("event_type") in STUDENT_EVENT_TYPES) and not pac
-        is_expanded = st.session_state.selected_event_id == eid
+        is_expanded = str(st.session_state.selected_event_id) == str(eid)   # search hands over text ids
 
         # Event row
-        ev_cols = st.columns([7, 1, 1, 1])
-        with ev_cols[0]:
-            st.markdown(
-                f'<div class="ev-card" style="background:{ebg};border-left-color:{ecol};">'
-                f'<h4 style="color:{ecol};margin:0 0 0.2rem;">{cfg_ev["emoji"]} {ev.get("title","")}'
-                f'{(" · "+ev.get("student_initials","")) if ev.get("student_initials") else ""}</h4>'
-                f'<div class="meta">'
-                f'{(" ⏰ "+tr_ev) if tr_ev else ""}'
-                f'{(" 📍 "+ev.get("location","")) if ev.get("location") else ""}'
-                f'{(" 👤 "+ev.get("added_by","")) if ev.get("added_by") else ""}'
-                f'</div></div>', unsafe_allow_html=True)
-        with ev_cols[1]:
+        row_cols = st.columns([7, 1, 1, 1])
+        with row_cols[0]:
+            st.markdown(day_card_html(ev), unsafe_allow_html=True)
+        with row_cols[1]:
             st.write("")
             lbl = "✖" if is_expanded else "🔍"
             if st.button(lbl, key=f"mdet_{eid}", help="View details" if not is_expanded else "Close"):
                 st.session_state.selected_event_id = None if is_expanded else eid
-                st.rerun()
-        with ev_cols[2]:
+                rerun_view()
+        with row_cols[2]:
             if can_edit:
                 st.write("")
                 if st.button("✏️", key=f"med_{eid}", help="Edit"):
                     st.session_state.edit_event_id = eid if st.session_state.edit_event_id != eid else None
-                    st.rerun()
-        with ev_cols[3]:
+                    rerun_view()
+        with row_cols[3]:
             if st.session_state.is_admin and not pac:
                 st.write("")
                 confirm_key = f"confirm_del_{eid}"
                 if st.session_state.get(confirm_key):
                     if st.button("✅ Yes", key=f"mdel_yes_{eid}", help="Confirm delete", type="primary"):
-                        del_event(eid)
+                        del_event(eid, st.session_state.get(f"mdel_scope_{eid}", "this"))
                         st.session_state[confirm_key] = False
                         st.rerun()
                 else:
                     if st.button("🗑️", key=f"mdel_{eid}", help="Delete event"):
                         st.session_state[confirm_key] = True
-                        st.rerun()
+                        rerun_view()
+        if ev.get("series_id") and st.session_state.get(f"confirm_del_{eid}"):
+            st.radio("Delete", list(SERIES_SCOPES), format_func=SERIES_SCOPES.get, horizontal=True,
+                     key=f"mdel_scope_{eid}")
 
         # ── Inline detail panel — expands directly under the event ──
         if is_expanded:
-            edate = fmt_date(ev.get("event_date",""))
-            if ev.get("end_date") and ev["end_date"] != ev.get("event_date"):
-                edate += f" → {fmt_date(ev['end_date'])}"
-            prog_badge = ""
-            if prog:
-                pc = PROGRAM_COLORS.get(prog,{})
-                prog_badge = (f'<span style="background:{pc.get("bg","#f3f4f6")};color:{pc.get("color","#374151")};'
-                              f'font-size:0.7rem;font-weight:700;padding:0.15rem 0.5rem;border-radius:20px;margin-left:6px;">{prog}</span>')
-            st.markdown(
-                f'<div style="background:{ebg};border:2px solid {ecol};border-radius:12px;'
-                f'padding:1rem 1.25rem;margin:0.25rem 0 0.75rem;'
-                f'box-shadow:0 3px 12px rgba(0,0,0,0.1);">'
-                f'<div style="font-weight:800;color:{ecol};font-size:1rem;margin-bottom:0.6rem;">'
-                f'{cfg_ev["emoji"]} {ev.get("title","")}'
-                f'<span style="background:{ecol};color:white;font-size:0.68rem;font-weight:700;'
-                f'padding:0.15rem 0.5rem;border-radius:20px;margin-left:8px;">{ev.get("event_type","")}</span>'
-                f'{prog_badge}</div>'
-                f'<div style="display:grid;grid-template-columns:1fr 1fr;gap:0.4rem;font-size:0.84rem;color:#374151;">'
-                f'<div>📅 <b>Date:</b> {edate}</div>'
-                f'{f"<div>⏰ <b>Time:</b> {tr_ev}</div>" if tr_ev else "<div></div>"}'
-                f'{f"<div>📍 <b>Location:</b> {ev.get(chr(108)+chr(111)+chr(99)+chr(97)+chr(116)+chr(105)+chr(111)+chr(110))}</div>" if ev.get("location") else "<div></div>"}'
-                f'{f"<div>👤 <b>Added by:</b> {ev.get(chr(97)+chr(100)+chr(100)+chr(101)+chr(100)+chr(95)+chr(98)+chr(121))}</div>" if ev.get("added_by") else "<div></div>"}'
-                f'</div>'
-                f'{f'<div style="margin-top:0.5rem;font-size:0.84rem;color:#555;border-top:1px solid rgba(0,0,0,0.08);padding-top:0.4rem;">{ev.get("notes")}</div>' if ev.get("notes") else ""}'
-                f'</div>', unsafe_allow_html=True)
+            if not pac: ev = with_details(eid, ev)   # day rows don't carry notes
+            st.markdown(day_detail_html(ev), unsafe_allow_html=True)
 
         # Edit form inline
-        if st.session_state.edit_event_id == eid and can_edit:
+        if st.session_state.edit_event_id == eid and can_edit and (full := event_for_edit(eid)):
             st.markdown("**✏️ Edit event:**")
-            ok, data = event_form(f"mef_{eid}", existing=ev, label="💾 Save Changes")
+            ok, data = event_form(f"mef_{eid}", existing=full, label="💾 Save Changes")
             if ok:
                 upd_event(eid, data); st.session_state.edit_event_id=None
                 st.success("Updated!"); st.rerun()
@@ -616,116 +2614,82 @@ with tab_month:
             st.success(f"✅ '{data['title']}' added!")
             st.rerun()
 
+if view == "month":
+    month_view()
+
 # ═══════════════ WEEK VIEW ═════════════════════════════════════════════════════
-with tab_week:
-    # Hide the transparent overlay buttons on day tabs
-    st.markdown("""<style>
-    .week-tab-btn > div[data-testid="stButton"] button {
-        opacity:0 !important; height:10px !important; min-height:0 !important;
-        padding:0 !important; margin:-22px 0 0 !important;
-        border:none !important; background:transparent !important;
-    }
-    </style>""", unsafe_allow_html=True)
+@view_fragment
+def week_view():
     ws = st.session_state.cal_week_start
     we = ws + timedelta(days=6)
     wp, wt, wn, wtod = st.columns([1,3,1,1])
     with wp:
         if st.button("◀ Prev", use_container_width=True, key="w_prev"):
-            st.session_state.cal_week_start -= timedelta(weeks=1); st.rerun()
+            st.session_state.cal_week_start -= timedelta(weeks=1); rerun_view()
     with wt:
         st.markdown(f"<h3 style='text-align:center;margin:0;color:#1a2e4a;'>{fmt_date(ws)} – {fmt_date(we)}</h3>", unsafe_allow_html=True)
     with wn:
         if st.button("Next ▶", use_container_width=True, key="w_next"):
-            st.session_state.cal_week_start += timedelta(weeks=1); st.rerun()
+            st.session_state.cal_week_start += timedelta(weeks=1); rerun_view()
     with wtod:
         if st.button("Today", use_container_width=True, key="w_today"):
-            st.session_state.cal_week_start = today-timedelta(days=today.weekday()); select_day(today); st.rerun()
+            st.session_state.cal_week_start = today-timedelta(days=today.weekday()); select_day(today); rerun_view()
 
-    wevs  = db_events(ws, we) + pac_events(db_pac(), ws, we)
-    widx  = ev_index(wevs)
+    wevs  = store_slice(store, ws, we, VIEW_FIELDS["week"])
+    widx  = DayIndex(wevs, ws, we)
     ts    = str(today)
     ss    = str(st.session_state.selected_date)
     dnames= ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
 
-    wcols = st.columns(7)
-    for i, wc in enumerate(wcols):
+    # One component for the strip: clicking a day card or its tab selects the day
+    grid = ""
+    for i in range(7):
         d    = ws + timedelta(days=i); ds = str(d)
         itod = ds==ts; isel = ds==ss
         top  = "#d4af37" if itod else ("#1a2e4a" if isel else "#e0e0e0")
-        bg   = "#fffef5" if itod else ("f0f4ff" if isel else "white")
-        with wc:
-            # Day header - clicking selects the day
-            num_col = "#d4af37" if itod else ("#1a2e4a" if isel else "#374151")
-            badge = (f"<span style='background:#d4af37;color:white;border-radius:50%;"
-                     f"width:22px;height:22px;display:inline-flex;align-items:center;"
-                     f"justify-content:center;font-size:0.72rem;font-weight:800;'>{d.day}</span>"
-                     if itod else
-                     f"<span style='font-weight:700;color:{num_col};'>{d.day}</span>")
-            st.markdown(
-                f"<div style='border-top:3px solid {top};background:{bg};border-radius:8px;"
-                f"padding:0.4rem;min-height:90px;'>"
-                f"<div style='font-size:0.7rem;font-weight:700;color:#888;text-transform:uppercase;"
-                f"letter-spacing:0.05em;'>{dnames[i]}</div>"
-                f"<div style='margin:2px 0 6px;'>{badge}</div>",
-                unsafe_allow_html=True)
-            for ev in widx.get(ds, []):
-                etype = ev.get("event_type","Other"); prog = ev.get("program","")
-                if prog and etype in STUDENT_EVENT_TYPES:
-                    pc=PROGRAM_COLORS.get(prog,{}); cbg=pc.get("bg","#f3f4f6"); ccol=pc.get("color","#374151")
-                    emoji=EVENT_TYPES.get(etype,EVENT_TYPES["Other"])["emoji"]
-                else:
-                    cfg=EVENT_TYPES.get(etype,EVENT_TYPES["Other"]); cbg=cfg["bg"]; ccol=cfg["color"]; emoji=cfg["emoji"]
-                t     = fmt_time(ev.get("start_time",""))
-                title = ev.get("student_initials","") or ev.get("title","")
-                short = title[:9]+"…" if len(title)>9 else title
-                st.markdown(
-                    f"<div style='background:{cbg};border-left:3px solid {ccol};border-radius:4px;"
-                    f"padding:0.15rem 0.3rem;margin-bottom:3px;font-size:0.68rem;'>"
-                    f"<span style='font-weight:600;color:{ccol};'>{emoji} {short}</span>"
-                    f"{f'<br><span style=chr(34)color:#777;font-size:0.62rem;{chr(34)}>{t}</span>' if t else ''}"
-                    f"</div>", unsafe_allow_html=True)
-            if not widx.get(ds,[]):
-                st.markdown("<div style='color:#ddd;font-size:0.72rem;text-align:center;padding:0.3rem 0;'>—</div>",
-                            unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-            # Coloured button directly — label carries the colour info via CSS keyed on index
-            n_evs = len(widx.get(ds,[]))
-            if isel:
-                tab_bg = "#1a2e44"; tab_col = "white"
-                tab_lbl = "✅ Selected"
-            elif itod:
-                tab_bg = "#d4af37"; tab_col = "white"
-                tab_lbl = (f"📍 {n_evs} event{'s' if n_evs!=1 else ''}") if n_evs else "📍 Today"
-            elif n_evs:
-                tab_bg = "#2d4a6e"; tab_col = "white"
-                tab_lbl = f"👁 {n_evs} event{'s' if n_evs!=1 else ''}"
-            else:
-                tab_bg = "#6b7280"; tab_col = "white"
-                tab_lbl = "➕ Add"
-            # Inject CSS targeting this specific column button
-            st.markdown(
-                f"<style>div[data-testid='column']:nth-child({i+1}) "
-                f"button[data-testid='baseButton-secondary'] {{"
-                f" background-color:{tab_bg} !important;"
-                f" color:{tab_col} !important;"
-                f" border:none !important;"
-                f" font-size:0.68rem !important;"
-                f" font-weight:700 !important;"
-                f" padding:0.3rem 0.1rem !important;"
-                f" border-radius:6px !important; }}</style>",
-                unsafe_allow_html=True)
-            if st.button(tab_lbl, key=f"wsel_{i}", use_container_width=True):
-                select_day(d)
-                st.session_state.selected_event_id = None
-                st.rerun()
+        bg   = "#fffef5" if itod else ("#f0f4ff" if isel else "white")
+        num_col = "#d4af37" if itod else ("#1a2e4a" if isel else "#374151")
+        badge = (f"<span style='background:#d4af37;color:white;border-radius:50%;"
+                 f"width:22px;height:22px;display:inline-flex;align-items:center;"
+                 f"justify-content:center;font-size:0.72rem;font-weight:800;'>{d.day}</span>"
+                 if itod else
+                 f"<span style='font-weight:700;color:{num_col};'>{d.day}</span>")
+        chips_html = "".join(week_chip_html(ev) for ev in widx.on(d))
+        if not chips_html:
+            chips_html = "<div style='color:#ddd;font-size:0.72rem;text-align:center;padding:0.3rem 0;'>—</div>"
+        n_evs = len(widx.on(d))
+        if isel:
+            tab_bg, tab_lbl = "#1a2e44", "✅ Selected"
+        elif itod:
+            tab_bg, tab_lbl = "#d4af37", (f"📍 {n_evs} event{'s' if n_evs!=1 else ''}") if n_evs else "📍 Today"
+        elif n_evs:
+            tab_bg, tab_lbl = "#2d4a6e", f"👁 {n_evs} event{'s' if n_evs!=1 else ''}"
+        else:
+            tab_bg, tab_lbl = "#6b7280", "➕ Add"
+        grid += (f"<div style='display:flex;flex-direction:column;gap:6px;'>"
+                 f"<div data-date='{ds}' style='border-top:3px solid {top};background:{bg};border-radius:8px;"
+                 f"padding:0.4rem;min-height:90px;flex:1;'>"
+                 f"<div style='font-size:0.7rem;font-weight:700;color:#888;text-transform:uppercase;"
+                 f"letter-spacing:0.05em;'>{dnames[i]}</div>"
+                 f"<div style='margin:2px 0 6px;'>{badge}</div>{chips_html}</div>"
+                 f"<div data-date='{ds}' style='background:{tab_bg};color:white;border-radius:6px;"
+                 f"font-size:0.68rem;font-weight:700;padding:0.3rem 0.1rem;text-align:center;'>{tab_lbl}</div>"
+                 f"</div>")
+
+    picked = cal_grid(grid, key="w_grid")
+    if picked:
+        select_day(picked)
+        st.session_state.selected_event_id = None
+        rerun_view()
 
     st.markdown("---")
 
     # ── Day panel — same inline detail expansion as month view ──
     sel   = st.session_state.selected_date
-    d_evs = db_events(sel, sel) + pac_events(db_pac(), sel, sel)
+    d_evs = store_slice(store, sel, sel, VIEW_FIELDS["day"])
     d_evs.sort(key=lambda x: str(x.get("start_time","")))
     st.markdown(f"### {'📍 ' if sel==today else ''}📅 {sel.strftime('%A %-d %B %Y')}")
+    clash_warning(d_evs, sel)
 
     if not d_evs:
         st.markdown('<div class="add-prompt">📭 No events on this day — click a day above or use ➕ below</div>',
@@ -734,83 +2698,48 @@ with tab_week:
     for ev in d_evs:
         eid    = ev.get("id","")
         pac    = str(eid).startswith("pac_")
-        cfg_ev = EVENT_TYPES.get(ev.get("event_type","Other"), EVENT_TYPES["Other"])
-        prog   = ev.get("program","")
-        ecol   = (PROGRAM_COLORS.get(prog,{}).get("color", cfg_ev["color"])
-                  if prog and ev.get("event_type") in STUDENT_EVENT_TYPES else cfg_ev["color"])
-        ebg    = (PROGRAM_COLORS.get(prog,{}).get("bg", cfg_ev["bg"])
-                  if prog and ev.get("event_type") in STUDENT_EVENT_TYPES else cfg_ev["bg"])
-        tr_ev  = fmt_time(ev.get("start_time",""))
-        if ev.get("end_time"): tr_ev += f" – {fmt_time(ev['end_time'])}"
         can_edit  = (st.session_state.is_admin or ev.get("event_type") in STUDENT_EVENT_TYPES) and not pac
-        is_expanded = st.session_state.selected_event_id == eid
-
-        ev_cols = st.columns([7, 1, 1, 1])
-        with ev_cols[0]:
-            st.markdown(
-                f'<div class="ev-card" style="background:{ebg};border-left-color:{ecol};">'
-                f'<h4 style="color:{ecol};margin:0 0 0.2rem;">{cfg_ev["emoji"]} {ev.get("title","")}'
-                f'{(" · "+ev.get("student_initials","")) if ev.get("student_initials") else ""}</h4>'
-                f'<div class="meta">'
-                f'{(" ⏰ "+tr_ev) if tr_ev else ""}'
-                f'{(" 📍 "+ev.get("location","")) if ev.get("location") else ""}'
-                f'{(" 👤 "+ev.get("added_by","")) if ev.get("added_by") else ""}'
-                f'</div></div>', unsafe_allow_html=True)
-        with ev_cols[1]:
+        is_expanded = str(st.session_state.selected_event_id) == str(eid)   # search hands over text ids
+
+        row_cols = st.columns([7, 1, 1, 1])
+        with row_cols[0]:
+            st.markdown(day_card_html(ev), unsafe_allow_html=True)
+        with row_cols[1]:
             st.write("")
             if st.button("✖" if is_expanded else "🔍", key=f"wdet2_{eid}",
                          help="Close" if is_expanded else "View details"):
                 st.session_state.selected_event_id = None if is_expanded else eid
-                st.rerun()
-        with ev_cols[2]:
+                rerun_view()
+        with row_cols[2]:
             if can_edit:
                 st.write("")
                 if st.button("✏️", key=f"wed_{eid}", help="Edit"):
                     st.session_state.edit_event_id = eid if st.session_state.edit_event_id != eid else None
-                    st.rerun()
-        with ev_cols[3]:
+                    rerun_view()
+        with row_cols[3]:
             if st.session_state.is_admin and not pac:
                 st.write("")
                 confirm_key = f"confirm_del_{eid}"
                 if st.session_state.get(confirm_key):
                     if st.button("✅ Yes", key=f"wdel_yes_{eid}", help="Confirm delete", type="primary"):
-                        del_event(eid)
+                        del_event(eid, st.session_state.get(f"wdel_scope_{eid}", "this"))
                         st.session_state[confirm_key] = False
                         st.rerun()
                 else:
                     if st.button("🗑️", key=f"wdel_{eid}", help="Delete event"):
                         st.session_state[confirm_key] = True
-                        st.rerun()
+                        rerun_view()
+        if ev.get("series_id") and st.session_state.get(f"confirm_del_{eid}"):
+            st.radio("Delete", list(SERIES_SCOPES), format_func=SERIES_SCOPES.get, horizontal=True,
+                     key=f"wdel_scope_{eid}")
 
         if is_expanded:
-            edate = fmt_date(ev.get("event_date",""))
-            if ev.get("end_date") and ev["end_date"] != ev.get("event_date"):
-                edate += f" → {fmt_date(ev['end_date'])}"
-            prog_badge = ""
-            if prog:
-                pc = PROGRAM_COLORS.get(prog,{})
-                prog_badge = (f'<span style="background:{pc.get("bg","#f3f4f6")};color:{pc.get("color","#374151")};'
-                              f'font-size:0.7rem;font-weight:700;padding:0.15rem 0.5rem;border-radius:20px;margin-left:6px;">{prog}</span>')
-            st.markdown(
-                f'<div style="background:{ebg};border:2px solid {ecol};border-radius:12px;'
-                f'padding:1rem 1.25rem;margin:0.25rem 0 0.75rem;box-shadow:0 3px 12px rgba(0,0,0,0.1);">'
-                f'<div style="font-weight:800;color:{ecol};font-size:1rem;margin-bottom:0.6rem;">'
-                f'{cfg_ev["emoji"]} {ev.get("title","")}'
-                f'<span style="background:{ecol};color:white;font-size:0.68rem;font-weight:700;'
-                f'padding:0.15rem 0.5rem;border-radius:20px;margin-left:8px;">{ev.get("event_type","")}</span>'
-                f'{prog_badge}</div>'
-                f'<div style="display:grid;grid-template-columns:1fr 1fr;gap:0.4rem;font-size:0.84rem;color:#374151;">'
-                f'<div>📅 <b>Date:</b> {edate}</div>'
-                f'{f"<div>⏰ <b>Time:</b> {tr_ev}</div>" if tr_ev else "<div></div>"}'
-                f'{f"<div>📍 <b>Location:</b> {ev.get('location','')}</div>" if ev.get("location") else "<div></div>"}'
-                f'{f"<div>👤 <b>Added by:</b> {ev.get('added_by','')}</div>" if ev.get("added_by") else "<div></div>"}'
-                f'</div>'
-                f'{f'<div style="margin-top:0.5rem;font-size:0.84rem;color:#555;border-top:1px solid rgba(0,0,0,0.08);padding-top:0.4rem;">{ev.get("notes")}</div>' if ev.get("notes") else ""}'
-                f'</div>', unsafe_allow_html=True)
-
-        if st.session_state.edit_event_id == eid and can_edit:
+            if not pac: ev = with_details(eid, ev)   # day rows don't carry notes
+            st.markdown(day_detail_html(ev), unsafe_allow_html=True)
+
+        if st.session_state.edit_event_id == eid and can_edit and (full := event_for_edit(eid)):
             st.markdown("**✏️ Edit event:**")
-            ok, data = event_form(f"wef_{eid}", existing=ev, label="💾 Save Changes")
+            ok, data = event_form(f"wef_{eid}", existing=full, label="💾 Save Changes")
             if ok:
                 upd_event(eid, data); st.session_state.edit_event_id=None
                 st.success("Updated!"); st.rerun()
@@ -819,8 +2748,12 @@ with tab_week:
         ok, data = event_form(f"wadd_{str(sel)}", default_date=sel)
         if ok: save_event(data); st.success(f"✅ '{data['title']}' added!"); st.rerun()
 
+if view == "week":
+    week_view()
+
 # ═══════════════ AGENDA VIEW ══════════════════════════════════════════════════
-with tab_list:
+@view_fragment
+def agenda_view():
     lc1, lc2, lc3 = st.columns(3)
     with lc1: ls = st.date_input("From", value=today, key="ls")
     with lc2: le = st.date_input("To",   value=today+timedelta(weeks=8), key="le")
@@ -830,29 +2763,197 @@ with tab_list:
         ok, data = event_form("ladd")
         if ok: save_event(data); st.success(f"✅ '{data['title']}' added!"); st.rerun()
 
+    if st.session_state.is_admin:
+        import_panel()
+
     st.markdown("---")
-    levs  = db_events(ls, le) + pac_events(db_pac(), ls, le)
-    levs  = [e for e in levs if e.get("event_type") in tf]
-    levs.sort(key=lambda x: (str(x.get("event_date","")), str(x.get("start_time",""))))
+    # "Load more" keeps its count only while the range and filter stay the same
+    a_sig = (ls, le, tuple(tf))
+    if st.session_state.get("agenda_sig") != a_sig:
+        st.session_state.agenda_sig = a_sig; st.session_state.agenda_pages = 1
+    try:
+        levs, more = agenda_events(store, ls, le, tf, st.session_state.agenda_pages)
+    except DbUnavailable as e:
+        st.warning(f"Couldn't load the agenda right now ({e}). Try again in a moment.")
+        levs, more = [], False
 
     if not levs:
         st.markdown('<div class="info-box">No events in this date range.</div>', unsafe_allow_html=True)
     else:
-        st.markdown(f"**{len(levs)} event{'s' if len(levs)!=1 else ''} found**")
-        cur_d = None
-        for ev in levs:
-            eds = str(ev.get("event_date",""))[:10]
-            if eds != cur_d:
-                cur_d = eds
-                try:
-                    do = datetime.strptime(eds,"%Y-%m-%d").date()
-                    lbl = f"📍 **TODAY — {do.strftime('%A %-d %B %Y')}**" if do==today else f"**{do.strftime('%A %-d %B %Y')}**"
+        ac1, ac2 = st.columns([3,1])
+        with ac1:
+            st.markdown(f"**{'First ' if more else ''}{len(levs)} event{'s' if len(levs)!=1 else ''} "
+                        f"{'shown' if more else 'found'}**")
+        with ac2:
+            compact = st.toggle("Compact list", value=True, key="agenda_compact",
+                                help="One row per event; click a row to view, edit or delete it")
+        if compact:
+            # Only the selected row gets a card, buttons and (on ✏️) the edit form
+            by_id = {str(ev.id): ev for ev in levs}
+            sel   = st.session_state.get("agenda_sel")
+            if sel not in by_id: sel = None
+            if sel:
+                sc1, sc2 = st.columns([6,1])
+                with sc1: st.markdown("**Selected event**")
+                with sc2:
+                    if st.button("✖ Close", key="agenda_close", use_container_width=True):
+                        st.session_state.agenda_sel = None; st.session_state.edit_event_id = None
+                        rerun_view()
+                render_event_card(by_id[sel], "l")
+            picked = cal_list(agenda_list_html(levs, sel), key="a_list")
+            if picked:
+                st.session_state.agenda_sel = None if picked == sel else picked
+                st.session_state.edit_event_id = None
+                rerun_view()
+        else:
+            cur_d = None
+            for ev in levs:
+                if ev.day != cur_d:
+                    cur_d = ev.day
+                    lbl = f"📍 **TODAY — {cur_d.strftime('%A %-d %B %Y')}**" if cur_d==today else f"**{cur_d.strftime('%A %-d %B %Y')}**"
                     st.markdown(lbl)
-                except: st.markdown(f"**{eds}**")
-            render_event_card(ev, "l")
+                render_event_card(ev, "l")
+        if more and st.button("⬇️ Load more", key="agenda_more", use_container_width=True):
+            st.session_state.agenda_pages += 1
+            rerun_view()
+
+if view == "agenda":
+    agenda_view()
+
+# ═══════════════ YEAR VIEW ════════════════════════════════════════════════════
+@view_fragment
+def year_view():
+    if "heat_year" not in st.session_state: st.session_state.heat_year = today.year
+    yp, yt, yn, ys = st.columns([1,3,1,2])
+    with yp:
+        if st.button("◀ Prev", use_container_width=True, key="y_prev"):
+            st.session_state.heat_year -= 1; rerun_view()
+    with yt:
+        st.markdown(f"<h3 style='text-align:center;margin:0;color:#1a2e4a;'>{st.session_state.heat_year}</h3>",
+                    unsafe_allow_html=True)
+    with yn:
+        if st.button("Next ▶", use_container_width=True, key="y_next"):
+            st.session_state.heat_year += 1; rerun_view()
+    with ys:
+        opt = st.selectbox("Show", heat_options(), format_func=heat_label, key="heat_show", label_visibility="collapsed")
+
+    yr = st.session_state.heat_year
+    try:
+        counts, errors = day_counts(date(yr, 1, 1), date(yr, 12, 31))
+    except DbUnavailable as e:
+        st.warning(f"Couldn't load the year right now ({e}). Try again in a moment.")
+        return
+    for err in dict.fromkeys(str(e) for e in errors):
+        st.error(f"Could not load calendar events: {err}")
+
+    # Clicking a day opens it in the Month view with its day panel
+    picked = cal_days(year_heatmap_html(yr, counts, opt), key="y_grid")
+    if picked:
+        st.session_state.view = "month"
+        st.session_state.cal_year, st.session_state.cal_month = picked.year, picked.month
+        select_day(picked)
+        st.session_state.selected_event_id = None
+        st.rerun()
+
+if view == "year":
+    year_view()
+
+# ═══════════════ SEARCH VIEW ═══════════════════════════════════════════════════
+@view_fragment
+def search_view():
+    q = st.text_input("Search", key="search_q", label_visibility="collapsed",
+                      placeholder="🔎 Search titles, notes, locations, initials, schools… e.g. TAC J.S.")
+    if not q.strip():
+        st.caption("Searches events, PAC meetings and transition schedules. Every word must match; "
+                   "best matches come first.")
+        return
+    ss = st.session_state
+    if ss.get("search_for") != q:   # a new search starts at the first page
+        ss.search_for, ss.search_page = q, 0
+    try:
+        rows, more = search_calendar(q, ss.search_page)
+    except DbUnavailable as e:
+        st.warning(f"Couldn't search right now ({e}). Try again in a moment.")
+        return
+    if rows is None:
+        st.markdown('<div class="info-box">Search isn\'t set up yet — run <code>sql/005_calendar_search.sql</code> '
+                    'in Supabase to enable it.</div>', unsafe_allow_html=True)
+        return
+    if not rows:
+        st.markdown('<div class="info-box">No matches.</div>', unsafe_allow_html=True)
+        return
+
+    first = ss.search_page * SEARCH_PAGE
+    st.caption(f"Results {first + 1}–{first + len(rows)}{'' if more else ' (end)'} · best match first")
+    picked = cal_list(search_results_html(rows), key="search_list")
+    if picked is not None and picked.isdigit() and int(picked) < len(rows):
+        r = rows[int(picked)]
+        if r["kind"] == "transition":
+            ss.view, ss.sv = "students", "transitions"
+            if r.get("student_initials"):
+                ss.tr_student = ss.tr_sel = r["student_initials"]
+            ss.tr_term = "All"
+        elif r.get("day"):
+            d, eid = search_target(r)
+            ss.view, ss.cal_year, ss.cal_month = "month", d.year, d.month
+            select_day(d)
+            ss.selected_event_id = eid
+        st.rerun()
+
+    sp, _, sn = st.columns([1,3,1])
+    with sp:
+        if ss.search_page and st.button("◀ Previous", use_container_width=True, key="search_prev"):
+            ss.search_page -= 1; rerun_view()
+    with sn:
+        if more and st.button("Next ▶", use_container_width=True, key="search_next"):
+            ss.search_page += 1; rerun_view()
+
+if view == "search":
+    search_view()
+
+# ═══════════════ CLASHES VIEW ══════════════════════════════════════════════════
+@view_fragment
+def clash_view():
+    ss = st.session_state
+    t0, t1, label = term_range(ss.get("cl_term", today))
+    cp, ct, cn, ctod = st.columns([1,3,1,1])
+    with cp:
+        if st.button("◀ Prev", use_container_width=True, key="cl_prev"):
+            ss.cl_term = t0 - timedelta(days=1); rerun_view()
+    with ct:
+        st.markdown(f"<h3 style='text-align:center;margin:0;color:#1a2e4a;'>{label}</h3>"
+                    f"<div style='text-align:center;color:#888;font-size:0.8rem;'>"
+                    f"{t0.strftime('%-d %b')} – {t1.strftime('%-d %b %Y')} (holidays included)</div>",
+                    unsafe_allow_html=True)
+    with cn:
+        if st.button("Next ▶", use_container_width=True, key="cl_next"):
+            ss.cl_term = t1 + timedelta(days=1); rerun_view()
+    with ctod:
+        if st.button("This term", use_container_width=True, key="cl_today"):
+            ss.cl_term = today; rerun_view()
+
+    lo, hi = datetime.combine(t0, dtime.min), datetime.combine(t1 + timedelta(days=1), dtime.min)
+    evs    = store_slice(store, t0, t1, VIEW_FIELDS["clashes"])
+    found  = sorted((c for c in find_clashes(evs) if c[3] < hi and c[4] > lo), key=lambda c: (c[3], c[0]))
+    if not found:
+        st.markdown('<div class="info-box">✅ No clashes this term.</div>', unsafe_allow_html=True)
+        return
+    rooms = sum(c[0][0] == "room" for c in found)
+    st.caption(f"{rooms} double-booked location{'s' if rooms != 1 else ''} · "
+               f"{len(found) - rooms} absence{'s' if len(found) - rooms != 1 else ''} during meetings · "
+               f"click one to open its day")
+    picked = cal_days(clash_list_html(found), key="cl_list")
+    if picked:
+        ss.view, ss.cal_year, ss.cal_month = "month", picked.year, picked.month
+        select_day(picked)
+        ss.selected_event_id = None
+        st.rerun()
+
+if view == "clashes":
+    clash_view()
 
 # ═══════════════ STUDENTS VIEW ════════════════════════════════════════════════
-with tab_students:
+if view == "students":
     st.markdown("### 👨‍🎓 Student Placements & Meetings")
     st.markdown("""
     <div style="background:#f8faff;border:1px solid #c7d7f0;border-radius:10px;padding:0.75rem 1rem;margin-bottom:1rem;font-size:0.84rem;color:#374151;">
@@ -865,16 +2966,19 @@ with tab_students:
     </div>
     """, unsafe_allow_html=True)
 
-    # ── Sub-tabs ──
-    st_gantt, st_meetings, st_transition = st.tabs(["📊 Placement Timeline", "📋 Meetings List", "🔀 Transition Schedule"])
+    # ── Sub-views ──
+    sub_view = view_picker("sv", STUDENT_VIEWS)
 
     # ════════ PLACEMENT TIMELINE (GANTT STRIP) ════════
-    with st_gantt:
+    @view_fragment
+    def gantt_view():
 
-        g1, g2, g3 = st.columns(3)
+        g1, g2, g3, g4 = st.columns(4)
         with g1: g_from = st.date_input("From", value=today - timedelta(days=today.weekday()), key="g_from")
         with g2: g_to   = st.date_input("To",   value=today + timedelta(weeks=8), key="g_to")
         with g3: g_prog = st.multiselect("Program", ["JP","PY","SY"], default=["JP","PY","SY"], key="g_prog")
+        with g4: g_zoom = st.segmented_control("Zoom", ["auto"] + GANTT_ZOOMS, format_func=str.title,
+                                               default="auto", key="g_zoom")
 
         # Add student placement form
         with st.expander("➕ Add Student Placement"):
@@ -897,7 +3001,7 @@ with tab_students:
                     elif not s_who.strip():
                         st.warning("Please enter your name.")
                     else:
-                        supabase.table("clc_events").insert({
+                        res = supabase.table("clc_events").insert({
                             "title": f"Student Placement — {s_initials.strip()}",
                             "event_type": "Student Placement",
                             "event_date": str(s_start),
@@ -908,15 +3012,14 @@ with tab_students:
                             "program": s_program,
                             "student_initials": s_initials.strip(),
                         }).execute()
+                        record_write("clc_events", span=_span(s_start, s_end), rows=res.data)
                         st.success(f"✅ Placement added for {s_initials.strip()}!")
                         st.rerun()
 
         st.markdown("---")
 
         # Fetch all placements and meetings in range
-        g_range_start = g_from - timedelta(days=30)  # fetch wider to catch placements that started earlier
-        g_range_end   = g_to   + timedelta(days=30)
-        all_g_evs = db_events(g_range_start, g_range_end)
+        all_g_evs = store_slice(store, g_from, g_to, VIEW_FIELDS["gantt"], pac=False)
 
         placements = [e for e in all_g_evs
                       if e.get("event_type") == "Student Placement"
@@ -927,132 +3030,11 @@ with tab_students:
         if not placements:
             st.markdown('<div class="info-box">No student placements found. Add one above.</div>', unsafe_allow_html=True)
         else:
-            # Build list of days to show as columns (Mon–Fri only, within range)
-            days = []
-            d = g_from
-            while d <= g_to:
-                if d.weekday() < 5:  # Mon–Fri only
-                    days.append(d)
-                d += timedelta(days=1)
-
-            if len(days) > 60:
-                st.warning("Date range is very wide — showing up to 60 school days. Narrow the range for best results.")
-                days = days[:60]
-
-            # Build meeting lookup by student_initials and date
-            meeting_lookup = {}  # (initials, date_str) -> list of meeting types
-            for m in meetings:
-                init = m.get("student_initials","")
-                mdate = str(m.get("event_date",""))[:10]
-                if init:
-                    key = (init, mdate)
-                    meeting_lookup.setdefault(key, []).append(m.get("event_type",""))
-
-            # Meeting dot colours
-            MEETING_DOTS = {
-                "Entry Meeting":      {"dot": "#0e7490", "label": "E"},
-                "Review Meeting":     {"dot": "#c2410c", "label": "R"},
-                "Transition Meeting": {"dot": "#7c3aed", "label": "T"},
-                "TAC Meeting":        {"dot": "#b45309", "label": "TAC"},
-            }
-
             # Group placements by program for display
-            prog_order = ["JP", "PY", "SY"]
-            placements.sort(key=lambda x: (prog_order.index(x.get("program","JP")) if x.get("program") in prog_order else 3,
-                                           str(x.get("event_date",""))))
-
-            # Build Gantt HTML table
-            # Header row: dates
-            # Limit column header to show day number only, month on change
-            CELL_W = max(22, min(36, 1100 // max(len(days),1)))
-
-            html = f"""
-<style>
-.gantt-wrap {{overflow-x:auto;}}
-.gantt-table {{border-collapse:collapse;font-family:'Inter',sans-serif;font-size:0.72rem;}}
-.gantt-table th {{background:#1a2e4a;color:white;padding:3px 4px;text-align:center;min-width:{CELL_W}px;white-space:nowrap;border:1px solid #2d4a6e;}}
-.gantt-table td {{border:1px solid #e5e7eb;padding:2px;text-align:center;height:30px;min-width:{CELL_W}px;background:white;}}
-.gantt-table .row-label {{text-align:left;padding:4px 10px;font-weight:700;white-space:nowrap;min-width:90px;background:#f8fafc;border:1px solid #e5e7eb;position:sticky;left:0;z-index:2;}}
-.gantt-table .prog-head {{text-align:left;padding:5px 10px;font-size:0.75rem;font-weight:800;letter-spacing:0.05em;text-transform:uppercase;border:1px solid #e5e7eb;}}
-.gantt-bar {{border-radius:4px;height:22px;display:flex;align-items:center;justify-content:center;font-size:0.65rem;font-weight:700;color:white;position:relative;}}
-.gantt-dot {{display:inline-flex;align-items:center;justify-content:center;width:18px;height:18px;border-radius:50%;color:white;font-size:0.6rem;font-weight:800;margin:1px;}}
-.gantt-today {{background:#fffbeb!important;border-left:2px solid #d4af37!important;border-right:2px solid #d4af37!important;}}
-.gantt-weekend {{background:#f9fafb!important;}}
-</style>
-<div class="gantt-wrap">
-<table class="gantt-table">
-<tr>
-  <th class="row-label" style="position:sticky;left:0;z-index:3;">Student</th>
-"""
-            # Date headers
-            prev_month = None
-            for d in days:
-                is_today = d == today
-                month_lbl = d.strftime("%b") if d.month != prev_month else ""
-                prev_month = d.month
-                bg = "#d4af37" if is_today else "#1a2e4a"
-                html += f'<th style="background:{bg};">{month_lbl}<br>{d.day}<br><span style="font-weight:400;opacity:0.7;">{d.strftime("%a")[0]}</span></th>'
-            html += "</tr>"
-
-            cur_prog = None
-            for pl in placements:
-                prog = pl.get("program","")
-                pc   = PROGRAM_COLORS.get(prog, {"color":"#374151","bg":"#f3f4f6"})
-                init = pl.get("student_initials","") or pl.get("title","?")
-
-                # Program group header row
-                if prog != cur_prog:
-                    cur_prog = prog
-                    prog_bg  = pc["bg"]; prog_col = pc["color"]
-                    html += f'<tr><td class="prog-head" colspan="{len(days)+1}" style="background:{prog_bg};color:{prog_col};">{prog} — {PROGRAM_COLORS.get(prog,{}).get("label","")}</td></tr>'
-
-                pl_start = datetime.strptime(str(pl.get("event_date",""))[:10], "%Y-%m-%d").date()
-                pl_end_raw = pl.get("end_date") or pl.get("event_date")
-                pl_end   = datetime.strptime(str(pl_end_raw)[:10], "%Y-%m-%d").date()
-
-                html += f'<tr><td class="row-label"><span style="color:{pc["color"]};font-weight:700;">{init}</span><br><span style="font-size:0.65rem;color:#888;">{pl_start.strftime("%-d %b")} – {pl_end.strftime("%-d %b")}</span></td>'
-
-                for d in days:
-                    is_today_col = d == today
-                    in_placement = pl_start <= d <= pl_end
-                    ds = str(d)
-                    mtypes = meeting_lookup.get((init, ds), [])
-
-                    td_cls = "gantt-today" if is_today_col else ""
-
-                    if in_placement:
-                        if mtypes:
-                            # Show meeting dots on placement bar
-                            dots_html = ""
-                            for mt in mtypes:
-                                dot_cfg = MEETING_DOTS.get(mt, {"dot":"#374151","label":"?"})
-                                dots_html += f'<span class="gantt-dot" style="background:{dot_cfg["dot"]};" title="{mt}">{dot_cfg["label"]}</span>'
-                            html += f'<td class="{td_cls}" style="background:{pc["bg"]}"><div class="gantt-bar" style="background:{pc["color"]};">{dots_html}</div></td>'
-                        else:
-                            # Solid placement bar
-                            html += f'<td class="{td_cls}" style="background:{pc["bg"]};"><div class="gantt-bar" style="background:{pc["color"]};opacity:0.85;">·</div></td>'
-                    else:
-                        # Outside placement — show meeting dots even if not placed (edge case)
-                        if mtypes:
-                            dots_html = "".join([f'<span class="gantt-dot" style="background:{MEETING_DOTS.get(mt,{}).get("dot","#374151")};" title="{mt}">{MEETING_DOTS.get(mt,{}).get("label","?")}</span>' for mt in mtypes])
-                            html += f'<td class="{td_cls}">{dots_html}</td>'
-                        else:
-                            html += f'<td class="{td_cls}"></td>'
-                html += "</tr>"
-
-            html += "</table></div>"
-
-            # Legend
-            html += """
-<div style="margin-top:0.75rem;display:flex;flex-wrap:wrap;gap:0.5rem;font-size:0.75rem;align-items:center;">
-<strong>Meeting markers:</strong>
-<span style="background:#0e7490;color:white;border-radius:50%;width:20px;height:20px;display:inline-flex;align-items:center;justify-content:center;font-weight:800;font-size:0.65rem;">E</span> Entry &nbsp;
-<span style="background:#c2410c;color:white;border-radius:50%;width:20px;height:20px;display:inline-flex;align-items:center;justify-content:center;font-weight:800;font-size:0.65rem;">R</span> Review &nbsp;
-<span style="background:#7c3aed;color:white;border-radius:50%;width:20px;height:20px;display:inline-flex;align-items:center;justify-content:center;font-weight:800;font-size:0.65rem;">T</span> Transition &nbsp;
-<span style="background:#b45309;color:white;border-radius:50%;width:20px;height:20px;display:inline-flex;align-items:center;justify-content:center;font-weight:800;font-size:0.65rem;font-size:0.55rem;">TAC</span> TAC
-</div>"""
-
-            st.markdown(html, unsafe_allow_html=True)
+            placements.sort(key=lambda x: (GANTT_PROGRAMS.index(x.get("program")) if x.get("program") in GANTT_PROGRAMS else 3,
+                                           x.day))
+            zoom = auto_zoom(g_from, g_to) if g_zoom in (None, "auto") else g_zoom
+            st.markdown(gantt_html(placements, meetings, g_from, g_to, zoom), unsafe_allow_html=True)
 
             # Edit placements
             st.markdown("---")
@@ -1062,8 +3044,7 @@ with tab_students:
                 init = pl.get("student_initials","")
                 prog = pl.get("program","")
                 pc   = PROGRAM_COLORS.get(prog, {"color":"#374151","bg":"#f3f4f6"})
-                pl_start = str(pl.get("event_date",""))[:10]
-                pl_end   = str(pl.get("end_date") or pl.get("event_date",""))[:10]
+                pl_start, pl_end = pl.day, pl.last
 
                 ec1, ec2 = st.columns([6,1])
                 with ec1:
@@ -1071,9 +3052,10 @@ with tab_students:
                 with ec2:
                     if st.button("✏️", key=f"sg_e_{eid}"):
                         st.session_state.edit_event_id = eid if st.session_state.edit_event_id != eid else None
-                        st.rerun()
+                        rerun_view()
 
-                if st.session_state.edit_event_id == eid:
+                if st.session_state.edit_event_id == eid and (full := event_for_edit(eid)):
+                    pl = full   # chip rows lack added_by/notes
                     with st.form(f"sg_ef_{eid}", clear_on_submit=False):
                         ea1, ea2 = st.columns(2)
                         with ea1:
@@ -1083,34 +3065,29 @@ with tab_students:
                                                       index=prog_opts.index(pl.get("program","")) if pl.get("program","") in prog_opts else 0)
                             e_who = st.text_input("Added by *", value=pl.get("added_by",""))
                         with ea2:
-                            e_start = st.date_input("Start date *",
-                                                    value=datetime.strptime(str(pl.get("event_date",today))[:10],"%Y-%m-%d").date(),
-                                                    key=f"sge_s_{eid}")
-                            e_end_raw = pl.get("end_date") or pl.get("event_date", today)
-                            e_end = st.date_input("End date *",
-                                                  value=datetime.strptime(str(e_end_raw)[:10],"%Y-%m-%d").date(),
-                                                  key=f"sge_e_{eid}")
+                            e_start = st.date_input("Start date *", value=pl.day, key=f"sge_s_{eid}")
+                            e_end   = st.date_input("End date *", value=pl.last, key=f"sge_e_{eid}")
                             e_notes = st.text_area("Notes", value=pl.get("notes",""), height=80)
+                        e_scope = (st.radio("Apply changes to", list(SERIES_SCOPES), format_func=SERIES_SCOPES.get,
+                                            horizontal=True, key=f"sge_sc_{eid}") if pl.get("series_id") else None)
                         if st.form_submit_button("💾 Save Changes", type="primary", use_container_width=True):
-                            supabase.table("clc_events").update({
-                                "title": f"Student Placement — {e_initials.strip()}",
-                                "event_type": "Student Placement",
-                                "event_date": str(e_start),
-                                "end_date": str(e_end) if e_end != e_start else None,
-                                "start_time": None, "end_time": None,
-                                "location": "", "added_by": e_who.strip(),
-                                "notes": e_notes.strip(),
-                                "program": e_program,
-                                "student_initials": e_initials.strip(),
-                            }).eq("id", eid).execute()
+                            d = dict(title=f"Student Placement — {e_initials.strip()}", etype="Student Placement",
+                                     ev_date=e_start, end_date=e_end, start_t=None, end_t=None, location="",
+                                     who=e_who, notes=e_notes, program=e_program, student_initials=e_initials.strip())
+                            if e_scope: d.update(rrule=pl.get("rrule") or "", scope=e_scope)
+                            upd_event(eid, d)
                             st.session_state.edit_event_id = None
                             st.success("Updated!"); st.rerun()
                     if st.session_state.is_admin:
                         if st.button("🗑️ Delete this placement", key=f"sg_del_{eid}", type="secondary"):
                             del_event(eid); st.rerun()
 
+    if sub_view == "timeline":
+        gantt_view()
+
     # ════════ MEETINGS LIST ════════
-    with st_meetings:
+    @view_fragment
+    def meetings_view():
         ml1, ml2, ml3 = st.columns(3)
         with ml1: m_from = st.date_input("From", value=today, key="m_from")
         with ml2: m_to   = st.date_input("To",   value=today+timedelta(weeks=12), key="m_to")
@@ -1141,7 +3118,7 @@ with tab_students:
                     elif not sm_who.strip():
                         st.warning("Please enter your name.")
                     else:
-                        supabase.table("clc_events").insert({
+                        res = supabase.table("clc_events").insert({
                             "title": f"{sm_type} — {sm_initials.strip()}",
                             "event_type": sm_type,
                             "event_date": str(sm_date),
@@ -1154,16 +3131,17 @@ with tab_students:
                             "program": sm_program,
                             "student_initials": sm_initials.strip(),
                         }).execute()
+                        record_write("clc_events", span=_span(sm_date), rows=res.data)
                         st.success(f"✅ {sm_type} added for {sm_initials.strip()}!")
                         st.rerun()
 
         st.markdown("---")
 
-        m_evs = db_events(m_from, m_to)
+        m_evs = store_slice(store, m_from, m_to, VIEW_FIELDS["meetings"], pac=False)
         m_evs = [e for e in m_evs
                  if e.get("event_type") in m_types
                  and e.get("program","") in m_prog]
-        m_evs.sort(key=lambda x: (str(x.get("event_date","")), str(x.get("start_time",""))))
+        m_evs.sort(key=lambda e: (e.day, e.start is None, e.start or dtime.min))
 
         if not m_evs:
             st.markdown('<div class="info-box">No student meetings found in this date range. Add one above.</div>', unsafe_allow_html=True)
@@ -1171,19 +3149,15 @@ with tab_students:
             st.markdown(f"**{len(m_evs)} meeting{'s' if len(m_evs)!=1 else ''} found**")
             cur_d = None
             for ev in m_evs:
-                eds = str(ev.get("event_date",""))[:10]
-                if eds != cur_d:
-                    cur_d = eds
-                    try:
-                        do  = datetime.strptime(eds,"%Y-%m-%d").date()
-                        lbl = f"📍 **TODAY — {do.strftime('%A %-d %B %Y')}**" if do==today else f"**{do.strftime('%A %-d %B %Y')}**"
-                        st.markdown(lbl)
-                    except: st.markdown(f"**{eds}**")
+                if ev.day != cur_d:
+                    cur_d = ev.day
+                    lbl = f"📍 **TODAY — {cur_d.strftime('%A %-d %B %Y')}**" if cur_d==today else f"**{cur_d.strftime('%A %-d %B %Y')}**"
+                    st.markdown(lbl)
 
                 prog = ev.get("program","")
                 pc   = PROGRAM_COLORS.get(prog, {"color":"#374151","bg":"#f3f4f6"})
                 cfg  = EVENT_TYPES.get(ev.get("event_type","Other"), EVENT_TYPES["Other"])
-                tr   = fmt_time(ev.get("start_time",""))
+                tr   = ev.time_label
                 eid  = ev.get("id","")
                 init = ev.get("student_initials","")
 
@@ -1207,7 +3181,7 @@ with tab_students:
                     st.write("")
                     if st.button("✏️", key=f"sm_e_{eid}"):
                         st.session_state.edit_event_id = eid if st.session_state.edit_event_id != eid else None
-                        st.rerun()
+                        rerun_view()
                 with mc3:
                     if st.session_state.is_admin:
                         st.write("")
@@ -1229,31 +3203,28 @@ with tab_students:
                             e_who_m    = st.text_input("Added by *", value=ev.get("added_by",""))
                         with ef2:
                             e_mdate = st.date_input("Date *",
-                                                    value=datetime.strptime(str(ev.get("event_date",today))[:10],"%Y-%m-%d").date(),
-                                                    key=f"sme_d_{eid}")
+                                                    value=ev.day, key=f"sme_d_{eid}")
                             e_mtime = st.time_input("Time (optional)", value=None, key=f"sme_t_{eid}")
                             e_mloc  = st.text_input("Location", value=ev.get("location",""))
                             e_mnotes= st.text_area("Notes", value=ev.get("notes",""), height=80)
+                        e_scope = (st.radio("Apply changes to", list(SERIES_SCOPES), format_func=SERIES_SCOPES.get,
+                                            horizontal=True, key=f"sme_sc_{eid}") if ev.get("series_id") else None)
                         if st.form_submit_button("💾 Save Changes", type="primary", use_container_width=True):
-                            supabase.table("clc_events").update({
-                                "title": f"{e_mtype} — {e_init.strip()}",
-                                "event_type": e_mtype,
-                                "event_date": str(e_mdate),
-                                "end_date": None,
-                                "start_time": str(e_mtime) if e_mtime else None,
-                                "end_time": None,
-                                "location": e_mloc.strip(),
-                                "added_by": e_who_m.strip(),
-                                "notes": e_mnotes.strip(),
-                                "program": e_prog,
-                                "student_initials": e_init.strip(),
-                            }).eq("id", eid).execute()
+                            d = dict(title=f"{e_mtype} — {e_init.strip()}", etype=e_mtype, ev_date=e_mdate, end_date=None,
+                                     start_t=e_mtime, end_t=None, location=e_mloc, who=e_who_m, notes=e_mnotes,
+                                     program=e_prog, student_initials=e_init.strip())
+                            if e_scope: d.update(rrule=ev.get("rrule") or "", scope=e_scope)
+                            upd_event(eid, d)
                             st.session_state.edit_event_id = None
                             st.success("Updated!"); st.rerun()
 
 
+    if sub_view == "meetings":
+        meetings_view()
+
     # ════════ TRANSITION SCHEDULE ════════
-    with st_transition:
+    @view_fragment
+    def transition_view():
         st.markdown("### 🔀 Student Transition Schedules")
         st.markdown("""
         <div style="background:#fefce8;border:1px solid #fde68a;border-radius:10px;padding:0.75rem 1rem;margin-bottom:1rem;font-size:0.84rem;color:#374151;">
@@ -1267,29 +3238,27 @@ with tab_students:
         DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
         DAY_KEYS = ["mon", "tue", "wed", "thu", "fri"]
 
-        def db_transitions(initials=None):
+        def db_transitions(initials=None, fields=TR_FIELDS):
             try:
-                q = supabase.table("student_transitions").select("*").order("week_start_date").order("student_initials")
-                if initials:
-                    q = q.eq("student_initials", initials)
-                return q.execute().data or []
+                return query_transitions(initials, fields)
+            except DbUnavailable as e:
+                st.warning(f"Couldn't load transition data right now ({e}).")
+                return []
             except Exception as e:
                 st.error(f"Could not load transition data. Have you run the SQL migration? ({e})")
                 return []
 
         def save_transition(d):
-            supabase.table("student_transitions").insert(d).execute()
+            res = supabase.table("student_transitions").insert(d).execute()
+            record_write("student_transitions", initials=d.get("student_initials", ""), rows=res.data)
 
         def upd_transition(tid, d):
-            supabase.table("student_transitions").update(d).eq("id", tid).execute()
+            res = supabase.table("student_transitions").update(d).eq("id", tid).execute()
+            record_write("student_transitions", ids=[tid], initials=d.get("student_initials", ""), rows=res.data)
 
         def del_transition(tid):
             supabase.table("student_transitions").delete().eq("id", tid).execute()
-
-        def fmt_time_short(t):
-            if not t: return ""
-            try: return datetime.strptime(str(t)[:5], "%H:%M").strftime("%-I:%M%p").lower()
-            except: return str(t)[:5]
+            record_write("student_transitions", ids=[tid], deleted=[tid])
 
         # ── Filters ──
         tr1, tr2, tr3 = st.columns(3)
@@ -1297,7 +3266,7 @@ with tab_students:
             tr_prog = st.multiselect("Program", ["JP","PY","SY"], default=["JP","PY","SY"], key="tr_prog")
         with tr2:
             # Get distinct students from transitions for filter
-            all_trans = db_transitions()
+            all_trans = db_transitions(fields=["student_initials"])
             all_inits = sorted(set(t.get("student_initials","") for t in all_trans if t.get("student_initials")))
             tr_student = st.selectbox("Filter by student", ["All"] + all_inits, key="tr_student")
         with tr3:
@@ -1360,7 +3329,7 @@ with tab_students:
         st.markdown("---")
 
         # ── Fetch and filter ──
-        disp_trans = db_transitions(initials=None if tr_student == "All" else tr_student)
+        disp_trans = db_transitions(initials=None if tr_student == "All" else tr_student, fields=TR_GRID)
         if tr_prog != ["JP","PY","SY"]:
             disp_trans = [t for t in disp_trans if t.get("program","") in tr_prog]
         if tr_term != "All":
@@ -1368,161 +3337,113 @@ with tab_students:
 
         if not disp_trans:
             st.markdown('<div class="info-box">No transition schedules found. Add one above.</div>', unsafe_allow_html=True)
-        else:
-            # Group by student
-            from collections import defaultdict
-            by_student = defaultdict(list)
-            for t in disp_trans:
-                by_student[t.get("student_initials","?")].append(t)
-
-            for init, weeks in by_student.items():
-                prog = weeks[0].get("program","")
-                pc   = PROGRAM_COLORS.get(prog, {"color":"#374151","bg":"#f3f4f6"})
-                school = weeks[0].get("mainstream_school","")
-
-                # Student header
+            return
+
+        # One matrix for every student; click a student's row to edit their weeks
+        shown = {t.get("student_initials") or "?" for t in disp_trans}
+        sel   = st.session_state.get("tr_sel")
+        if sel not in shown: sel = None
+        st.caption("Click a student's row to edit or delete their weeks.")
+        picked = cal_list(transition_matrix_html(disp_trans, sel), key="tr_matrix")
+        if picked:
+            st.session_state.tr_sel = None if picked == sel else picked
+            st.session_state.edit_event_id = None
+            rerun_view()
+
+        if sel:
+            # Full rows (notes, added_by) for this student only, read when they are opened
+            weeks = sorted(db_transitions(initials=sel), key=_tr_order)
+            prog  = weeks[0].get("program","") if weeks else ""
+            pc    = PROGRAM_COLORS.get(prog, {"color":"#374151","bg":"#f3f4f6"})
+            school = weeks[0].get("mainstream_school","") if weeks else ""
+            hc1, hc2 = st.columns([6,1])
+            with hc1:
                 st.markdown(
                     f'<div style="background:{pc["bg"]};border-left:4px solid {pc["color"]};border-radius:10px;'
-                    f'padding:0.6rem 1rem;margin:1rem 0 0.5rem;display:flex;align-items:center;gap:0.75rem;">'
+                    f'padding:0.6rem 1rem;margin:0.5rem 0;display:flex;align-items:center;gap:0.75rem;">'
                     f'<span style="background:{pc["color"]};color:white;font-size:0.75rem;font-weight:700;'
                     f'padding:0.2rem 0.55rem;border-radius:8px;">{prog}</span>'
-                    f'<strong style="font-size:1rem;color:{pc["color"]};">🔀 {init}</strong>'
+                    f'<strong style="font-size:1rem;color:{pc["color"]};">✏️ {sel}</strong>'
                     f'{"<span style=\"font-size:0.82rem;color:#666;\">→ "+school+"</span>" if school else ""}'
                     f'</div>', unsafe_allow_html=True)
+            with hc2:
+                st.write("")
+                if st.button("✖ Close", key="tr_close", use_container_width=True):
+                    st.session_state.tr_sel = None; st.session_state.edit_event_id = None
+                    rerun_view()
+            if weeks and weeks[0].get("notes"):
+                st.caption(f"📝 {weeks[0]['notes']}")
+            for week in weeks:
+                tid   = week.get("id","")
+                wlbl  = week.get("week_label","")
+                wdate = week.get("week_start_date","")
+                ec1, ec2, ec3 = st.columns([4,1,1])
+                with ec1:
+                    st.markdown(f"**{week.get('term','')} · {wlbl}** — {wdate}")
+                with ec2:
+                    if st.button("✏️", key=f"tr_ed_{tid}"):
+                        st.session_state.edit_event_id = tid if st.session_state.edit_event_id != tid else None
+                        rerun_view()
+                with ec3:
+                    if st.session_state.is_admin:
+                        if st.button("🗑️", key=f"tr_del_{tid}"):
+                            del_transition(tid); st.rerun()
 
-                # Build timetable HTML grid
-                html = """
-<style>
-.tr-grid{border-collapse:collapse;width:100%;font-family:'Inter',sans-serif;margin-bottom:1rem;}
-.tr-grid th{background:#4a7c59;color:white;padding:6px 10px;font-size:0.78rem;font-weight:600;text-align:center;border:1px solid #3a6347;}
-.tr-grid th.row-h{background:#2d5a3d;text-align:left;min-width:90px;}
-.tr-grid td{border:1px solid #d1d5db;padding:6px 8px;font-size:0.78rem;text-align:center;background:white;vertical-align:middle;}
-.tr-grid td.label-cell{background:#f0f7f2;font-weight:600;color:#2d5a3d;text-align:left;white-space:nowrap;}
-.tr-grid td.has-time{background:#d1fae5;color:#065f46;font-weight:600;}
-.tr-grid td.no-time{background:#f9fafb;color:#9ca3af;font-size:0.72rem;}
-.tr-grid tr.week-divider td{border-top:2px solid #6b9e7a;}
-</style>
-<table class="tr-grid">
-<tr>
-  <th class="row-h">Term / Week</th>
-  <th>Monday</th><th>Tuesday</th><th>Wednesday</th><th>Thursday</th><th>Friday</th>
-</tr>"""
-                cur_term = None
-                for idx_w, week in enumerate(weeks):
-                    trm  = week.get("term","")
-                    wlbl = week.get("week_label","")
-                    tid  = week.get("id","")
-                    # Week date labels row
-                    wdate = week.get("week_start_date","")
-                    try:
-                        wmon = datetime.strptime(wdate[:10], "%Y-%m-%d").date()
-                        date_cells = "".join([
-                            f'<td style="font-size:0.7rem;color:#888;background:#fafafa;">{(wmon+timedelta(days=i)).strftime("%-d %b")}</td>'
-                            for i in range(5)])
-                    except:
-                        date_cells = "<td colspan='5'></td>"
-
-                    # Term header row
-                    if trm != cur_term:
-                        cur_term = trm
-                        html += f'<tr><td class="label-cell" colspan="6" style="background:#2d5a3d;color:white;font-size:0.8rem;letter-spacing:0.05em;text-transform:uppercase;">{trm}</td></tr>'
-
-                    # Week label + dates
-                    html += f'<tr class="{"week-divider" if idx_w>0 else ""}"><td class="label-cell" rowspan="2">{wlbl}</td>{date_cells}</tr>'
-
-                    # Time cells row
-                    html += "<tr>"
-                    for dk in DAY_KEYS:
-                        s = fmt_time_short(week.get(f"{dk}_start"))
-                        e = fmt_time_short(week.get(f"{dk}_end"))
-                        if s and e:
-                            html += f'<td class="has-time">{s}–{e}</td>'
-                        elif s:
-                            html += f'<td class="has-time">{s}</td>'
-                        else:
-                            html += '<td class="no-time">CLC</td>'
-                    html += "</tr>"
-
-                html += "</table>"
-                st.markdown(html, unsafe_allow_html=True)
-
-                # Notes
-                if weeks[0].get("notes"):
-                    st.caption(f"📝 {weeks[0]['notes']}")
-
-                # Edit / delete controls per week
-                with st.expander(f"✏️ Edit / delete weeks for {init}"):
-                    for week in weeks:
-                        tid   = week.get("id","")
-                        wlbl  = week.get("week_label","")
-                        wdate = week.get("week_start_date","")
-                        ec1, ec2, ec3 = st.columns([4,1,1])
-                        with ec1:
-                            st.markdown(f"**{week.get('term','')} · {wlbl}** — {wdate}")
-                        with ec2:
-                            if st.button("✏️", key=f"tr_ed_{tid}"):
-                                st.session_state.edit_event_id = tid if st.session_state.edit_event_id != tid else None
-                                st.rerun()
-                        with ec3:
-                            if st.session_state.is_admin:
-                                if st.button("🗑️", key=f"tr_del_{tid}"):
-                                    del_transition(tid); st.rerun()
-
-                        if st.session_state.edit_event_id == tid:
-                            with st.form(f"tr_ef_{tid}", clear_on_submit=False):
-                                ef1, ef2 = st.columns(2)
-                                with ef1:
-                                    e_init_tr   = st.text_input("Student initials *", value=week.get("student_initials",""))
-                                    prog_opts   = ["", "JP", "PY", "SY"]
-                                    e_prog_tr   = st.selectbox("Program *", prog_opts,
-                                                               index=prog_opts.index(week.get("program","")) if week.get("program","") in prog_opts else 0)
-                                    e_school_tr = st.text_input("Mainstream school", value=week.get("mainstream_school",""))
-                                    e_by_tr     = st.text_input("Added by *", value=week.get("added_by",""))
-                                with ef2:
-                                    e_term_tr   = st.selectbox("Term *", ["Term 1","Term 2","Term 3","Term 4"],
-                                                               index=["Term 1","Term 2","Term 3","Term 4"].index(week.get("term","Term 1")) if week.get("term") in ["Term 1","Term 2","Term 3","Term 4"] else 0)
-                                    e_wlbl_tr   = st.text_input("Week label *", value=week.get("week_label",""))
-                                    try:
-                                        e_wdate_tr = st.date_input("Week start date *",
-                                                                   value=datetime.strptime(week.get("week_start_date","")[:10],"%Y-%m-%d").date(),
-                                                                   key=f"tr_wd_{tid}")
-                                    except:
-                                        e_wdate_tr = st.date_input("Week start date *", value=today, key=f"tr_wd_{tid}")
-                                    e_notes_tr  = st.text_area("Notes", value=week.get("notes",""), height=50)
-
-                                st.markdown("**Times at mainstream**")
-                                eday_cols = st.columns(5)
-                                e_tr_times = {}
-                                for i, (day, dk) in enumerate(zip(DAYS, DAY_KEYS)):
-                                    with eday_cols[i]:
-                                        st.markdown(f"**{day[:3]}**")
-                                        existing_s = week.get(f"{dk}_start")
-                                        existing_e = week.get(f"{dk}_end")
-                                        e_tr_times[f"{dk}_start"] = st.time_input(f"From", value=None, key=f"tr_e{dk}s_{tid}")
-                                        e_tr_times[f"{dk}_end"]   = st.time_input(f"To",   value=None, key=f"tr_e{dk}e_{tid}")
-
-                                if st.form_submit_button("💾 Save Changes", type="primary", use_container_width=True):
-                                    upd_row = {
-                                        "student_initials": e_init_tr.strip(),
-                                        "program": e_prog_tr,
-                                        "mainstream_school": e_school_tr.strip(),
-                                        "term": e_term_tr,
-                                        "week_label": e_wlbl_tr.strip(),
-                                        "week_start_date": str(e_wdate_tr),
-                                        "notes": e_notes_tr.strip(),
-                                        "added_by": e_by_tr.strip(),
-                                    }
-                                    for dk in DAY_KEYS:
-                                        s = e_tr_times.get(f"{dk}_start")
-                                        e_val = e_tr_times.get(f"{dk}_end")
-                                        upd_row[f"{dk}_start"] = str(s) if s else None
-                                        upd_row[f"{dk}_end"]   = str(e_val) if e_val else None
-                                    upd_transition(tid, upd_row)
-                                    st.session_state.edit_event_id = None
-                                    st.success("Updated!"); st.rerun()
+                if st.session_state.edit_event_id == tid:
+                    with st.form(f"tr_ef_{tid}", clear_on_submit=False):
+                        ef1, ef2 = st.columns(2)
+                        with ef1:
+                            e_init_tr   = st.text_input("Student initials *", value=week.get("student_initials",""))
+                            prog_opts   = ["", "JP", "PY", "SY"]
+                            e_prog_tr   = st.selectbox("Program *", prog_opts,
+                                                       index=prog_opts.index(week.get("program","")) if week.get("program","") in prog_opts else 0)
+                            e_school_tr = st.text_input("Mainstream school", value=week.get("mainstream_school",""))
+                            e_by_tr     = st.text_input("Added by *", value=week.get("added_by",""))
+                        with ef2:
+                            e_term_tr   = st.selectbox("Term *", ["Term 1","Term 2","Term 3","Term 4"],
+                                                       index=["Term 1","Term 2","Term 3","Term 4"].index(week.get("term","Term 1")) if week.get("term") in ["Term 1","Term 2","Term 3","Term 4"] else 0)
+                            e_wlbl_tr   = st.text_input("Week label *", value=week.get("week_label",""))
+                            e_wdate_tr = st.date_input("Week start date *", value=week.week or today, key=f"tr_wd_{tid}")
+                            e_notes_tr  = st.text_area("Notes", value=week.get("notes",""), height=50)
+
+                        st.markdown("**Times at mainstream**")
+                        eday_cols = st.columns(5)
+                        e_tr_times = {}
+                        for i, (day, dk) in enumerate(zip(DAYS, DAY_KEYS)):
+                            with eday_cols[i]:
+                                st.markdown(f"**{day[:3]}**")
+                                existing_s = week.get(f"{dk}_start")
+                                existing_e = week.get(f"{dk}_end")
+                                e_tr_times[f"{dk}_start"] = st.time_input(f"From", value=None, key=f"tr_e{dk}s_{tid}")
+                                e_tr_times[f"{dk}_end"]   = st.time_input(f"To",   value=None, key=f"tr_e{dk}e_{tid}")
+
+                        if st.form_submit_button("💾 Save Changes", type="primary", use_container_width=True):
+                            upd_row = {
+                                "student_initials": e_init_tr.strip(),
+                                "program": e_prog_tr,
+                                "mainstream_school": e_school_tr.strip(),
+                                "term": e_term_tr,
+                                "week_label": e_wlbl_tr.strip(),
+                                "week_start_date": str(e_wdate_tr),
+                                "notes": e_notes_tr.strip(),
+                                "added_by": e_by_tr.strip(),
+                            }
+                            for dk in DAY_KEYS:
+                                s = e_tr_times.get(f"{dk}_start")
+                                e_val = e_tr_times.get(f"{dk}_end")
+                                upd_row[f"{dk}_start"] = str(s) if s else None
+                                upd_row[f"{dk}_end"]   = str(e_val) if e_val else None
+                            upd_transition(tid, upd_row)
+                            st.session_state.edit_event_id = None
+                            st.success("Updated!"); st.rerun()
+
+    if sub_view == "transitions":
+        transition_view()
 
 # ─── FOOTER ─────────────────────────────────────────────────────────────────────
 st.markdown("""
 <div style="text-align:center;padding:2rem 0 0.5rem;color:#aaa;font-size:0.76rem;">
 Cowandilla Learning Centre · Communal Staff Calendar · Events auto-sync to Daily Bulletin
 </div>""", unsafe_allow_html=True)
+
+page_done = True
@@ -0,0 +1,107 @@
+# ─── MODELS ─────────────────────────────────────────────────────────────────────
+# Rows are decoded once, when they are fetched: dates and times become date/time
+# objects, and the strings the views print are formatted on first use and kept.
+# Models still answer .get() and [] like the row they wrap, so forms and markup that
+# read columns by name don't need to know the difference.
+#
+# They live outside clc_calendar.py because Streamlit re-executes the script on every
+# rerun: a class defined there is a new class each run, and the models held by the
+# process-wide caches would stop being instances of it.
+from datetime import date, time as dtime
+
+TR_DAY_KEYS = ["mon", "tue", "wed", "thu", "fri"]
+
+def to_date(v):
+    if isinstance(v, date): return v
+    try: return date.fromisoformat(str(v)[:10]) if v else None
+    except ValueError: return None
+
+def to_time(v):
+    if isinstance(v, dtime): return v
+    try: return dtime.fromisoformat(str(v)[:5]) if v else None
+    except ValueError: return None
+
+def fmt_date(d):
+    v = to_date(d)
+    return v.strftime("%-d %B %Y") if v else str(d)[:10]
+
+def fmt_time(t):
+    if not t: return ""
+    v = to_time(t)
+    return v.strftime("%-I:%M %p") if v else str(t)[:5]
+
+def fmt_time_short(t):
+    if not t: return ""
+    v = to_time(t)
+    return v.strftime("%-I:%M%p").lower() if v else str(t)[:5]
+
+class Model:
+    __slots__ = ("row",)
+
+    def get(self, key, default=None):
+        return self.row.get(key, default)
+
+    def __getitem__(self, key):
+        return self.row[key]
+
+    def __contains__(self, key):
+        return key in self.row
+
+class Event(Model):
+    """A clc_events, feed or PAC row; `day`..`last` is the span it is active on."""
+    __slots__ = ("id", "day", "last", "start", "end", "_date_label", "_time_label", "_time_range")
+
+    def __init__(self, row):
+        day = to_date(row.get("event_date"))
+        self.row   = row
+        self.id    = row.get("id")
+        self.day   = day or date.min
+        self.last  = max(day, to_date(row.get("end_date")) or day) if day else date.min
+        self.start = to_time(row.get("start_time"))
+        self.end   = to_time(row.get("end_time"))
+        self._date_label = self._time_label = self._time_range = None
+
+    def merged(self, other):
+        """This row with `other`'s columns laid over it (same event, another field set)."""
+        return Event({**self.row, **other.row})
+
+    @property
+    def date_label(self):
+        """"3 March 2025", or "3 March 2025 → 7 March 2025" for a multi-day event."""
+        if self._date_label is None:
+            self._date_label = fmt_date(self.row.get("event_date", ""))
+            if self.row.get("end_date") and self.row["end_date"] != self.row.get("event_date"):
+                self._date_label += f" → {fmt_date(self.row['end_date'])}"
+        return self._date_label
+
+    @property
+    def time_label(self):
+        if self._time_label is None: self._time_label = fmt_time(self.start)
+        return self._time_label
+
+    @property
+    def time_range(self):
+        if self._time_range is None:
+            self._time_range = self.time_label + (f" – {fmt_time(self.end)}" if self.end else "")
+        return self._time_range
+
+def as_events(rows):
+    return [r if isinstance(r, Event) else Event(r) for r in rows]
+
+class TransitionWeek(Model):
+    """A student_transitions row; `times[dk]` is when the student is at mainstream school."""
+    __slots__ = ("id", "week", "times", "_cells")
+
+    def __init__(self, row):
+        self.row   = row
+        self.id    = row.get("id")
+        self.week  = to_date(row.get("week_start_date"))
+        self.times = {dk: (to_time(row.get(f"{dk}_start")), to_time(row.get(f"{dk}_end"))) for dk in TR_DAY_KEYS}
+        self._cells = None
+
+    @property
+    def cells(self):
+        if self._cells is None:
+            self._cells = {dk: f"{fmt_time_short(s)}–{fmt_time_short(e)}" if s and e else fmt_time_short(s)
+                           for dk, (s, e) in self.times.items()}
+        return self._cells
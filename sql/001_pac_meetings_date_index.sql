@@ -0,0 +1,2 @@
+-- Ranged PAC reads (db_pac) filter on meeting_date; id lookups use the primary key.
+create index if not exists pac_meetings_meeting_date_idx on pac_meetings (meeting_date);
@@ -0,0 +1,48 @@
+-- Delta sync (CLC_SYNC_MODE = "delta"): every calendar row carries an updated_at
+-- stamp, and deletes leave a tombstone so mirrors can drop rows they still hold.
+
+alter table clc_events   add column if not exists updated_at timestamptz not null default now();
+alter table pac_meetings add column if not exists updated_at timestamptz not null default now();
+
+create index if not exists clc_events_updated_at_idx   on clc_events   (updated_at, id);
+create index if not exists pac_meetings_updated_at_idx on pac_meetings (updated_at, id);
+
+create or replace function touch_updated_at() returns trigger language plpgsql as $$
+begin
+  new.updated_at := now();
+  return new;
+end $$;
+
+drop trigger if exists clc_events_touch on clc_events;
+create trigger clc_events_touch before update on clc_events
+  for each row execute function touch_updated_at();
+
+drop trigger if exists pac_meetings_touch on pac_meetings;
+create trigger pac_meetings_touch before update on pac_meetings
+  for each row execute function touch_updated_at();
+
+-- Deleted-id feed
+create table if not exists calendar_tombstones (
+  id         bigserial primary key,
+  table_name text        not null,
+  row_id     text        not null,
+  deleted_at timestamptz not null default now()
+);
+create index if not exists calendar_tombstones_table_idx on calendar_tombstones (table_name, id);
+
+create or replace function record_tombstone() returns trigger language plpgsql as $$
+begin
+  insert into calendar_tombstones (table_name, row_id) values (tg_table_name, old.id::text);
+  return old;
+end $$;
+
+drop trigger if exists clc_events_tombstone on clc_events;
+create trigger clc_events_tombstone after delete on clc_events
+  for each row execute function record_tombstone();
+
+drop trigger if exists pac_meetings_tombstone on pac_meetings;
+create trigger pac_meetings_tombstone after delete on pac_meetings
+  for each row execute function record_tombstone();
+
+-- Tombstones older than any plausible mirror can be pruned, e.g. nightly:
+--   delete from calendar_tombstones where deleted_at < now() - interval '30 days';
@@ -0,0 +1,36 @@
+-- One feed for every calendar view: clc_events and pac_meetings in the shape
+-- pac_events() builds in the app, so a single ranged, ordered query serves both.
+-- PAC rows get ids of the form 'pac_<id>', so the id column is text.
+
+create or replace view clc_calendar_feed with (security_invoker = true) as
+select e.id::text          as id,
+       e.title,
+       e.event_type,
+       e.event_date::date  as event_date,
+       e.end_date::date    as end_date,
+       e.start_time::time  as start_time,
+       e.end_time::time    as end_time,
+       e.location,
+       e.added_by,
+       e.notes,
+       e.program,
+       e.student_initials
+from clc_events e
+union all
+select 'pac_' || p.id::text,
+       coalesce(p.meeting_type, 'Ordinary') || ' PAC Meeting',
+       'PAC Meeting',
+       p.meeting_date::date,
+       null::date,
+       p.start_time::time,
+       null::time,
+       coalesce(p.location, ''),
+       'PAC System',
+       'Chair: ' || coalesce(p.chair, '—'),
+       '',
+       ''
+from pac_meetings p
+where p.meeting_date is not null;
+
+-- Range filters on the feed are pushed down into both branches
+create index if not exists clc_events_event_date_idx on clc_events (event_date, start_time);
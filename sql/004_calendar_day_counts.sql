@@ -0,0 +1,21 @@
+-- Year view: events per day for a date range, grouped by type and program, counted
+-- in the database so the page gets at most one row per (day, type, program) instead
+-- of every event. Multi-day events count on each day of their span. Reads the
+-- calendar feed (003_calendar_feed.sql), so PAC meetings are included.
+
+create or replace function calendar_day_counts(d_from date, d_to date)
+returns table (day date, event_type text, program text, n integer)
+language sql stable security invoker as $$
+  select d::date                  as day,
+         f.event_type,
+         coalesce(f.program, '')  as program,
+         count(*)::integer        as n
+  from clc_calendar_feed f
+  cross join lateral generate_series(greatest(f.event_date, d_from),
+                                     least(coalesce(f.end_date, f.event_date), d_to),
+                                     interval '1 day') as d
+  where f.event_date <= d_to
+    and coalesce(f.end_date, f.event_date) >= d_from
+  group by 1, 2, 3
+  order by 1
+$$;
@@ -0,0 +1,73 @@
+-- Search: one ranked full-text query over clc_events, pac_meetings and
+-- student_transitions. Each table gets a stored tsvector that Postgres keeps up to
+-- date and a GIN index on it, so calendar_search() reads the indexes instead of
+-- scanning. The 'simple' configuration keeps initials (J.S.), school names and
+-- meeting types as typed: no stemming, no stop words. Weights: A = what a row is
+-- called, B = who and where, C = free text.
+
+alter table clc_events add column if not exists search tsvector generated always as (
+  setweight(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(event_type, '') || ' ' ||
+                                  coalesce(student_initials, '')), 'A') ||
+  setweight(to_tsvector('simple', coalesce(location, '') || ' ' || coalesce(added_by, '')), 'B') ||
+  setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+) stored;
+
+alter table pac_meetings add column if not exists search tsvector generated always as (
+  setweight(to_tsvector('simple', coalesce(meeting_type, 'Ordinary') || ' PAC Meeting'), 'A') ||
+  setweight(to_tsvector('simple', coalesce(location, '') || ' ' || coalesce(chair, '')), 'B')
+) stored;
+
+alter table student_transitions add column if not exists search tsvector generated always as (
+  setweight(to_tsvector('simple', 'Transition ' || coalesce(student_initials, '') || ' ' ||
+                                  coalesce(mainstream_school, '')), 'A') ||
+  setweight(to_tsvector('simple', coalesce(term, '') || ' ' || coalesce(week_label, '') || ' ' ||
+                                  coalesce(added_by, '')), 'B') ||
+  setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+) stored;
+
+create index if not exists clc_events_search_idx          on clc_events          using gin (search);
+create index if not exists pac_meetings_search_idx        on pac_meetings        using gin (search);
+create index if not exists student_transitions_search_idx on student_transitions using gin (search);
+
+-- `q` takes web-search syntax: words are ANDed, "quoted phrase", or, -word. Rows come
+-- back best match first, one page of `lim` from `off`. kind is 'event', 'pac' or
+-- 'transition'; id matches the calendar feed (PAC ids are 'pac_<id>'). Snippets are
+-- made for the returned page only, with matches wrapped in ⟦ ⟧.
+create or replace function calendar_search(q text, lim integer default 20, off integer default 0)
+returns table (kind text, id text, title text, day date, student_initials text, snippet text, rank real)
+language sql stable security invoker as $$
+  with tsq as (select websearch_to_tsquery('simple', q) as query),
+  hits as (
+    select 'event' as kind, e.id::text as id,
+           coalesce(nullif(e.title, ''), e.event_type) as title,
+           e.event_date::date as day, coalesce(e.student_initials, '') as student_initials,
+           concat_ws(' · ', nullif(e.location, ''), nullif(e.notes, '')) as body,
+           ts_rank(e.search, tsq.query) as rank
+    from clc_events e, tsq where e.search @@ tsq.query
+    union all
+    select 'pac', 'pac_' || p.id::text,
+           coalesce(p.meeting_type, 'Ordinary') || ' PAC Meeting',
+           p.meeting_date::date, '',
+           concat_ws(' · ', 'Chair: ' || coalesce(p.chair, '—'), nullif(p.location, '')),
+           ts_rank(p.search, tsq.query)
+    from pac_meetings p, tsq where p.search @@ tsq.query
+    union all
+    select 'transition', t.id::text,
+           'Transition — ' || coalesce(t.student_initials, '?') || coalesce(' → ' || nullif(t.mainstream_school, ''), ''),
+           t.week_start_date::date, coalesce(t.student_initials, ''),
+           concat_ws(' · ', t.term, nullif(t.week_label, ''), nullif(t.notes, '')),
+           ts_rank(t.search, tsq.query)
+    from student_transitions t, tsq where t.search @@ tsq.query
+  ),
+  page as (
+    select * from hits
+    order by rank desc, day desc nulls last, kind, id
+    limit lim offset off
+  )
+  select page.kind, page.id, page.title, page.day, page.student_initials,
+         ts_headline('simple', page.body, tsq.query,
+                     'StartSel=⟦, StopSel=⟧, MaxWords=24, MinWords=8, MaxFragments=2'),
+         page.rank
+  from page, tsq
+  order by page.rank desc, page.day desc nulls last, page.kind, page.id
+$$;
@@ -0,0 +1,80 @@
+-- Recurring events: a weekly staff meeting or a yearly birthday is one clc_events row
+-- with a repeat rule instead of a row per occurrence. The app expands the rule for
+-- the dates each view reads.
+--
+--   rrule            RRULE subset: FREQ=DAILY|WEEKLY|MONTHLY|YEARLY, INTERVAL, BYDAY
+--                    (weekly), COUNT, UNTIL=YYYYMMDD. event_date..end_date is the first
+--                    occurrence; later ones keep its length.
+--   repeat_until     last day an occurrence can start on (from UNTIL / COUNT), null if
+--                    the series never ends. Lets range reads find series rows by index.
+--   exdates          occurrence dates that are skipped: deleted, or replaced by an override.
+--   recurrence_id,   set on an override: a normal row that replaces the occurrence of
+--   recurrence_date  series recurrence_id on recurrence_date ("edit this event only").
+
+alter table clc_events add column if not exists rrule           text;
+alter table clc_events add column if not exists repeat_until    date;
+alter table clc_events add column if not exists exdates         date[] not null default '{}';
+alter table clc_events add column if not exists recurrence_id   text;
+alter table clc_events add column if not exists recurrence_date date;
+
+create index if not exists clc_events_series_idx
+  on clc_events (event_date, repeat_until) where rrule is not null;
+create index if not exists clc_events_recurrence_idx
+  on clc_events (recurrence_id, recurrence_date) where recurrence_id is not null;
+
+-- The feed carries the rule columns so series rows can be read and expanded with the
+-- rest (columns can only be added at the end of a view).
+create or replace view clc_calendar_feed with (security_invoker = true) as
+select e.id::text          as id,
+       e.title,
+       e.event_type,
+       e.event_date::date  as event_date,
+       e.end_date::date    as end_date,
+       e.start_time::time  as start_time,
+       e.end_time::time    as end_time,
+       e.location,
+       e.added_by,
+       e.notes,
+       e.program,
+       e.student_initials,
+       e.rrule,
+       e.repeat_until,
+       e.exdates
+from clc_events e
+union all
+select 'pac_' || p.id::text,
+       coalesce(p.meeting_type, 'Ordinary') || ' PAC Meeting',
+       'PAC Meeting',
+       p.meeting_date::date,
+       null::date,
+       p.start_time::time,
+       null::time,
+       coalesce(p.location, ''),
+       'PAC System',
+       'Chair: ' || coalesce(p.chair, '—'),
+       '',
+       '',
+       null::text,
+       null::date,
+       null::date[]
+from pac_meetings p
+where p.meeting_date is not null;
+
+-- Per-day counts (004) leave series rows out; the app adds their occurrences.
+create or replace function calendar_day_counts(d_from date, d_to date)
+returns table (day date, event_type text, program text, n integer)
+language sql stable security invoker as $$
+  select d::date                  as day,
+         f.event_type,
+         coalesce(f.program, '')  as program,
+         count(*)::integer        as n
+  from clc_calendar_feed f
+  cross join lateral generate_series(greatest(f.event_date, d_from),
+                                     least(coalesce(f.end_date, f.event_date), d_to),
+                                     interval '1 day') as d
+  where f.event_date <= d_to
+    and coalesce(f.end_date, f.event_date) >= d_from
+    and f.rrule is null
+  group by 1, 2, 3
+  order by 1
+$$;
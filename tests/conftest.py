@@ -0,0 +1,133 @@
+"""Load clc_calendar.py outside `streamlit run`, against an in-memory Supabase stand-in.
+
+The script runs once per test session (Streamlit calls without a running app are
+no-ops); each test then swaps in its own FakeClient and starts from empty caches.
+"""
+import importlib.util
+import re
+import sys
+import time
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _split(expr):
+    """Top-level comma-separated parts of a PostgREST filter list."""
+    out, depth, cur = [], 0, ""
+    for ch in expr:
+        depth += (ch == "(") - (ch == ")")
+        if ch == "," and depth == 0:
+            out.append(cur); cur = ""
+        else:
+            cur += ch
+    return out + [cur] if cur else out
+
+
+def _test(col, op, arg, row):
+    v = row.get(col)
+    if op == "not":
+        op, arg = arg.split(".", 1)
+        return not _test(col, op, arg, row)
+    if op == "is":
+        return v is None if arg == "null" else v is not None
+    if v is None:
+        return False
+    v, arg = str(v), arg.strip('"')
+    return {"eq": v == arg, "gt": v > arg, "gte": v >= arg, "lt": v < arg, "lte": v <= arg}[op]
+
+
+def _filter(expr):
+    """Row predicate for a PostgREST or=/and= filter expression."""
+    m = re.fullmatch(r"(and|or)\((.*)\)", expr)
+    if m:
+        subs = [_filter(x) for x in _split(m[2])]
+        return (lambda r: all(f(r) for f in subs)) if m[1] == "and" else (lambda r: any(f(r) for f in subs))
+    col, op, arg = expr.split(".", 2)
+    return partial(_test, col, op, arg)
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client, self.table = client, table
+        self.tests, self.orders, self.n = [], [], None
+
+    def select(self, columns="*", **kw): return self
+    def eq(self, col, v):  return self._op(col, "eq", v)
+    def gt(self, col, v):  return self._op(col, "gt", v)
+    def gte(self, col, v): return self._op(col, "gte", v)
+    def lt(self, col, v):  return self._op(col, "lt", v)
+    def lte(self, col, v): return self._op(col, "lte", v)
+    def is_(self, col, v): return self._op(col, "is", v)
+
+    def _op(self, col, op, v):
+        self.tests.append(partial(_test, col, op, str(v)))
+        return self
+
+    def in_(self, col, values):
+        values = {str(v) for v in values}
+        self.tests.append(lambda r: str(r.get(col)) in values)
+        return self
+
+    def or_(self, expr, **kw):
+        self.tests.append(_filter(f"or({expr})"))
+        return self
+
+    def order(self, col, desc=False, **kw):
+        self.orders.append(col)
+        return self
+
+    def limit(self, n, **kw):
+        self.n = n
+        return self
+
+    def execute(self):
+        self.client.calls.append(self.table)
+        time.sleep(self.client.latency)
+        if self.table in self.client.errors:
+            raise self.client.errors[self.table]
+        rows = [r for r in self.client.rows.get(self.table, []) if all(t(r) for t in self.tests)]
+        for col in reversed(self.orders):   # ascending, nulls last, like PostgREST
+            rows.sort(key=lambda r: (r.get(col) is None, str(r.get(col) or "")))
+        return SimpleNamespace(data=[dict(r) for r in rows[:self.n]])
+
+
+class FakeClient:
+    """Serves `rows[table]`; every execute() sleeps `latency` seconds and raises
+    `errors[table]` if there is one."""
+    def __init__(self, rows=None, latency=0.0, errors=None):
+        self.rows, self.latency, self.errors = rows or {}, latency, errors or {}
+        self.calls = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    import streamlit as st
+    import supabase
+    supabase.create_client = lambda *a, **kw: FakeClient()
+    st.secrets = {"SUPABASE_URL": "http://localhost", "SUPABASE_KEY": "test"}
+    spec = importlib.util.spec_from_file_location("clc_calendar", ROOT / "clc_calendar.py")
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules["clc_calendar"] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture
+def app(app_module, monkeypatch):
+    """The app module with empty caches, a closed breaker and a fresh rerun budget."""
+    app_module.qcache.entries.clear()
+    app_module.series_memo.entries.clear()
+    app_module.feed_state.update(dict.fromkeys(app_module.feed_state, False))
+    app_module.breaker.success()
+    app_module.start_budget()
+    monkeypatch.setattr(app_module, "supabase", FakeClient())
+    return app_module
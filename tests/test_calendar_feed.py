@@ -0,0 +1,109 @@
+import os
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from conftest import FakeClient
+
+ROOT = Path(__file__).resolve().parent.parent
+D0   = date(2026, 3, 2)
+
+def ev(i, days, start=None, etype="Staff Meeting", **kw):
+    return {"id": str(i), "title": f"Event {i}", "event_type": etype, "event_date": str(D0 + timedelta(days=days)),
+            "end_date": None, "start_time": start, "end_time": None, "location": "", "added_by": "", "notes": "",
+            "program": "", "student_initials": "", "rrule": None, "repeat_until": None, "exdates": None, **kw}
+
+FEED = [ev(1, 0, "09:00:00"), ev(12, 0, "09:00:00"), ev(3, 0, None), ev(4, 0, "08:00:00", "PAC Meeting"),
+        ev(5, 1, None), ev(6, 1, "13:30:00"), ev(7, 1, "13:30:00", "Team Meeting"), ev(8, 2, "10:00:00"),
+        ev(9, 9, "10:00:00"),                                     # past d_to
+        ev(10, 1, "11:00:00", rrule="FREQ=WEEKLY")]               # a series: read by db_series
+
+def feed_order(rows):
+    return [r["id"] for r in sorted(rows, key=lambda r: (r["event_date"], r["start_time"] is None,
+                                                           r["start_time"] or "", r["id"]))]
+
+def pages(app, types, limit):
+    """Every page of db_feed_page, following the cursor the Agenda builds."""
+    out, after = [], None
+    while True:
+        page = app.db_feed_page(D0, D0 + timedelta(days=6), types, after, limit)
+        out.append([e.id for e in page[:limit]])
+        if len(page) <= limit: return out
+        last  = page[limit - 1]
+        after = (str(last.day), last.get("start_time"), str(last.id))
+
+@pytest.mark.parametrize("types", [None, ["Staff Meeting", "Team Meeting"]])
+def test_feed_pages_follow_the_keyset_order(app, monkeypatch, types):
+    monkeypatch.setattr(app, "supabase", FakeClient({"clc_calendar_feed": FEED}))
+    want = feed_order([r for r in FEED if r["event_date"] <= str(D0 + timedelta(days=6)) and not r["rrule"]
+                       and (types is None or r["event_type"] in types)])
+    got = pages(app, types, 2)
+    assert all(len(p) == 2 for p in got[:-1])
+    assert [i for p in got for i in p] == want
+
+def test_missing_feed_view_falls_back_to_the_tables(app, monkeypatch):
+    client = FakeClient({"clc_calendar_feed": FEED,
+                         "clc_events": [dict(ev(1, 0, "09:00:00"), id=1)],
+                         "pac_meetings": [{"id": 7, "meeting_type": None, "meeting_date": str(D0),
+                                           "start_time": "18:00:00", "location": None, "chair": "Dee"}]},
+                        errors={"clc_calendar_feed": Exception('relation "public.clc_calendar_feed" does not exist')})
+    monkeypatch.setattr(app, "supabase", client)
+    store = app.load_store([(D0, D0 + timedelta(days=6), app.EV_FULL)])
+    assert app.feed_state["missing"]
+    assert store["errors"] == []
+    assert [(e.id, e["title"]) for e in store["events"]] == [(1, "Event 1"), ("pac_7", "Ordinary PAC Meeting")]
+    client.calls.clear()
+    app.qcache.entries.clear()
+    app.load_store([(D0, D0 + timedelta(days=6), app.EV_FULL)])
+    assert "clc_calendar_feed" not in client.calls
+
+# ─── Against Postgres ──────────────────────────────────────────────────────────
+# Set CLC_TEST_DSN to a scratch database (PostgreSQL 15+) to check the view itself.
+# Everything runs in one transaction in a temporary schema and is rolled back.
+SHAPE = ["id", "title", "event_type", "event_date", "end_date", "start_time", "end_time",
+         "location", "added_by", "notes"]
+
+@pytest.fixture
+def pg():
+    dsn = os.environ.get("CLC_TEST_DSN")
+    if not dsn:
+        pytest.skip("CLC_TEST_DSN not set")
+    psycopg = pytest.importorskip("psycopg")
+    with psycopg.connect(dsn) as conn:
+        conn.execute("create schema clc_feed_test; set local search_path to clc_feed_test")
+        conn.execute("""
+            create table clc_events (id bigserial primary key, title text, event_type text, event_date date,
+                end_date date, start_time time, end_time time, location text, added_by text, notes text,
+                program text, student_initials text);
+            create table pac_meetings (id bigserial primary key, meeting_type text, meeting_date date,
+                start_time time, location text, chair text)""")
+        for f in ("003_calendar_feed.sql", "006_recurring_events.sql"):
+            conn.execute((ROOT / "sql" / f).read_text())
+        yield conn
+        conn.rollback()
+
+def test_feed_view_matches_the_tables(app, pg):
+    pg.execute("""
+        insert into clc_events (title, event_type, event_date, end_date, start_time, end_time, location, added_by,
+                                notes, program, student_initials) values
+            ('Staff meeting', 'Staff Meeting', '2026-03-02', null, '15:30', '16:30', 'Library', 'Ann', 'n', '', ''),
+            ('Camp', 'Excursion / Event', '2026-02-27', '2026-03-03', null, null, '', 'Bo', '', '', ''),
+            ('Later', 'Other', '2026-04-01', null, null, null, '', 'Cy', '', '', '');
+        insert into pac_meetings (meeting_type, meeting_date, start_time, location, chair) values
+            ('AGM', '2026-03-04', '18:00', 'Hall', 'Dee'),
+            (null, '2026-03-05', null, null, null),
+            ('Ordinary', null, null, 'Hall', 'Eve')""")
+    a, b = "2026-03-01", "2026-03-07"
+    def rows(sql):
+        cur = pg.execute(sql, (b, a))
+        names = [c.name for c in cur.description]
+        return [dict(zip(names, r)) for r in cur.fetchall()]
+    def norm(evs):
+        return sorted(({k: None if e.get(k) is None else str(e.get(k)) for k in SHAPE} for e in evs),
+                      key=lambda r: r["id"])
+    feed   = rows("select * from clc_calendar_feed where event_date <= %s and coalesce(end_date, event_date) >= %s")
+    events = rows("select * from clc_events where event_date <= %s and coalesce(end_date, event_date) >= %s")
+    pac    = rows("select * from pac_meetings where meeting_date <= %s and meeting_date >= %s")
+    assert len(feed) == 4
+    assert norm(feed) == norm(events + [e.row for e in app.pac_events(pac)])
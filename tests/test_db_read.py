@@ -0,0 +1,47 @@
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+@pytest.fixture(autouse=True)
+def no_backoff(app, monkeypatch):
+    monkeypatch.setattr(app.time, "sleep", lambda s: None)
+
+def failing(*errors):
+    """A fetch raising each of `errors` in turn, then returning [1]."""
+    calls = []
+    def fetch():
+        calls.append(None)
+        if len(calls) <= len(errors): raise errors[len(calls) - 1]
+        return [1]
+    return fetch, calls
+
+@pytest.mark.parametrize("e", [APIError({"message": "Service Unavailable", "code": 503}),
+                               APIError({"message": "Too many requests", "code": "429"}),
+                               APIError({"message": "Could not query the database", "code": "PGRST002"}),
+                               APIError({"message": "canceling statement due to statement timeout", "code": "57014"}),
+                               httpx.ConnectError("refused")])
+def test_transient_errors_are_retried(app, e):
+    fetch, calls = failing(e)
+    assert app.db_read(fetch) == [1]
+    assert len(calls) == 2
+
+@pytest.mark.parametrize("e", [APIError({"message": "relation does not exist", "code": "42P01"}),
+                               APIError({"message": "Not found", "code": 404})])
+def test_other_errors_are_raised_at_once(app, e):
+    fetch, calls = failing(e)
+    with pytest.raises(APIError):
+        app.db_read(fetch)
+    assert len(calls) == 1
+
+def test_a_failed_read_counts_once_towards_the_breaker(app):
+    outage = httpx.ConnectError("refused")
+    for n in range(1, app.BREAKER_FAILS):
+        fetch, calls = failing(*[outage] * (app.DB_RETRIES + 1))
+        with pytest.raises(app.DbUnavailable):
+            app.db_read(fetch)
+        assert len(calls) == app.DB_RETRIES + 1
+        assert app.breaker.failures == n and app.breaker.allow()
+    fetch, _ = failing(*[outage] * (app.DB_RETRIES + 1))
+    with pytest.raises(app.DbUnavailable):
+        app.db_read(fetch)
+    assert not app.breaker.allow()
@@ -0,0 +1,63 @@
+import time
+from datetime import date, timedelta
+from functools import partial
+
+from conftest import FakeClient
+
+LATENCY = 0.3
+DAY     = date(2026, 3, 2)
+
+def ev(i, d, **kw):
+    return {"id": i, "title": f"Event {i}", "event_type": "Staff Meeting", "event_date": str(d),
+            "end_date": None, "start_time": "09:00:00", "end_time": None, "location": "", "added_by": "",
+            "notes": "", "program": "", "student_initials": "", **kw}
+
+def rows():
+    return {"clc_events":   [ev(1, DAY), ev(2, DAY + timedelta(days=40))],
+            "pac_meetings": [{"id": 7, "meeting_type": "Ordinary", "meeting_date": str(DAY),
+                              "start_time": "18:00:00", "location": "Hall", "chair": "Dee"}],
+            "student_transitions": []}
+
+def windows(app):
+    # Two field sets over separate windows: two event reads, plus PAC and transitions
+    return [(DAY, DAY + timedelta(days=6), app.EV_CHIP),
+            (DAY + timedelta(days=35), DAY + timedelta(days=45), app.EV_FULL)]
+
+def test_run_parallel_keeps_call_order(app):
+    def slow(v, delay):
+        time.sleep(delay); return v
+    def boom():
+        raise ValueError("boom")
+    results, errors = app.run_parallel([partial(slow, 1, 0.2), boom, partial(slow, 3, 0)])
+    assert results == [1, None, 3]
+    assert errors[0] is None and isinstance(errors[1], ValueError) and errors[2] is None
+
+def test_load_store_waits_for_the_slowest_read_not_their_sum(app, monkeypatch):
+    app.feed_state["missing"] = True   # clc_events and pac_meetings queried separately
+    client = FakeClient(rows(), latency=LATENCY)
+    monkeypatch.setattr(app, "supabase", client)
+    t = time.monotonic()
+    store = app.load_store(windows(app), also=[app.query_transitions])
+    elapsed = time.monotonic() - t
+    assert len(client.calls) == 4
+    assert elapsed < 2 * LATENCY < len(client.calls) * LATENCY
+    assert [e.id for e in store["events"]] == [1, "pac_7", 2]
+    assert store["errors"] == []
+
+def test_feed_reads_run_together(app, monkeypatch):
+    feed = [dict(r, id=str(r["id"])) for r in rows()["clc_events"]]
+    client = FakeClient({"clc_calendar_feed": feed}, latency=LATENCY)
+    monkeypatch.setattr(app, "supabase", client)
+    t = time.monotonic()
+    store = app.load_store(windows(app), also=[app.query_transitions])
+    assert time.monotonic() - t < 2 * LATENCY
+    assert client.calls.count("clc_calendar_feed") == 2
+    assert [e.id for e in store["events"]] == ["1", "2"]
+
+def test_one_failed_read_gives_a_partial_store(app, monkeypatch):
+    app.feed_state["missing"] = True
+    client = FakeClient(rows(), latency=LATENCY, errors={"pac_meetings": RuntimeError("permission denied")})
+    monkeypatch.setattr(app, "supabase", client)
+    store = app.load_store(windows(app))
+    assert [e.id for e in store["events"]] == [1, 2]
+    assert [str(e) for e in store["errors"]] == ["permission denied"]